@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+环比计算性能对比脚本
+对比原逐行 apply 实现与向量化对比引擎在高基数分组下的耗时，并校验结果一致；
+--parallel 时对比单进程与多进程（parallel后端）分组汇总原始行的耗时
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from data_analyzer_v2 import ExcelDataAnalyzer
+from execution_backends import ParallelBackend, get_backend
+
+
+def legacy_calculate_comparison(current_df, previous_df, group_by_cols, metric_cols):
+    """原实现：逐行 apply 计算环比"""
+    merged = pd.merge(current_df, previous_df, on=group_by_cols,
+                      how='outer', suffixes=('_本月', '_上月'))
+
+    available_metrics = [col for col in metric_cols
+                         if f'{col}_本月' in merged.columns and f'{col}_上月' in merged.columns]
+
+    for col in available_metrics:
+        merged[f'{col}_本月'] = merged[f'{col}_本月'].fillna(0)
+        merged[f'{col}_上月'] = merged[f'{col}_上月'].fillna(0)
+
+    for col in available_metrics:
+        current_col = f'{col}_本月'
+        previous_col = f'{col}_上月'
+        merged[f'{col}_变化'] = merged[current_col] - merged[previous_col]
+        merged[f'{col}_环比(%)'] = merged.apply(
+            lambda row: (
+                round((row[current_col] - row[previous_col]) / row[previous_col] * 100, 2)
+                if row[previous_col] != 0
+                else (100.0 if row[current_col] > 0 else 0.0)
+            ), axis=1
+        )
+
+    result_columns = group_by_cols.copy()
+    for col in available_metrics:
+        result_columns.extend([f'{col}_上月', f'{col}_本月', f'{col}_变化', f'{col}_环比(%)'])
+    return merged[[col for col in result_columns if col in merged.columns]]
+
+
+def create_grouped_data(n_groups: int, seed: int) -> pd.DataFrame:
+    """生成已分组汇总的单月数据（约10%的分组只在其中一个月出现）"""
+    rng = np.random.default_rng(seed)
+    keys = rng.choice(int(n_groups * 1.1), size=n_groups, replace=False)
+    return pd.DataFrame({
+        '客户编号': [f"C{key:08d}" for key in keys],
+        '风险金额': np.round(rng.uniform(0, 1e6, n_groups), 2),
+        '贷款金额': np.round(rng.uniform(0, 5e6, n_groups), 2),
+        '风险笔数': rng.integers(0, 50, n_groups),
+    })
+
+
+def create_row_data(n_rows: int, seed: int) -> pd.DataFrame:
+    """生成未汇总的单月原始行：分类维度 + 高基数客户编号 + 整数与浮点指标"""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        '产品线': pd.Categorical(rng.choice(['产品线A', '产品线B', '产品线C', '产品线D'], n_rows)),
+        '客户编号': rng.integers(0, max(n_rows // 20, 1), n_rows),
+        '风险金额': np.round(rng.uniform(0, 1e6, n_rows), 2),
+        '贷款金额': np.round(rng.uniform(0, 5e6, n_rows), 2),
+        '风险笔数': rng.integers(0, 50, n_rows),
+    })
+
+
+def parallel_main(n_rows: int):
+    """对比单进程与不同进程数的分组汇总耗时，并校验结果逐位一致"""
+    group_by_cols = ['产品线', '客户编号']
+    metric_cols = ['风险金额', '贷款金额', '风险笔数']
+    df = create_row_data(n_rows, seed=1)
+    cpus = os.cpu_count() or 1
+
+    print(f"行数: {n_rows:,}，分组键: {group_by_cols}，CPU核数: {cpus}")
+
+    start = time.perf_counter()
+    reference = get_backend('pandas').group_sum(df, group_by_cols, metric_cols)
+    single_elapsed = time.perf_counter() - start
+    print(f"单进程pandas:         {single_elapsed:8.3f} 秒（{len(reference):,} 个分组）")
+
+    for workers in sorted({2, 4, 8, cpus} - {1}):
+        backend = ParallelBackend(workers, min_rows=0)
+        try:
+            # 第一次包含进程池启动，之后复用常驻进程
+            start = time.perf_counter()
+            backend.group_sum(df, group_by_cols, metric_cols)
+            first_elapsed = time.perf_counter() - start
+            start = time.perf_counter()
+            result = backend.group_sum(df, group_by_cols, metric_cols)
+            elapsed = time.perf_counter() - start
+        finally:
+            backend.close()
+        pd.testing.assert_frame_equal(result, reference, check_exact=True)
+        print(f"parallel {workers:2d} 进程:      {elapsed:8.3f} 秒（加速 {single_elapsed / elapsed:.1f} 倍，"
+              f"含进程启动 {first_elapsed:.3f} 秒）")
+
+    if cpus < 2:
+        print("💡 当前只有1个CPU核，多进程无法加速，耗时仅反映分区和共享内存的开销")
+    print("✓ 各进程数的结果与单进程逐位一致")
+
+
+def main():
+    """运行性能对比"""
+    if len(sys.argv) > 1 and sys.argv[1] == '--parallel':
+        parallel_main(int(sys.argv[2]) if len(sys.argv) > 2 else 2000000)
+        return
+
+    n_groups = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    group_by_cols = ['客户编号']
+    metric_cols = ['风险金额', '贷款金额', '风险笔数']
+
+    current = create_grouped_data(n_groups, seed=1)
+    previous = create_grouped_data(n_groups, seed=2)
+    analyzer = ExcelDataAnalyzer(use_cache=False)
+
+    print(f"分组数: {n_groups:,}，指标数: {len(metric_cols)}")
+
+    start = time.perf_counter()
+    legacy = legacy_calculate_comparison(current, previous, group_by_cols, metric_cols)
+    legacy_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    vectorized = analyzer.calculate_comparison(current, previous, group_by_cols, metric_cols)
+    vectorized_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    analyzer.calculate_comparison(current, previous, group_by_cols, metric_cols, derived_measures=True)
+    derived_elapsed = time.perf_counter() - start
+
+    pd.testing.assert_frame_equal(legacy.reset_index(drop=True), vectorized)
+
+    print(f"逐行apply实现:        {legacy_elapsed:8.3f} 秒")
+    print(f"向量化引擎:           {vectorized_elapsed:8.3f} 秒（加速 {legacy_elapsed / vectorized_elapsed:.1f} 倍）")
+    print(f"向量化引擎+派生指标:  {derived_elapsed:8.3f} 秒")
+    print("✓ 两种实现结果一致")
+
+
+if __name__ == "__main__":
+    main()
@@ -11,21 +11,240 @@
 
 import pandas as pd
 import numpy as np
+import argparse
+import contextlib
+import copy
+import glob
+import io
+import json
 import os
+import re
 import sys
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from datetime import datetime
-from typing import List, Dict, Tuple, Optional, Union
+from typing import Callable, List, Dict, Tuple, Optional, Union
+
+from execution_backends import ParallelBackend, get_backend, available_backends
+from distinct_sketch import hll_registers, merge_hll_registers, estimate_distinct
+from data_cache import (
+    SidecarCache, ResultCache, DEFAULT_MAX_CACHE_BYTES, DEFAULT_RESULT_MAX_AGE, RESULT_FORMAT_VERSION
+)
+from interval_index import SortedBinIndex, BinAccumulator, CrossBinAccumulator
+from quantile_sketch import KLLSketch, SUGGESTION_METHODS, suggest_cutpoints
+from result_memo import ResultMemo, DEFAULT_MEMO_BYTES
+from excel_readers import (
+    iter_row_batches, read_header, read_sample, read_table, available_engines, DEFAULT_BATCH_SIZE
+)
+
+
+# 嗅探列结构时读取的样本行数
+SNIFF_SAMPLE_ROWS = 1000
+# 时间序列模式默认的滚动窗口（月）
+DEFAULT_ROLLING_WINDOW = 3
+# 分组集合中维度值为空的分组的标签
+NULL_KEY_LABEL = '空值'
+# 只输入一组切分点时使用的方案名
+DEFAULT_SCHEME_NAME = '自定义'
+# 切分点建议的默认区间个数
+DEFAULT_SUGGESTED_BANDS = 4
+# 分组汇总支持的统计量：{名称: 结果列后缀}，合计沿用指标原列名
+AGGREGATE_SUFFIXES = {'sum': '', 'count': '_计数', 'mean': '_均值', 'min': '_最小值', 'max': '_最大值'}
+# 近似去重计数的结果列后缀
+DISTINCT_SUFFIX = '_去重数'
+# 批量模式支持的分析类型：{配置中的类型名: 结果描述}
+BATCH_ANALYSIS_TYPES = {'dimension': '维度汇总', 'interval': '区间汇总'}
+
+
+def compute_growth_rate(current: np.ndarray, previous: np.ndarray) -> np.ndarray:
+    """
+    按列向量化计算环比增长率（%）
+    
+    规则与逐行计算一致：上期不为0时为 (本期-上期)/上期*100 并保留两位小数；
+    上期为0时，本期大于0记为100，否则记为0。任一期为NaN时结果为NaN。
+    
+    Args:
+        current: 本期数值
+        previous: 上期数值
+        
+    Returns:
+        np.ndarray: 环比增长率
+    """
+    current = np.asarray(current, dtype=float)
+    previous = np.asarray(previous, dtype=float)
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = np.round((current - previous) / previous * 100, 2)
+    growth = np.where(previous != 0, ratio, np.where(current > 0, 100.0, 0.0))
+    return np.where(np.isnan(current) | np.isnan(previous), np.nan, growth)
+
+
+def _load_workbook_in_worker(filename: str, use_cache: bool, cache_max_bytes: int,
+                             columns: Optional[List[str]] = None,
+                             reader_engine: str = 'auto') -> Tuple[Optional[pd.DataFrame], bool]:
+    """
+    在子进程中加载工作簿（供进程池调用，必须定义在模块顶层）
+    
+    子进程只读取旁路缓存，不写入；新解析的数据由主进程写入缓存。
+    
+    Args:
+        filename: Excel文件路径
+        use_cache: 是否启用旁路缓存
+        cache_max_bytes: 缓存目录大小上限
+        columns: 只加载的列，为None时加载全部列
+        reader_engine: 读取引擎名称
+        
+    Returns:
+        Tuple[Optional[pd.DataFrame], bool]: (数据DataFrame，失败时为None；是否为新解析、需要写入缓存)
+    """
+    analyzer = ExcelDataAnalyzer(use_cache=use_cache, cache_max_bytes=cache_max_bytes,
+                                 reader_engine=reader_engine)
+    df = analyzer.read_cached_frame(filename, columns=columns)
+    if df is not None:
+        return df, False
+    df = analyzer.parse_workbook(filename, columns=columns)
+    return df, df is not None
+
+
+def _prefetch_workbook_in_worker(filename: str, use_cache: bool, cache_max_bytes: int,
+                                 columns: Optional[List[str]] = None,
+                                 reader_engine: str = 'auto') -> Tuple[Optional[pd.DataFrame], bool]:
+    """
+    在子进程中后台预加载工作簿的分析列（不输出加载信息，避免打断用户选择菜单）
+    
+    Args:
+        filename: Excel文件路径
+        use_cache: 是否启用旁路缓存
+        cache_max_bytes: 缓存目录大小上限
+        columns: 只加载的列，为None时加载全部列
+        reader_engine: 读取引擎名称
+        
+    Returns:
+        Tuple[Optional[pd.DataFrame], bool]: (数据DataFrame，失败时为None；是否为新解析、需要写入缓存)
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        return _load_workbook_in_worker(filename, use_cache, cache_max_bytes, columns, reader_engine)
+
+
+class _ThreadOutput:
+    """
+    按线程收集输出的标准输出：登记过的线程写入各自的缓冲区，其余线程直接输出（加锁，整行不交错）
+    
+    批量模式中并发执行的各组分析各自收集进度信息，完成后整段输出，不同分析的输出互不穿插。
+    """
+    
+    def __init__(self, stream):
+        self.stream = stream
+        self.buffers: Dict[int, io.StringIO] = {}
+        self.lock = threading.Lock()
+    
+    def write(self, text: str) -> int:
+        buffer = self.buffers.get(threading.get_ident())
+        if buffer is not None:
+            return buffer.write(text)
+        with self.lock:
+            return self.stream.write(text)
+    
+    def flush(self) -> None:
+        with self.lock:
+            self.stream.flush()
+    
+    def collect(self, func: Callable, *args) -> Tuple[str, object]:
+        """
+        在当前线程中执行 func，期间的输出写入缓冲区
+        
+        Returns:
+            Tuple[str, object]: (收集到的输出, func 的返回值)
+        """
+        ident = threading.get_ident()
+        self.buffers[ident] = io.StringIO()
+        try:
+            result = func(*args)
+        finally:
+            buffer = self.buffers.pop(ident)
+        return buffer.getvalue(), result
 
 
 class ExcelDataAnalyzer:
     """Excel数据分析器类 V2.0"""
     
-    def __init__(self):
-        """初始化分析器"""
+    def __init__(self, use_cache: bool = True, cache_max_bytes: int = DEFAULT_MAX_CACHE_BYTES,
+                 streaming: bool = False, batch_size: int = DEFAULT_BATCH_SIZE,
+                 reader_engine: str = 'auto', derived_measures: bool = False,
+                 use_cube: bool = True, memo_max_bytes: int = DEFAULT_MEMO_BYTES,
+                 use_result_cache: bool = True, result_max_age: float = DEFAULT_RESULT_MAX_AGE,
+                 backend: str = 'pandas', workers: Optional[int] = None,
+                 aggregates: Optional[List[str]] = None, distinct_columns: Optional[List[str]] = None,
+                 prefetch: bool = True):
+        """
+        初始化分析器
+        
+        Args:
+            use_cache: 是否启用工作簿旁路缓存
+            cache_max_bytes: 缓存目录大小上限（字节）
+            streaming: 是否使用流式模式（按批次读取并汇总，不整表加载）
+            batch_size: 流式模式下每批次的行数
+            reader_engine: 读取引擎名称，'auto'表示根据已安装的库和文件大小自动选择
+            derived_measures: 对比结果中是否附加派生指标（本月占比、变化贡献、变化排名）
+            use_cube: 按维度汇总时是否使用预聚合的月度立方体（不再扫描原始行）
+            memo_max_bytes: 会话内汇总结果缓存的内存预算（字节）
+            use_result_cache: 是否启用对比结果磁盘缓存（命中时不加载工作簿）
+            result_max_age: 对比结果缓存的保留时间（秒）
+            backend: 分组汇总、区间分箱、两期合并使用的执行后端（pandas / polars / duckdb / parallel）
+            workers: parallel后端的进程数，为None时使用CPU核数
+            aggregates: 按维度汇总时计算的统计量（sum / count / mean / min / max），为None时只计算合计
+            distinct_columns: 按维度汇总时近似去重计数的ID类列
+            prefetch: 交互时是否在后台预加载工作簿并预先构建立方体
+        """
         self.current_month_data = None
         self.previous_month_data = None
+        self.current_filename = None
+        self.previous_filename = None
+        self.streaming = streaming
+        self.batch_size = batch_size
+        self.reader_engine = reader_engine
+        self.derived_measures = derived_measures
+        self.use_cube = use_cube
+        self.aggregates = list(aggregates or ['sum'])
+        self.distinct_columns = list(distinct_columns or [])
+        self.backend = ParallelBackend(workers) if backend == 'parallel' else get_backend(backend)
+        if not self.backend.is_available():
+            print(f"⚠️  执行后端 {backend} 的依赖未安装，改用 pandas")
+            self.backend = get_backend('pandas')
+        # 已构建的月度立方体：{(文件路径, 立方体变体名): 立方体}
+        self.month_cubes = {}
+        # 区间分箱索引：{(文件路径, 分箱指标, 汇总指标): 索引}
+        self.interval_indexes = {}
+        # 指标分位数草图：{(文件路径, 指标): 草图}
+        self.metric_sketches = {}
+        # 批量模式下草图和区间索引在线程间共用，查找和构建在此锁内进行（合并草图时会嵌套获取）
+        self.index_lock = threading.RLock()
+        # 最近一次区间分析的参数，用于重新分箱
+        self.last_interval_query = None
+        # 会话中已加载的月份数据：{文件绝对路径: 规范化后的数据}
+        self.session_months = {}
+        # 最近一次对比计算的耗时（秒，不含用户输入）
+        self.last_compute_seconds = 0.0
+        # 后台预加载：{文件绝对路径: 加载任务}及各自的列投影；预先构建的立方体：{(文件绝对路径, 立方体变体名): 构建任务}
+        self.prefetch = prefetch and not streaming
+        self.prefetched_months: Dict[str, Future] = {}
+        self.prefetch_projections: Dict[str, Optional[List[str]]] = {}
+        # 输入日期时为预加载读取的样本行：{文件绝对路径: 样本}，之后识别列结构时直接使用
+        self.sniffed_samples: Dict[str, pd.DataFrame] = {}
+        self.speculative_cubes: Dict[Tuple[str, str], Future] = {}
+        self._prefetch_pool = None
+        self._speculation_pool = None
+        # 会话内汇总结果缓存（数据指纹 + 查询参数 -> 结果）
+        self.result_memo = ResultMemo(memo_max_bytes)
         self.dimension_columns = []
         self.metric_columns = []
+        self.use_cache = use_cache
+        self.cache_max_bytes = cache_max_bytes
+        self.data_cache = SidecarCache(max_bytes=cache_max_bytes) if use_cache else None
+        self.result_cache = ResultCache(
+            max_age=result_max_age, fingerprints=self.data_cache
+        ) if use_result_cache else None
         
     def validate_date_format(self, date_str: str) -> bool:
         """
@@ -67,27 +286,546 @@ class ExcelDataAnalyzer:
         """
         return os.path.exists(filename)
     
-    def load_excel_data(self, filename: str) -> Optional[pd.DataFrame]:
+    def load_excel_data(self, filename: str, columns: Optional[List[str]] = None) -> Optional[pd.DataFrame]:
         """
         加载Excel文件数据
         
         Args:
             filename: Excel文件路径
+            columns: 只加载的列（列投影），为None时加载全部列
+            
+        Returns:
+            Optional[pd.DataFrame]: 数据DataFrame，如果失败返回None
+        """
+        # 优先读取旁路缓存，避免重复解析Excel
+        df = self.read_cached_frame(filename, columns=columns)
+        if df is None:
+            df = self.parse_workbook(filename, columns=columns)
+            if df is not None:
+                self.cache_parsed_frame(filename, df, columns=columns)
+        return df
+    
+    def _projection_variant(self, columns: Optional[List[str]]) -> str:
+        """投影加载的缓存变体名：按列集合区分"""
+        return '' if columns is None else '列:' + '|'.join(sorted(columns))
+    
+    def read_cached_frame(self, filename: str, columns: Optional[List[str]] = None) -> Optional[pd.DataFrame]:
+        """
+        从旁路缓存读取工作簿数据（全量缓存可直接按列读取）
+        
+        Args:
+            filename: Excel文件路径
+            columns: 只读取的列，为None时读取全部列
+            
+        Returns:
+            Optional[pd.DataFrame]: 缓存命中时返回数据，否则返回None
+        """
+        if self.data_cache is None:
+            return None
+        try:
+            df = self.data_cache.load_frame(filename, columns=columns)
+            if df is None and columns is not None:
+                df = self.data_cache.load_frame(filename, variant=self._projection_variant(columns))
+            if df is not None:
+                print(f"✓ 从缓存读取文件: {filename}")
+                print(f"  数据形状: {df.shape}")
+            return df
+        except Exception as e:
+            print(f"⚠️ 读取缓存失败，将直接解析Excel: {str(e)}")
+            return None
+    
+    def parse_workbook(self, filename: str, columns: Optional[List[str]] = None) -> Optional[pd.DataFrame]:
+        """
+        直接解析工作簿（不读写旁路缓存）
+        
+        Args:
+            filename: Excel文件路径
+            columns: 只加载的列，为None时加载全部列
             
         Returns:
             Optional[pd.DataFrame]: 数据DataFrame，如果失败返回None
         """
         try:
-            # 尝试读取Excel文件的第一个工作表
-            df = pd.read_excel(filename, sheet_name=0)
+            # 读取文件的第一个工作表，指定列时只读取投影列
+            df, engine_name, elapsed = read_table(filename, columns=columns, engine=self.reader_engine)
             print(f"✓ 成功读取文件: {filename}")
             print(f"  数据形状: {df.shape}")
-            return df
+            print(f"  读取引擎: {engine_name}，耗时 {elapsed:.2f} 秒")
+        except Exception as e:
+            print(f"✗ 读取文件失败: {filename}")
+            print(f"  错误信息: {str(e)}")
+            return None
+        return df
+    
+    def cache_parsed_frame(self, filename: str, df: pd.DataFrame, columns: Optional[List[str]] = None) -> None:
+        """
+        将新解析的工作簿数据写入旁路缓存
+        
+        Args:
+            filename: Excel文件路径
+            df: 解析得到的数据
+            columns: 加载时的列投影，为None时为全部列
+        """
+        if self.data_cache is None:
+            return
+        try:
+            self.data_cache.save_frame(filename, df, variant=self._projection_variant(columns))
+        except Exception as e:
+            print(f"⚠️ 写入缓存失败: {str(e)}")
+    
+    def collect_loaded(self, filename: str, loaded: Tuple[Optional[pd.DataFrame], bool],
+                       columns: Optional[List[str]] = None) -> Optional[pd.DataFrame]:
+        """
+        取出子进程加载的数据；新解析的数据由主进程写入缓存（子进程不写缓存，避免多个进程争用索引）
+        
+        Args:
+            filename: Excel文件路径
+            loaded: 子进程返回的 (数据, 是否为新解析)
+            columns: 加载时的列投影
+            
+        Returns:
+            Optional[pd.DataFrame]: 数据DataFrame，如果失败返回None
+        """
+        df, parsed = loaded
+        if parsed:
+            self.cache_parsed_frame(filename, df, columns=columns)
+        return df
+    
+    def sniff_workbook(self, filename: str, sample_rows: int = SNIFF_SAMPLE_ROWS) -> Optional[pd.DataFrame]:
+        """
+        只读取表头和少量样本行，用于在加载完整数据前分析列结构
+        
+        Args:
+            filename: Excel文件路径
+            sample_rows: 样本行数
+            
+        Returns:
+            Optional[pd.DataFrame]: 样本数据，如果失败返回None
+        """
+        try:
+            sample = self.sniffed_samples.pop(os.path.abspath(filename), None)
+            if sample is None:
+                sample = read_sample(filename, sample_rows)
+            print(f"✓ 成功读取表头: {filename}")
+            print(f"  列数: {len(sample.columns)}，样本行数: {len(sample)}")
+            return sample
         except Exception as e:
             print(f"✗ 读取文件失败: {filename}")
             print(f"  错误信息: {str(e)}")
             return None
     
+    def ensure_month_data(self, columns: List[str], include_previous: bool = True) -> bool:
+        """
+        确保月份数据已加载且包含指定列（按列投影加载，已满足时不重复加载）
+        
+        Args:
+            columns: 分析需要的列
+            include_previous: 是否同时确保上月数据（上月汇总结果已持久化时可只加载本月）
+            
+        Returns:
+            bool: 数据是否可用
+        """
+        needed = list(dict.fromkeys(columns))
+        self.adopt_prefetched(include_previous)
+        
+        def has_columns(df: Optional[pd.DataFrame], header: List[str]) -> bool:
+            return df is not None and all(col in df.columns for col in needed if col in header)
+        
+        try:
+            current_header = read_header(self.current_filename)
+            previous_header = read_header(self.previous_filename) if include_previous else []
+        except Exception as e:
+            print(f"✗ 读取表头失败: {str(e)}")
+            return False
+        
+        load_current = not has_columns(self.current_month_data, current_header)
+        load_previous = include_previous and not has_columns(self.previous_month_data, previous_header)
+        if not load_current and not load_previous:
+            return True
+        
+        def projection(header: List[str]) -> Optional[List[str]]:
+            return self.header_projection(needed, header)
+        
+        print(f"正在按需加载 {len(needed)} 列数据...")
+        if load_current and load_previous:
+            self.current_month_data, self.previous_month_data = self.load_months_concurrently(
+                self.current_filename, self.previous_filename,
+                current_columns=projection(current_header),
+                previous_columns=projection(previous_header),
+            )
+        elif load_current:
+            self.current_month_data = self.load_excel_data(
+                self.current_filename, columns=projection(current_header)
+            )
+        else:
+            self.previous_month_data = self.load_excel_data(
+                self.previous_filename, columns=projection(previous_header)
+            )
+        
+        if self.current_month_data is None or (include_previous and self.previous_month_data is None):
+            print("✗ 数据加载失败")
+            return False
+        
+        # 两个月份共用同一维度字典，已加载的月份一起重新规范化
+        self.normalize_frames([df for df in (self.current_month_data, self.previous_month_data)
+                               if df is not None])
+        return True
+    
+    def header_projection(self, columns: List[str], header: List[str]) -> Optional[List[str]]:
+        """
+        按表头确定列投影：两个月份的列可能不完全一致，各自只投影实际存在的列
+        
+        Args:
+            columns: 需要的列
+            header: 工作簿表头
+            
+        Returns:
+            Optional[List[str]]: 投影列，需要全部列时为None（不投影）
+        """
+        selected = [col for col in dict.fromkeys(columns) if col in header]
+        return None if len(selected) == len(header) else selected
+    
+    def start_prefetch(self, filename: str, columns: Optional[List[str]] = None) -> None:
+        """
+        在后台进程中开始加载工作簿（用户浏览菜单期间解析，子进程不写缓存）
+        
+        Args:
+            filename: 工作簿路径
+            columns: 只加载的列，为None时加载全部列
+        """
+        path = os.path.abspath(filename)
+        if not self.prefetch or path in self.prefetched_months or path in self.session_months:
+            return
+        try:
+            if self._prefetch_pool is None:
+                self._prefetch_pool = ProcessPoolExecutor(max_workers=2)
+            self.prefetched_months[path] = self._prefetch_pool.submit(
+                _prefetch_workbook_in_worker, filename, self.use_cache, self.cache_max_bytes,
+                columns, self.reader_engine
+            )
+            self.prefetch_projections[path] = columns
+        except (OSError, RuntimeError):
+            # 进程池无法启动时不预加载，分析时按需加载
+            self.prefetch = False
+    
+    def sniffed_analysis_columns(self, filename: str) -> Optional[Tuple[List[str], List[str], List[str]]]:
+        """
+        预加载用：读取样本行（保留给之后的列结构识别），不输出信息地识别维度列和指标列
+        
+        Args:
+            filename: 工作簿路径
+            
+        Returns:
+            Optional[Tuple[List[str], List[str], List[str]]]: (维度列, 指标列, 表头)，读取失败时返回None
+        """
+        path = os.path.abspath(filename)
+        sample = self.sniffed_samples.get(path)
+        if sample is None:
+            try:
+                sample = read_sample(filename, SNIFF_SAMPLE_ROWS)
+            except Exception:
+                return None
+            self.sniffed_samples[path] = sample
+        dimension_cols, metric_cols = self.analyze_columns(sample)
+        return dimension_cols, metric_cols, list(sample.columns)
+    
+    def prefetch_month(self, filename: str, current_filename: Optional[str] = None) -> None:
+        """
+        月份日期通过校验后立即在后台按分析列预加载（用户继续输入期间解析）
+        
+        分析列由本月样本行识别，与之后 inspect_columns 的结果一致；上月按同一组分析列投影。
+        预加载上月时，这两个月份已有对比结果缓存（分析多半直接命中缓存）
+        或上月已有持久化的汇总结果（上月数据多半不再需要）则不预加载。
+        
+        Args:
+            filename: 工作簿路径
+            current_filename: 预加载上月时为本月工作簿路径，预加载本月时为None
+        """
+        if not self.prefetch or not self.check_file_exists(filename):
+            return
+        reference = current_filename or filename
+        if not self.check_file_exists(reference):
+            return
+        detected = self.sniffed_analysis_columns(reference)
+        if detected is None:
+            return
+        dimension_cols, metric_cols, header = detected
+        
+        if current_filename is not None:
+            try:
+                fields = dict(self.comparison_fields(), metrics=metric_cols)
+                if self.result_cache is not None and self.result_cache.has_results(
+                        current_filename, filename, fields):
+                    return
+                if self.data_cache is not None and self.data_cache.has_variant(filename, '上月汇总:'):
+                    return
+            except OSError:
+                pass
+            try:
+                header = read_header(filename)
+            except Exception:
+                return
+        
+        columns = dimension_cols + metric_cols + self.distinct_columns
+        self.start_prefetch(filename, self.header_projection(columns, header))
+    
+    def start_speculative_cubes(self) -> None:
+        """
+        列结构识别后，在后台线程中为预加载的月份预先构建立方体（用户浏览菜单期间完成）
+        
+        立方体只依赖维度列和指标列，与之后选择的分析维度无关；配置附加统计量时不使用立方体，不预先构建。
+        """
+        if not self.prefetch or not self.use_cube or self.uses_extended_aggregates():
+            return
+        
+        variant = self._cube_variant()
+        dims, metrics = list(self.dimension_columns), list(self.metric_columns)
+        for filename in (self.current_filename, self.previous_filename):
+            path = os.path.abspath(filename)
+            key = (path, variant)
+            if path not in self.prefetched_months or key in self.month_cubes or key in self.speculative_cubes:
+                continue
+            if self._speculation_pool is None:
+                self._speculation_pool = ThreadPoolExecutor(max_workers=2)
+            self.speculative_cubes[key] = self._speculation_pool.submit(
+                self._build_speculative_cube, self.prefetched_months[path], dims, metrics
+            )
+    
+    def _build_speculative_cube(self, loading: Future, dims: List[str],
+                                metrics: List[str]) -> Optional[pd.DataFrame]:
+        """后台线程：等待预加载完成后构建立方体（不输出信息、不写缓存，也不修改预加载的数据）"""
+        df = loading.result()
+        if df is None or not all(col in df.columns for col in dims + metrics):
+            return None
+        
+        frame = df.copy(deep=False)
+        self.coerce_metric_columns(frame, metrics)
+        return self.build_month_cube(frame, dims, metrics)
+    
+    def take_prefetched(self, filename: str, wait: bool = True) -> Optional[pd.DataFrame]:
+        """
+        取出后台预加载的工作簿数据
+        
+        Args:
+            filename: 工作簿路径
+            wait: 加载尚未完成时是否等待
+            
+        Returns:
+            Optional[pd.DataFrame]: 预加载的数据，没有预加载、未完成（不等待时）或失败时返回None
+        """
+        path = os.path.abspath(filename)
+        loading = self.prefetched_months.get(path)
+        if loading is None or (not wait and not loading.done()):
+            return None
+        del self.prefetched_months[path]
+        columns = self.prefetch_projections.pop(path, None)
+        
+        # 预先构建立方体的线程读取同一份数据，先等其完成再交给分析（之后会就地规范化）
+        for key, building in list(self.speculative_cubes.items()):
+            if key[0] == path:
+                building.exception()
+        try:
+            df = self.collect_loaded(filename, loading.result(), columns)
+        except Exception as e:
+            print(f"⚠️ 后台预加载失败，改为按需加载: {str(e)}")
+            return None
+        if df is not None:
+            print(f"✓ 已在后台预加载: {filename}")
+            print(f"  数据形状: {df.shape}")
+        return df
+    
+    def adopt_prefetched(self, include_previous: bool = True) -> None:
+        """
+        把后台预加载的月份数据接入分析（需要的月份等待加载完成，其余月份已完成时才接入）
+        
+        Args:
+            include_previous: 是否需要上月数据
+        """
+        adopted = False
+        if self.current_month_data is None:
+            self.current_month_data = self.take_prefetched(self.current_filename)
+            adopted = self.current_month_data is not None
+        if self.previous_month_data is None:
+            self.previous_month_data = self.take_prefetched(self.previous_filename, wait=include_previous)
+            adopted = adopted or self.previous_month_data is not None
+        
+        if adopted:
+            self.normalize_frames([df for df in (self.current_month_data, self.previous_month_data)
+                                   if df is not None])
+    
+    def shutdown_background(self) -> None:
+        """结束后台预加载和预先构建任务"""
+        for pool in (self._speculation_pool, self._prefetch_pool):
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+        self._speculation_pool = self._prefetch_pool = None
+        self.prefetched_months.clear()
+        self.prefetch_projections.clear()
+        self.speculative_cubes.clear()
+    
+    def load_months_concurrently(self, current_filename: str, previous_filename: str,
+                                 current_columns: Optional[List[str]] = None,
+                                 previous_columns: Optional[List[str]] = None
+                                 ) -> Tuple[Optional[pd.DataFrame], Optional[pd.DataFrame]]:
+        """
+        使用进程池同时解析本月和上月文件
+        
+        两个文件的解析相互独立且受CPU限制，并行后总耗时接近较大文件的解析耗时。
+        进程池不可用时退化为顺序加载。
+        
+        Args:
+            current_filename: 本月文件路径
+            previous_filename: 上月文件路径
+            current_columns: 本月只加载的列，为None时加载全部列
+            previous_columns: 上月只加载的列，为None时加载全部列
+            
+        Returns:
+            Tuple[Optional[pd.DataFrame], Optional[pd.DataFrame]]: (本月数据, 上月数据)
+        """
+        try:
+            with ProcessPoolExecutor(max_workers=2) as executor:
+                current_future = executor.submit(
+                    _load_workbook_in_worker, current_filename, self.use_cache,
+                    self.cache_max_bytes, current_columns, self.reader_engine
+                )
+                previous_future = executor.submit(
+                    _load_workbook_in_worker, previous_filename, self.use_cache,
+                    self.cache_max_bytes, previous_columns, self.reader_engine
+                )
+                
+                current_df = self.collect_loaded(current_filename, current_future.result(), current_columns)
+                previous_df = self.collect_loaded(previous_filename, previous_future.result(), previous_columns)
+                return current_df, previous_df
+                
+        except (OSError, RuntimeError) as e:
+            # 进程池无法启动（如受限环境），退化为顺序加载
+            print(f"⚠️ 并行加载不可用，改为顺序加载: {str(e)}")
+            current_df = self.load_excel_data(current_filename, columns=current_columns)
+            previous_df = self.load_excel_data(previous_filename, columns=previous_columns)
+            return current_df, previous_df
+    
+    def load_files_concurrently(self, filenames: List[str],
+                                columns: Optional[List[str]] = None) -> List[Optional[pd.DataFrame]]:
+        """
+        使用进程池并行解析多个文件
+        
+        Args:
+            filenames: 文件路径列表
+            columns: 只加载的列（各文件中不存在的列自动忽略），为None时加载全部列
+            
+        Returns:
+            List[Optional[pd.DataFrame]]: 与文件列表顺序一致的数据列表，失败的文件为None
+        """
+        projections = []
+        for filename in filenames:
+            if columns is None:
+                projections.append(None)
+            else:
+                header = read_header(filename)
+                projections.append([col for col in columns if col in header])
+        
+        try:
+            workers = max(1, min(len(filenames), os.cpu_count() or 1))
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = [
+                    executor.submit(_load_workbook_in_worker, filename, self.use_cache,
+                                    self.cache_max_bytes, projection, self.reader_engine)
+                    for filename, projection in zip(filenames, projections)
+                ]
+                return [self.collect_loaded(filename, future.result(), projection)
+                        for filename, projection, future in zip(filenames, projections, futures)]
+        except (OSError, RuntimeError) as e:
+            print(f"⚠️ 并行加载不可用，改为顺序加载: {str(e)}")
+            return [self.load_excel_data(filename, columns=projection)
+                    for filename, projection in zip(filenames, projections)]
+    
+    def encode_dimension_columns(self, frames: List[pd.DataFrame], dimension_cols: List[str]) -> None:
+        """
+        将维度列就地转换为共享同一字典的分类类型（category）
+        
+        所有月份使用同一份排好序的类别字典，分组和合并直接在整数编码上进行，
+        且分组结果的排序与原始字符串排序一致。
+        
+        Args:
+            frames: 各月份数据
+            dimension_cols: 维度列
+        """
+        for col in dimension_cols:
+            present = [df for df in frames if col in df.columns]
+            if not present:
+                continue
+            
+            uniques = pd.Index(pd.concat(
+                [pd.Series(df[col].dropna().unique()) for df in present], ignore_index=True
+            )).unique()
+            try:
+                categories = uniques.sort_values()
+            except TypeError:
+                # 混合类型无法排序时保留出现顺序
+                categories = uniques
+            
+            dtype = pd.CategoricalDtype(categories)
+            for df in present:
+                if df[col].dtype != dtype:
+                    df[col] = df[col].astype(dtype)
+                    self.result_memo.invalidate_frame(df)
+    
+    def downcast_metric_columns(self, df: pd.DataFrame, metric_cols: List[str]) -> None:
+        """
+        就地将整数指标列降为能容纳其取值的最小整数类型
+        
+        浮点列保持float64，避免降精度后汇总结果出现误差；整数分组求和时pandas自动使用int64累加。
+        
+        Args:
+            df: 数据DataFrame
+            metric_cols: 指标列
+        """
+        for col in metric_cols:
+            if col in df.columns and pd.api.types.is_integer_dtype(df[col]):
+                downcast = pd.to_numeric(df[col], downcast='integer')
+                if downcast.dtype != df[col].dtype:
+                    df[col] = downcast
+                    self.result_memo.invalidate_frame(df)
+    
+    def coerce_metric_columns(self, df: pd.DataFrame, metric_cols: List[str]) -> None:
+        """
+        就地将指标列统一转换为数值类型（无法转换的值记为NaN）
+        
+        Args:
+            df: 数据DataFrame
+            metric_cols: 指标列
+        """
+        for col in metric_cols:
+            if col in df.columns and not pd.api.types.is_numeric_dtype(df[col]):
+                df[col] = pd.to_numeric(df[col], errors='coerce')
+                self.result_memo.invalidate_frame(df)
+    
+    def normalize_frames(self, frames: List[pd.DataFrame]) -> None:
+        """
+        加载后对各月份数据做一次性规范化，并输出内存变化
+        
+        指标列统一转为数值类型并压缩整数类型，维度列按共享字典编码。
+        规范化后的数据在所有分析方法间共享，查询时不再复制或重复转换类型。
+        
+        Args:
+            frames: 各月份数据
+        """
+        before = sum(df.memory_usage(deep=True).sum() for df in frames)
+        self.encode_dimension_columns(frames, self.dimension_columns)
+        for df in frames:
+            self.coerce_metric_columns(df, self.metric_columns)
+            self.downcast_metric_columns(df, self.metric_columns)
+        after = sum(df.memory_usage(deep=True).sum() for df in frames)
+        print(f"✓ 数据规范化完成（指标列数值化、维度列字典编码），"
+              f"内存 {before / 1024 / 1024:.2f}MB → {after / 1024 / 1024:.2f}MB")
+    
+    def _numeric_column(self, df: pd.DataFrame, col: str) -> pd.Series:
+        """返回数值类型的列，已规范化的列直接返回不复制"""
+        values = df[col]
+        if pd.api.types.is_numeric_dtype(values):
+            return values
+        return pd.to_numeric(values, errors='coerce')
+    
     def analyze_columns(self, df: pd.DataFrame) -> Tuple[List[str], List[str]]:
         """
         智能分析列名，区分维度列和指标列
@@ -147,7 +885,11 @@ class ExcelDataAnalyzer:
         print("   → 选择指标列（如：贷款金额）进行区间划分")
         print("   → 分析不同区间内的数据分布和环比变化")
         print()
-        print("💡 提示：输入数字1或2选择分析模式")
+        print("3. 按双指标交叉区间汇总分析")
+        print("   → 选择两个指标列（如：贷款金额 × 风险金额）分别划分区间")
+        print("   → 可附加一个维度列，分析交叉区间内的环比变化")
+        print()
+        print("💡 提示：输入数字1、2或3选择分析模式")
         print("="*80)
     
     def get_analysis_mode_choice(self) -> int:
@@ -155,11 +897,11 @@ class ExcelDataAnalyzer:
         获取用户选择的分析模式
         
         Returns:
-            int: 1为按维度汇总，2为按指标区间汇总
+            int: 1为按维度汇总，2为按指标区间汇总，3为按双指标交叉区间汇总
         """
         while True:
             try:
-                choice = input("\n请选择分析模式（1或2）: ").strip()
+                choice = input("\n请选择分析模式（1、2或3）: ").strip()
                 
                 if choice == '1':
                     print("✓ 已选择：按维度汇总分析")
@@ -167,8 +909,11 @@ class ExcelDataAnalyzer:
                 elif choice == '2':
                     print("✓ 已选择：按指标区间汇总分析")
                     return 2
+                elif choice == '3':
+                    print("✓ 已选择：按双指标交叉区间汇总分析")
+                    return 3
                 else:
-                    print("✗ 无效选择，请输入1或2")
+                    print("✗ 无效选择，请输入1、2或3")
                     
             except KeyboardInterrupt:
                 print("\n\n程序已退出")
@@ -289,7 +1034,9 @@ class ExcelDataAnalyzer:
     
     def analyze_metric_range(self, metric_name: str) -> Tuple[float, float]:
         """
-        分析指标的数值范围
+        分析指标的数值范围，并给出切分点建议
+        
+        两个月份各自构建分位数草图后合并，不合并原始数据；流式模式同样适用。
         
         Args:
             metric_name: 指标列名
@@ -297,34 +1044,212 @@ class ExcelDataAnalyzer:
         Returns:
             Tuple[float, float]: (最小值, 最大值)
         """
-        # 合并两个月的数据来分析整体范围
-        combined_data = pd.concat([self.current_month_data, self.previous_month_data], ignore_index=True)
-        
-        # 确保数据是数值类型
-        metric_values = pd.to_numeric(combined_data[metric_name], errors='coerce').dropna()
-        
-        min_val = metric_values.min()
-        max_val = metric_values.max()
+        sketch = self.get_combined_sketch(metric_name)
+        min_val, max_val = sketch.min, sketch.max
         
         print(f"\n📊 指标 '{metric_name}' 的数值范围分析：")
         print(f"   最小值: {min_val:,.2f}")
         print(f"   最大值: {max_val:,.2f}")
-        print(f"   中位数: {metric_values.median():,.2f}")
-        print(f"   平均值: {metric_values.mean():,.2f}")
+        print(f"   中位数: {float(sketch.quantile(0.5)):,.2f}（近似）")
+        print(f"   平均值: {sketch.mean:,.2f}")
+        
+        print(f"\n💡 切分点建议（{DEFAULT_SUGGESTED_BANDS} 个区间）：")
+        for method_name, prefix in SUGGESTION_METHODS.items():
+            cutpoints = suggest_cutpoints(sketch.quantile, min_val, max_val,
+                                          DEFAULT_SUGGESTED_BANDS, prefix)
+            if cutpoints:
+                points = ','.join(f"{point:.2f}" for point in cutpoints)
+                print(f"   {method_name}: {points}    （方案写法: {prefix}{DEFAULT_SUGGESTED_BANDS}）")
         
         return min_val, max_val
     
-    def get_interval_cutpoints(self, metric_name: str, min_val: float, max_val: float) -> List[float]:
+    def get_metric_sketch(self, filename: str, df: Optional[pd.DataFrame], metric_name: str) -> KLLSketch:
+        """
+        获取某个月份某个指标的分位数草图（每个月份每个指标只构建一次）
+        
+        常规模式下由已加载的数据构建；流式模式下按批次读取该列构建。
+        
+        Args:
+            filename: 工作簿路径
+            df: 该月份的规范化数据，流式模式下为None
+            metric_name: 指标列名
+            
+        Returns:
+            KLLSketch: 分位数草图
+        """
+        key = (os.path.abspath(filename), metric_name)
+        with self.index_lock:
+            if key not in self.metric_sketches:
+                sketch = KLLSketch()
+                if df is not None:
+                    sketch.update(self._numeric_column(df, metric_name).to_numpy(dtype=float))
+                else:
+                    for batch in iter_row_batches(filename, self.batch_size, columns=[metric_name]):
+                        sketch.update(pd.to_numeric(batch[metric_name], errors='coerce').to_numpy(dtype=float))
+                self.metric_sketches[key] = sketch
+            return self.metric_sketches[key]
+    
+    def get_combined_sketch(self, metric_name: str) -> KLLSketch:
         """
-        获取用户输入的区间切分点
+        合并两个月份的分位数草图（上月草图优先使用已保存的结果）
         
         Args:
             metric_name: 指标列名
+            
+        Returns:
+            KLLSketch: 合并后的草图
+        """
+        current_sketch = self.get_metric_sketch(
+            self.current_filename, None if self.streaming else self.current_month_data, metric_name
+        )
+        
+        # 上月草图持久化复用，不必为分析数值范围加载上月数据
+        key = (os.path.abspath(self.previous_filename), metric_name)
+        with self.index_lock:
+            if key not in self.metric_sketches:
+                frame = self.persisted_previous_aggregate(
+                    '分位数草图', {'metric': metric_name},
+                    lambda: self.get_metric_sketch(
+                        self.previous_filename, self.previous_month_frame(self.metric_columns), metric_name
+                    ).to_frame()
+                )
+                self.metric_sketches[key] = KLLSketch.from_frame(frame)
+            previous_sketch = self.metric_sketches[key]
+        
+        return current_sketch.merge(previous_sketch)
+    
+    def get_interval_index(self, filename: str, df: pd.DataFrame, metric_name: str) -> SortedBinIndex:
+        """
+        获取某个月份按指标排序的区间分箱索引（每个月份每个指标只构建一次）
+        
+        Args:
+            filename: 工作簿路径
+            df: 该月份的规范化数据
+            metric_name: 分箱指标列名
+            
+        Returns:
+            SortedBinIndex: 区间分箱索引
+        """
+        other_metrics = tuple(col for col in self.metric_columns if col != metric_name and col in df.columns)
+        key = (os.path.abspath(filename), metric_name, other_metrics)
+        with self.index_lock:
+            if key not in self.interval_indexes:
+                self.interval_indexes[key] = SortedBinIndex(df, metric_name, list(other_metrics))
+            return self.interval_indexes[key]
+    
+    def parse_cutpoints(self, user_input: str, min_val: float, max_val: float) -> Optional[List[float]]:
+        """
+        解析并校验用户输入的切分点
+        
+        Args:
+            user_input: 逗号分隔的切分点
             min_val: 最小值
             max_val: 最大值
             
         Returns:
-            List[float]: 切分点列表
+            Optional[List[float]]: 排序后的切分点，输入无效时返回None
+        """
+        try:
+            cutpoints = sorted(float(x.strip()) for x in user_input.split(','))
+        except ValueError:
+            print("✗ 输入格式错误，请输入数字（如：100 或 100,500）")
+            return None
+        
+        # 检查范围
+        for point in cutpoints:
+            if point < min_val or point > max_val:
+                print(f"✗ 切分点 {point} 超出数据范围 [{min_val:.2f}, {max_val:.2f}]")
+                return None
+        return cutpoints
+    
+    def suggested_cutpoints(self, metric_name: str, bands: int, method: str) -> Optional[List[float]]:
+        """
+        基于两个月份合并的分位数草图生成切分点
+        
+        Args:
+            metric_name: 指标列名
+            bands: 区间个数
+            method: 'q'（等频）、'log'（对数）或 'jenks'（自然断点）
+            
+        Returns:
+            Optional[List[float]]: 切分点，无法生成时返回None
+        """
+        sketch = self.get_combined_sketch(metric_name)
+        cutpoints = suggest_cutpoints(sketch.quantile, sketch.min, sketch.max, bands, method)
+        if cutpoints is None:
+            print(f"✗ 无法为指标 '{metric_name}' 生成 {method}{bands} 切分点")
+        return cutpoints
+    
+    def parse_cutpoint_schemes(self, user_input: str, metric_name: str,
+                               min_val: float, max_val: float) -> Optional[Dict[str, List[float]]]:
+        """
+        解析一组或多组命名切分方案
+        
+        支持两种输入：
+          100,500                        单一方案
+          监管=100,500; 内部=200; 四分位=q4  多个命名方案
+        其中 qN / logN / jenksN 分别表示N个等频、对数等比、自然断点区间
+        
+        Args:
+            user_input: 用户输入
+            metric_name: 指标列名
+            min_val: 最小值
+            max_val: 最大值
+            
+        Returns:
+            Optional[Dict[str, List[float]]]: {方案名: 切分点}，输入无效时返回None
+        """
+        if '=' not in user_input:
+            cutpoints = self.parse_cutpoints(user_input, min_val, max_val)
+            return None if cutpoints is None else {DEFAULT_SCHEME_NAME: cutpoints}
+        
+        schemes = {}
+        for part in user_input.replace('；', ';').split(';'):
+            if not part.strip():
+                continue
+            name, _, spec = part.partition('=')
+            name, spec = name.strip(), spec.strip()
+            if not name or not spec:
+                print(f"✗ 方案格式错误: '{part.strip()}'，应为 名称=切分点")
+                return None
+            if name in schemes:
+                print(f"✗ 方案名重复: {name}")
+                return None
+            
+            suggestion = re.fullmatch(r'(q|log|jenks)(\d+)', spec.lower())
+            if suggestion:
+                bands = int(suggestion.group(2))
+                if bands < 2:
+                    print(f"✗ 方案格式错误: '{spec}'，区间个数至少为2")
+                    return None
+                cutpoints = self.suggested_cutpoints(metric_name, bands, suggestion.group(1))
+            elif spec[0].isalpha():
+                print(f"✗ 方案格式错误: '{spec}'，应为切分点或 qN / logN / jenksN")
+                return None
+            else:
+                cutpoints = self.parse_cutpoints(spec, min_val, max_val)
+            
+            if not cutpoints:
+                return None
+            schemes[name] = cutpoints
+        
+        if not schemes:
+            print("✗ 请输入至少一个切分方案")
+            return None
+        return schemes
+    
+    def get_interval_cutpoints(self, metric_name: str, min_val: float,
+                               max_val: float) -> Dict[str, List[float]]:
+        """
+        获取用户输入的区间切分方案（一组切分点或多组命名切分点）
+        
+        Args:
+            metric_name: 指标列名
+            min_val: 最小值
+            max_val: 最大值
+            
+        Returns:
+            Dict[str, List[float]]: {方案名: 切分点列表}
         """
         print(f"\n🔧 设置 '{metric_name}' 的区间切分点：")
         print("-" * 50)
@@ -332,6 +1257,8 @@ class ExcelDataAnalyzer:
         print("示例：")
         print("  输入 '100' 将创建两个区间：<=100, >100")
         print("  输入 '100,500' 将创建三个区间：<=100, 100-500, >500")
+        print("  输入 '监管=100,500; 内部=200; 四分位=q4' 将同时对比多套切分方案")
+        print("  qN / logN / jenksN 分别表示N个等频、对数等比、自然断点区间")
         print(f"  数据范围：{min_val:,.2f} ~ {max_val:,.2f}")
         print()
         
@@ -343,26 +1270,14 @@ class ExcelDataAnalyzer:
                     print("✗ 请输入至少一个切分点")
                     continue
                 
-                # 解析用户输入
-                if ',' in user_input:
-                    cutpoints = [float(x.strip()) for x in user_input.split(',')]
-                else:
-                    cutpoints = [float(user_input)]
-                
-                # 验证切分点
-                cutpoints = sorted(cutpoints)  # 排序
-                
-                # 检查范围
-                for point in cutpoints:
-                    if point < min_val or point > max_val:
-                        print(f"✗ 切分点 {point} 超出数据范围 [{min_val:.2f}, {max_val:.2f}]")
-                        break
-                else:
-                    print(f"✓ 已设置切分点: {cutpoints}")
-                    return cutpoints
+                # 解析并验证切分方案
+                schemes = self.parse_cutpoint_schemes(user_input, metric_name, min_val, max_val)
+                if schemes is not None:
+                    for name, cutpoints in schemes.items():
+                        tag = '' if len(schemes) == 1 else f" [{name}]"
+                        print(f"✓ 已设置切分点{tag}: {cutpoints}")
+                    return schemes
                     
-            except ValueError:
-                print("✗ 输入格式错误，请输入数字（如：100 或 100,500）")
             except KeyboardInterrupt:
                 print("\n\n程序已退出")
                 sys.exit(0)
@@ -408,22 +1323,16 @@ class ExcelDataAnalyzer:
         Returns:
             pd.DataFrame: 添加了区间列的数据
         """
-        df_copy = df.copy()
-        
-        # 确保指标列是数值类型
-        df_copy[metric_name] = pd.to_numeric(df_copy[metric_name], errors='coerce')
+        # 浅复制：共享原有列的数据，只新增区间列
+        df_copy = df.copy(deep=False)
         
-        # 创建bins（包含边界）
-        bins = [-np.inf] + cutpoints + [np.inf]
-        
-        # 使用pd.cut进行分箱
-        df_copy['区间'] = pd.cut(df_copy[metric_name], bins=bins, labels=labels, 
-                               include_lowest=True, right=False)
+        # 按左闭右开区间分箱（已规范化的指标列不再重复转换类型）
+        df_copy['区间'] = self.backend.bin_interval(self._numeric_column(df, metric_name), cutpoints, labels)
         
         return df_copy
     
     def group_and_summarize(self, df: pd.DataFrame, group_by_cols: List[str], 
-                          metric_cols: List[str]) -> pd.DataFrame:
+                          metric_cols: List[str], dropna: bool = True) -> pd.DataFrame:
         """
         按指定维度分组并汇总指标
         
@@ -431,32 +1340,322 @@ class ExcelDataAnalyzer:
             df: 数据DataFrame
             group_by_cols: 分组维度列
             metric_cols: 指标列
+            dropna: 是否丢弃维度值为空的行（计算小计时需保留）
             
         Returns:
             pd.DataFrame: 汇总后的数据
         """
+        memo_key = ('分组', self.result_memo.frame_fingerprint(df), tuple(group_by_cols),
+                    tuple(metric_cols), dropna, tuple(self.aggregates), tuple(self.distinct_columns))
+        cached = self.result_memo.get(memo_key)
+        if cached is not None:
+            print(f"✓ 命中结果缓存，共 {len(cached)} 个分组")
+            return cached
+        
         try:
-            # 确保所有指标列都是数值类型
-            df_copy = df.copy()
-            for col in metric_cols:
-                if col in df_copy.columns:  # 检查列是否存在
-                    df_copy[col] = pd.to_numeric(df_copy[col], errors='coerce')
-            
             # 只选择存在的指标列
-            available_metrics = [col for col in metric_cols if col in df_copy.columns]
+            available_metrics = [col for col in metric_cols if col in df.columns]
+            
+            # 未规范化的非数值指标列才需要转换，已规范化的数据直接分组不复制
+            non_numeric = [col for col in available_metrics if not pd.api.types.is_numeric_dtype(df[col])]
+            if non_numeric:
+                df = df.assign(**{col: pd.to_numeric(df[col], errors='coerce') for col in non_numeric})
             
-            # 按维度分组并对指标列求和
-            grouped = df_copy.groupby(group_by_cols)[available_metrics].sum().reset_index()
+            # 按维度分组并对指标列求和（分类维度只保留实际出现的组合）
+            if self.uses_extended_aggregates():
+                partial, sketches = self.partial_aggregates(df, group_by_cols, available_metrics, dropna)
+                grouped = self.finalize_aggregates(partial, sketches, group_by_cols, available_metrics, dropna)
+            else:
+                grouped = self.backend.group_sum(df, group_by_cols, available_metrics, dropna=dropna)
+            
+            grouped = self.complete_interval_bins(grouped, group_by_cols)
             
             print(f"✓ 数据分组汇总完成，共 {len(grouped)} 个分组")
+            self.result_memo.put(memo_key, grouped)
             return grouped
             
         except Exception as e:
             print(f"✗ 分组汇总失败: {str(e)}")
             return pd.DataFrame()
     
+    def stream_group_and_summarize(self, filename: str, group_by_cols: List[str],
+                                   metric_cols: List[str],
+                                   binning: Optional[Tuple[str, List[float], List[str]]] = None,
+                                   dropna: bool = True) -> pd.DataFrame:
+        """
+        流式分组汇总：按批次读取工作簿，逐批折叠为分组部分和，最后合并
+        
+        内存峰值取决于分组数量和批次大小，与文件总行数无关；
+        结果与整表加载后调用 group_and_summarize 的结果一致。
+        
+        Args:
+            filename: Excel文件路径
+            group_by_cols: 分组维度列
+            metric_cols: 指标列
+            binning: 区间分箱参数 (指标列名, 切分点列表, 区间标签列表)，为None时不分箱
+            dropna: 是否丢弃维度值为空的行（计算小计时需保留）
+            
+        Returns:
+            pd.DataFrame: 汇总后的数据
+        """
+        memo_key = ('流式分组', self.result_memo.file_fingerprint(filename), tuple(group_by_cols),
+                    tuple(metric_cols), None if binning is None else
+                    (binning[0], tuple(binning[1]), tuple(binning[2])), dropna,
+                    tuple(self.aggregates), tuple(self.distinct_columns))
+        cached = self.result_memo.get(memo_key)
+        if cached is not None:
+            print(f"✓ 命中结果缓存，共 {len(cached)} 个分组")
+            return cached
+        
+        try:
+            source_cols = [col for col in group_by_cols if col != '区间'] + list(metric_cols)
+            if binning is not None and binning[0] not in source_cols:
+                source_cols.append(binning[0])
+            extended = self.uses_extended_aggregates()
+            if extended:
+                source_cols += [col for col in self.distinct_columns if col not in source_cols]
+            
+            accumulated = None
+            sketches = {}
+            row_count = 0
+            for batch in iter_row_batches(filename, self.batch_size, columns=source_cols):
+                row_count += len(batch)
+                for col in metric_cols:
+                    batch[col] = pd.to_numeric(batch[col], errors='coerce')
+                
+                if binning is not None:
+                    metric_name, cutpoints, labels = binning
+                    batch = self.apply_interval_binning(batch, metric_name, cutpoints, labels)
+                
+                if extended:
+                    # 本批次的中间统计量和去重草图分别并入累计结果
+                    partial, batch_sketches = self.partial_aggregates(batch, group_by_cols, metric_cols, dropna)
+                    accumulated = partial if accumulated is None else self.merge_partial_aggregates(
+                        [accumulated, partial], group_by_cols, dropna
+                    )
+                    for col, sketch in batch_sketches.items():
+                        sketches[col] = sketch if col not in sketches else merge_hll_registers(
+                            [sketches[col], sketch], group_by_cols, dropna=dropna
+                        )
+                    continue
+                
+                partial = batch.groupby(group_by_cols, observed=True, dropna=dropna)[list(metric_cols)].sum()
+                
+                # 将本批次的部分和并入累计结果，累计结果的大小只与分组数量有关
+                if accumulated is None:
+                    accumulated = partial
+                else:
+                    accumulated = pd.concat([accumulated, partial]).groupby(
+                        level=group_by_cols, observed=True, dropna=dropna
+                    ).sum()
+            
+            if accumulated is None:
+                print(f"✗ 文件中没有数据行: {filename}")
+                return pd.DataFrame()
+            
+            if extended:
+                grouped = self.finalize_aggregates(accumulated, sketches, group_by_cols, metric_cols, dropna)
+            else:
+                grouped = accumulated.reset_index()
+            grouped = self.complete_interval_bins(grouped, group_by_cols)
+            print(f"✓ 流式汇总完成，共读取 {row_count} 行，{len(grouped)} 个分组")
+            self.result_memo.put(memo_key, grouped)
+            return grouped
+            
+        except Exception as e:
+            print(f"✗ 流式汇总失败: {str(e)}")
+            return pd.DataFrame()
+    
+    def complete_interval_bins(self, grouped: pd.DataFrame, group_by_cols: List[str]) -> pd.DataFrame:
+        """
+        只按区间分组时补齐没有数据的区间，与对分类区间列分组（observed=False）的结果一致
+        
+        补齐的区间合计、计数和去重数为0，均值、最小值、最大值为空。
+        
+        Args:
+            grouped: 分组汇总结果
+            group_by_cols: 分组维度列
+            
+        Returns:
+            pd.DataFrame: 包含全部区间的汇总结果
+        """
+        if group_by_cols != ['区间'] or grouped.empty or \
+                not isinstance(grouped['区间'].dtype, pd.CategoricalDtype):
+            return grouped
+        
+        categories = grouped['区间'].cat.categories
+        if len(grouped) == len(categories):
+            return grouped
+        completed = grouped.set_index('区间').reindex(
+            pd.CategoricalIndex(categories, categories=categories, name='区间')
+        )
+        non_additive = tuple(AGGREGATE_SUFFIXES[agg] for agg in ('mean', 'min', 'max'))
+        for col in completed.columns:
+            if not col.endswith(non_additive):
+                completed[col] = completed[col].fillna(0).astype(grouped[col].dtype)
+        return completed.reset_index()
+    
+    def uses_extended_aggregates(self) -> bool:
+        """是否配置了合计以外的统计量或去重计数"""
+        return self.aggregates != ['sum'] or bool(self.distinct_columns)
+    
+    def aggregate_output_columns(self, metric_cols: List[str]) -> List[str]:
+        """
+        按维度汇总结果中的统计量列名（合计沿用指标原列名，其余加后缀）
+        
+        Args:
+            metric_cols: 指标列
+            
+        Returns:
+            List[str]: 统计量列名，依次为各指标的各统计量，最后为去重计数列
+        """
+        columns = [col + AGGREGATE_SUFFIXES[agg] for col in metric_cols for agg in self.aggregates]
+        return columns + [col + DISTINCT_SUFFIX for col in self.distinct_columns]
+    
+    def aggregate_params(self) -> Dict:
+        """统计量配置，用于缓存键（只计算合计时为空，已有缓存条目保持有效）"""
+        if not self.uses_extended_aggregates():
+            return {}
+        return {'aggregates': self.aggregates, 'distinct': self.distinct_columns}
+    
+    def partial_aggregates(self, df: pd.DataFrame, group_by_cols: List[str], metric_cols: List[str],
+                           dropna: bool = True) -> Tuple[pd.DataFrame, Dict[str, pd.DataFrame]]:
+        """
+        一次分组计算可合并的中间统计量（合计、非空个数、最小值、最大值）和去重草图
+        
+        均值由合计和非空个数在最后计算，因此各批次的中间结果可以直接合并。
+        
+        Args:
+            df: 数据（指标列应为数值类型）
+            group_by_cols: 分组维度列
+            metric_cols: 指标列
+            dropna: 是否丢弃维度值为空的行
+            
+        Returns:
+            Tuple[pd.DataFrame, Dict[str, pd.DataFrame]]: (以分组键为索引、列为 (指标, 统计量) 的中间结果,
+            {去重列: 草图})
+        """
+        stats = [stat for stat in ('sum', 'count', 'min', 'max')
+                 if stat in self.aggregates or (stat in ('sum', 'count') and 'mean' in self.aggregates)]
+        partial = df.groupby(group_by_cols, observed=True, dropna=dropna)[list(metric_cols)].agg(stats)
+        
+        sketches = {col: hll_registers(df, group_by_cols, col, dropna=dropna)
+                    for col in self.distinct_columns if col in df.columns}
+        return partial, sketches
+    
+    def merge_partial_aggregates(self, partials: List[pd.DataFrame], group_by_cols: List[str],
+                                 dropna: bool = True) -> pd.DataFrame:
+        """
+        合并多个批次的中间统计量：合计与个数相加，最小值取最小，最大值取最大
+        
+        Args:
+            partials: partial_aggregates 返回的中间结果列表
+            group_by_cols: 分组维度列
+            dropna: 是否丢弃维度值为空的分组
+            
+        Returns:
+            pd.DataFrame: 合并后的中间结果
+        """
+        combined = pd.concat(partials)
+        grouped = combined.groupby(level=group_by_cols, observed=True, dropna=dropna)
+        merged = {}
+        for stat in ('sum', 'count', 'min', 'max'):
+            columns = [column for column in combined.columns if column[1] == stat]
+            if columns:
+                reduced = getattr(grouped[columns], 'sum' if stat == 'count' else stat)()
+                merged.update({column: reduced[column] for column in columns})
+        return pd.DataFrame(merged)[combined.columns]
+    
+    def finalize_aggregates(self, partial: pd.DataFrame, sketches: Dict[str, pd.DataFrame],
+                            group_by_cols: List[str], metric_cols: List[str],
+                            dropna: bool = True) -> pd.DataFrame:
+        """
+        由中间统计量和去重草图生成汇总结果
+        
+        Args:
+            partial: 中间统计量
+            sketches: {去重列: 草图}
+            group_by_cols: 分组维度列
+            metric_cols: 指标列
+            dropna: 是否丢弃维度值为空的分组
+            
+        Returns:
+            pd.DataFrame: 分组键 + 各统计量列（列名见 aggregate_output_columns）
+        """
+        result = {}
+        for col in metric_cols:
+            for agg in self.aggregates:
+                if agg == 'mean':
+                    count = partial[(col, 'count')]
+                    values = partial[(col, 'sum')].astype(float) / count.where(count > 0)
+                else:
+                    values = partial[(col, agg)]
+                    if agg in ('sum', 'count') and pd.api.types.is_integer_dtype(values):
+                        values = values.astype(np.int64)
+                result[col + AGGREGATE_SUFFIXES[agg]] = values
+        grouped = pd.DataFrame(result, index=partial.index).reset_index()
+        
+        for col, sketch in sketches.items():
+            name = col + DISTINCT_SUFFIX
+            distinct = estimate_distinct(sketch, group_by_cols, dropna=dropna).rename(columns={'去重数': name})
+            grouped = grouped.merge(distinct, on=group_by_cols, how='left')
+            # 该列全为空的分组去重数为0
+            grouped[name] = grouped[name].fillna(0).astype(np.int64)
+        return grouped
+    
+    def compare_aggregates(self, keys: pd.DataFrame, current: pd.DataFrame, previous: pd.DataFrame,
+                           metric_cols: List[str], derived_measures: bool = False) -> pd.DataFrame:
+        """
+        向量化对比引擎：按列一次性计算变化量、环比及派生指标
+        
+        keys/current/previous 按行对齐，缺失值按0处理。
+        
+        Args:
+            keys: 分组维度列
+            current: 本月各指标汇总值
+            previous: 上月各指标汇总值
+            metric_cols: 指标列
+            derived_measures: 是否计算派生指标（本月占比、变化贡献、变化排名）
+            
+        Returns:
+            pd.DataFrame: 对比结果，每个指标依次为 _上月/_本月/_变化/_环比(%)（及派生指标列）
+        """
+        columns = {col: keys[col].to_numpy() for col in keys.columns}
+        
+        for col in metric_cols:
+            current_values = current[col].fillna(0)
+            previous_values = previous[col].fillna(0)
+            # 压缩后的小整数类型先扩展为int64，避免相减溢出
+            if pd.api.types.is_integer_dtype(current_values):
+                current_values = current_values.astype(np.int64)
+            if pd.api.types.is_integer_dtype(previous_values):
+                previous_values = previous_values.astype(np.int64)
+            change = current_values - previous_values
+            
+            columns[f'{col}_上月'] = previous_values.to_numpy()
+            columns[f'{col}_本月'] = current_values.to_numpy()
+            columns[f'{col}_变化'] = change.to_numpy()
+            columns[f'{col}_环比(%)'] = compute_growth_rate(current_values.to_numpy(), previous_values.to_numpy())
+            
+            if derived_measures:
+                current_total = current_values.sum()
+                change_total = change.sum()
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    share = np.round(current_values.to_numpy(dtype=float) / current_total * 100, 2)
+                    contribution = np.round(change.to_numpy(dtype=float) / change_total * 100, 2)
+                columns[f'{col}_本月占比(%)'] = share if current_total != 0 else np.zeros(len(change))
+                columns[f'{col}_变化贡献(%)'] = contribution if change_total != 0 else np.zeros(len(change))
+                columns[f'{col}_变化排名'] = change.abs().rank(method='min', ascending=False).to_numpy(dtype=int)
+        
+        result = pd.DataFrame(columns)
+        for col in keys.columns:
+            # 保留分组列的原始类型（如分类类型）
+            result[col] = keys[col].reset_index(drop=True)
+        return result
+    
     def calculate_comparison(self, current_df: pd.DataFrame, previous_df: pd.DataFrame,
-                           group_by_cols: List[str], metric_cols: List[str]) -> pd.DataFrame:
+                           group_by_cols: List[str], metric_cols: List[str],
+                           derived_measures: Optional[bool] = None) -> pd.DataFrame:
         """
         计算两个月数据的对比和环比
         
@@ -465,52 +1664,219 @@ class ExcelDataAnalyzer:
             previous_df: 上月数据
             group_by_cols: 分组维度列
             metric_cols: 指标列
+            derived_measures: 是否计算派生指标，为None时使用分析器的设置
             
         Returns:
             pd.DataFrame: 包含对比和环比的结果
         """
+        if derived_measures is None:
+            derived_measures = self.derived_measures
+        
         try:
             # 合并两个月的数据
-            merged = pd.merge(current_df, previous_df, on=group_by_cols, 
-                            how='outer', suffixes=('_本月', '_上月'))
+            merged = self.backend.merge_periods(current_df, previous_df, group_by_cols)
             
             # 只处理存在的指标列
             available_metrics = [col for col in metric_cols if f'{col}_本月' in merged.columns and f'{col}_上月' in merged.columns]
             
-            # 填充缺失值为0
-            for col in available_metrics:
-                merged[f'{col}_本月'] = merged[f'{col}_本月'].fillna(0)
-                merged[f'{col}_上月'] = merged[f'{col}_上月'].fillna(0)
+            # 按列向量化计算变化量和环比增长率（处理分母为0的情况）
+            current = merged[[f'{col}_本月' for col in available_metrics]]
+            current.columns = available_metrics
+            previous = merged[[f'{col}_上月' for col in available_metrics]]
+            previous.columns = available_metrics
             
-            # 计算环比增长率和绝对变化
-            for col in available_metrics:
-                current_col = f'{col}_本月'
-                previous_col = f'{col}_上月'
-                change_col = f'{col}_变化'
-                growth_col = f'{col}_环比(%)'
-                
-                # 计算绝对变化
-                merged[change_col] = merged[current_col] - merged[previous_col]
-                
-                # 计算环比增长率（处理分母为0的情况）
-                merged[growth_col] = merged.apply(
-                    lambda row: (
-                        round((row[current_col] - row[previous_col]) / row[previous_col] * 100, 2)
-                        if row[previous_col] != 0
-                        else (100.0 if row[current_col] > 0 else 0.0)
-                    ), axis=1
-                )
+            result = self.compare_aggregates(
+                merged[group_by_cols], current, previous, available_metrics, derived_measures
+            )
+            
+            print(f"✓ 环比分析完成，共 {len(result)} 个维度组合")
+            return result
+            
+        except Exception as e:
+            print(f"✗ 对比分析失败: {str(e)}")
+            return pd.DataFrame()
+    
+    def build_month_cube(self, df: pd.DataFrame, dimension_cols: List[str],
+                         metric_cols: List[str]) -> pd.DataFrame:
+        """
+        构建月度立方体：在全部维度的最细组合上预聚合各指标的合计与计数
+        
+        保留维度为空的组合，任意维度子集都可以从立方体再汇总得到与原始行一致的结果。
+        
+        Args:
+            df: 规范化后的月度数据
+            dimension_cols: 全部维度列
+            metric_cols: 指标列
+            
+        Returns:
+            pd.DataFrame: 立方体，列为 维度列 + 指标合计列 + 指标_计数 列 + 记录数
+        """
+        dims = [col for col in dimension_cols if col in df.columns]
+        metrics = [col for col in metric_cols if col in df.columns]
+        grouped = df.groupby(dims, observed=True, dropna=False)
+        
+        cube = pd.concat([
+            grouped[metrics].sum(),
+            grouped[metrics].count().add_suffix('_计数'),
+            grouped.size().rename('记录数'),
+        ], axis=1).reset_index()
+        return cube
+    
+    def _cube_variant(self) -> str:
+        """立方体在旁路缓存中的变体名（随维度列和指标列变化）"""
+        return '立方体:' + '|'.join(self.dimension_columns) + '#' + '|'.join(self.metric_columns)
+    
+    def get_month_cube(self, filename: str, month_data: Optional[pd.DataFrame]) -> Optional[pd.DataFrame]:
+        """
+        获取某个月份的立方体：优先使用内存和旁路缓存，缺失或过期时才读取原始行构建
+        
+        Args:
+            filename: 工作簿路径
+            month_data: 已加载的该月份原始数据（可为None）
+            
+        Returns:
+            Optional[pd.DataFrame]: 立方体，失败时返回None
+        """
+        variant = self._cube_variant()
+        key = (os.path.abspath(filename), variant)
+        if key in self.month_cubes:
+            return self.month_cubes[key]
+        
+        cube = None
+        if self.data_cache is not None:
+            try:
+                cube = self.data_cache.load_frame(filename, variant=variant)
+                if cube is not None:
+                    print(f"✓ 从缓存读取立方体: {filename}（{len(cube)} 个最细组合）")
+            except Exception as e:
+                print(f"⚠️ 读取立方体缓存失败: {str(e)}")
+        
+        # 后台预先构建的立方体（已有缓存时不再使用）
+        building = self.speculative_cubes.pop(key, None)
+        built = False
+        if cube is None and building is not None:
+            try:
+                cube = building.result()
+            except Exception as e:
+                print(f"⚠️ 后台构建立方体失败: {str(e)}")
+            if cube is not None:
+                built = True
+                print(f"✓ 使用后台预先构建的立方体: {filename}（{len(cube)} 个最细组合）")
+        
+        if cube is None:
+            needed = self.dimension_columns + self.metric_columns
+            if month_data is None:
+                # 后台预加载的数据可直接用于构建
+                self.adopt_prefetched()
+                month_data = self.current_month_data if filename == self.current_filename else self.previous_month_data
+            if month_data is None or not all(col in month_data.columns for col in needed):
+                header = read_header(filename)
+                month_data = self.load_excel_data(filename, columns=[col for col in needed if col in header])
+                if month_data is None:
+                    return None
+                self.normalize_frames([month_data])
+            
+            cube = self.build_month_cube(month_data, self.dimension_columns, self.metric_columns)
+            built = True
+            print(f"✓ 立方体构建完成: {filename}（{len(month_data)} 行 → {len(cube)} 个最细组合）")
+        
+        if built and self.data_cache is not None:
+            try:
+                self.data_cache.save_frame(filename, cube, variant=variant)
+            except Exception as e:
+                print(f"⚠️ 写入立方体缓存失败: {str(e)}")
+        
+        self.month_cubes[key] = cube
+        return cube
+    
+    def ensure_month_cubes(self) -> Optional[Tuple[pd.DataFrame, pd.DataFrame]]:
+        """
+        获取本月和上月的立方体，两个月份共享同一维度字典
+        
+        Returns:
+            Optional[Tuple[pd.DataFrame, pd.DataFrame]]: (本月立方体, 上月立方体)，失败时返回None
+        """
+        try:
+            current_cube = self.get_month_cube(self.current_filename, self.current_month_data)
+            previous_cube = self.get_month_cube(self.previous_filename, self.previous_month_data)
+        except Exception as e:
+            print(f"⚠️ 立方体不可用，改为直接汇总原始数据: {str(e)}")
+            return None
+        
+        if current_cube is None or previous_cube is None:
+            return None
+        
+        self.encode_dimension_columns([current_cube, previous_cube], self.dimension_columns)
+        return current_cube, previous_cube
+    
+    def summarize_two_periods(self, current_df: pd.DataFrame, previous_df: pd.DataFrame,
+                              group_by_cols: List[str], metric_cols: List[str],
+                              on_previous_summary: Optional[Callable[[pd.DataFrame], None]] = None
+                              ) -> pd.DataFrame:
+        """
+        单次分组汇总两个月份并直接展开为对比布局
+        
+        两个月份的数据打上期间标记后只做一次分组汇总，再按期间展开为 _上月/_本月 列，
+        省去分别汇总后的外连接合并和缺失值填充；结果与
+        group_and_summarize + calculate_comparison 逐列一致（包括数据类型：
+        某个月份缺少的分组按0补齐后该月份的合计为浮点，与外连接后填充缺失值相同）。
+        
+        Args:
+            current_df: 本月数据
+            previous_df: 上月数据
+            group_by_cols: 分组维度列
+            metric_cols: 指标列
+            on_previous_summary: 取得上月部分汇总结果（与 group_and_summarize 的输出一致）后的回调函数，
+                用于持久化上月汇总；只在全部指标列都参与汇总时调用
+            
+        Returns:
+            pd.DataFrame: 包含对比和环比的结果
+        """
+        try:
+            # 只处理两个月份都存在的指标列
+            available_metrics = [col for col in metric_cols
+                                 if col in current_df.columns and col in previous_df.columns]
+            columns = group_by_cols + available_metrics
             
-            # 重新排列列的顺序，使结果更易读
-            result_columns = group_by_cols.copy()
+            combined = pd.concat([current_df[columns], previous_df[columns]], ignore_index=True)
             for col in available_metrics:
-                result_columns.extend([
-                    f'{col}_上月', f'{col}_本月', f'{col}_变化', f'{col}_环比(%)'
-                ])
+                if not pd.api.types.is_numeric_dtype(combined[col]):
+                    combined[col] = pd.to_numeric(combined[col], errors='coerce')
+            # 期间标记：0为本月，1为上月
+            combined['_期间'] = np.repeat(np.array([0, 1], dtype=np.int8), [len(current_df), len(previous_df)])
+            
+            # 只按区间分组时保留没有数据的区间（合计为0），与 group_and_summarize 补齐区间的结果一致
+            observed = group_by_cols != ['区间']
+            grouped = combined.groupby(group_by_cols + ['_期间'], observed=observed)[available_metrics].sum()
+            periods = grouped.index.get_level_values('_期间')
+            if not (periods == 0).any() or not (periods == 1).any():
+                print("✗ 数据汇总失败")
+                return pd.DataFrame()
+            print(f"✓ 两个月份单次分组汇总完成，共 {len(grouped)} 个分组")
             
-            # 只选择存在的列
-            result_columns = [col for col in result_columns if col in merged.columns]
-            result = merged[result_columns]
+            if on_previous_summary is not None and available_metrics == list(metric_cols):
+                previous_summary = grouped.xs(1, level='_期间').reset_index()
+                # 与 group_and_summarize 的类型一致：上月为整数的指标恢复为int64（拼接时可能被本月的浮点列提升）
+                for col in available_metrics:
+                    if pd.api.types.is_integer_dtype(previous_df[col]):
+                        previous_summary[col] = previous_summary[col].astype(np.int64)
+                on_previous_summary(previous_summary)
+            
+            # 按期间展开：一个月中不存在的分组为NaN，在对比引擎中按0处理
+            wide = grouped.unstack('_期间')
+            keys = wide.index.to_frame(index=False)
+            current = wide.xs(0, axis=1, level='_期间').reset_index(drop=True)
+            previous = wide.xs(1, axis=1, level='_期间').reset_index(drop=True)
+            # 拼接时另一个月份的浮点列、展开时缺失的分组都会把整数合计变为浮点；
+            # 输入为整数且没有缺失分组的一侧恢复为int64，与分别汇总后外连接的类型一致
+            for summary, source in ((current, current_df), (previous, previous_df)):
+                for col in available_metrics:
+                    if pd.api.types.is_integer_dtype(source[col]) and summary[col].notna().all():
+                        summary[col] = summary[col].astype(np.int64)
+            
+            result = self.compare_aggregates(
+                keys, current, previous, available_metrics, self.derived_measures
+            )
             
             print(f"✓ 环比分析完成，共 {len(result)} 个维度组合")
             return result
@@ -519,6 +1885,135 @@ class ExcelDataAnalyzer:
             print(f"✗ 对比分析失败: {str(e)}")
             return pd.DataFrame()
     
+    def get_grouping_sets(self, group_by_cols: List[str], mode: str) -> List[List[str]]:
+        """
+        生成分组集合列表
+        
+        Args:
+            group_by_cols: 分组维度列（按层级从高到低）
+            mode: 'rollup' 为逐层小计（按维度顺序），'cube' 为所有维度组合
+            
+        Returns:
+            List[List[str]]: 分组集合，从最细到最粗，最后一个为空集合（总计）
+        """
+        n = len(group_by_cols)
+        if mode == 'rollup':
+            return [group_by_cols[:k] for k in range(n, -1, -1)]
+        
+        sets = []
+        for size in range(n, -1, -1):
+            for mask in range(2 ** n):
+                subset = [col for i, col in enumerate(group_by_cols) if mask >> (n - 1 - i) & 1]
+                if len(subset) == size:
+                    sets.append(subset)
+        return sets
+    
+    def compute_grouping_sets(self, current_finest: pd.DataFrame, previous_finest: pd.DataFrame,
+                              group_by_cols: List[str], metric_cols: List[str],
+                              mode: str = 'rollup') -> pd.DataFrame:
+        """
+        由最细粒度汇总推导各层级小计（ROLLUP / CUBE）并计算环比
+        
+        原始数据只在最细粒度汇总一次，较粗的组合都从最细粒度结果再汇总得到。
+        小计行中被汇总掉的维度标记为"小计"，总计行标记为"合计"，并用"汇总层级"列区分。
+        维度值为空的行在各层级都作为单独的分组（标记为"空值"，排在同层级其他取值之后），
+        因此每一层级覆盖相同的行，明细之和等于小计与合计。
+        
+        Args:
+            current_finest: 本月最细粒度汇总（保留空维度值）
+            previous_finest: 上月最细粒度汇总（保留空维度值）
+            group_by_cols: 分组维度列
+            metric_cols: 指标列
+            mode: 'rollup' 或 'cube'
+            
+        Returns:
+            pd.DataFrame: 明细、小计、总计行合并后的对比结果
+        """
+        available_metrics = [col for col in metric_cols
+                             if col in current_finest.columns and col in previous_finest.columns]
+        finest = pd.concat([current_finest, previous_finest], ignore_index=True)
+        finest['_期间'] = np.repeat(np.array([0, 1], dtype=np.int8),
+                                    [len(current_finest), len(previous_finest)])
+        # 总计行按常量键分组，保证展开后仍为二维表
+        finest['_总计'] = 0
+        
+        parts = []
+        for subset in self.get_grouping_sets(group_by_cols, mode):
+            grouped = finest.groupby((subset or ['_总计']) + ['_期间'], observed=True,
+                                     dropna=False)[available_metrics].sum()
+            wide = grouped.unstack('_期间')
+            if subset:
+                keys = wide.index.to_frame(index=False).astype(object)
+            else:
+                keys = pd.DataFrame(index=range(len(wide)))
+            for period in (0, 1):
+                if period not in wide.columns.get_level_values('_期间'):
+                    for col in available_metrics:
+                        wide[(col, period)] = np.nan
+            current = wide.xs(0, axis=1, level='_期间').reset_index(drop=True)
+            previous = wide.xs(1, axis=1, level='_期间').reset_index(drop=True)
+            
+            part = self.compare_aggregates(keys, current, previous, available_metrics, self.derived_measures)
+            level = '明细' if len(subset) == len(group_by_cols) else ('合计' if not subset else '小计')
+            for col in group_by_cols:
+                if col not in subset:
+                    part[col] = '合计' if not subset else '小计'
+            leading = group_by_cols + ['汇总层级']
+            part['汇总层级'] = level
+            parts.append(part[leading + [col for col in part.columns if col not in leading]])
+        
+        result = pd.concat(parts, ignore_index=True)
+        
+        # 排序：小计行紧跟在其所属的明细行之后，总计行在最后
+        sort_keys = []
+        for col in group_by_cols:
+            values = result[col]
+            is_marker = values.isin(['小计', '合计']) & (result['汇总层级'] != '明细')
+            codes = np.full(len(values), np.iinfo(np.int64).max)
+            try:
+                factor, _ = pd.factorize(values[~is_marker], sort=True)
+            except TypeError:
+                factor, _ = pd.factorize(values[~is_marker])
+            # 空值排在同层级其他取值之后、小计之前
+            codes[~is_marker.to_numpy()] = np.where(factor < 0, np.iinfo(np.int64).max - 1, factor)
+            sort_keys.append(codes)
+        order = np.lexsort(sort_keys[::-1]) if sort_keys else np.arange(len(result))
+        result = result.iloc[order].reset_index(drop=True)
+        for col in group_by_cols:
+            result[col] = result[col].fillna(NULL_KEY_LABEL)
+        
+        print(f"✓ 分组集合计算完成（{mode.upper()}），共 {len(result)} 行，"
+              f"其中小计/合计 {int((result['汇总层级'] != '明细').sum())} 行")
+        return result
+    
+    def get_subtotal_mode_choice(self) -> Optional[str]:
+        """
+        询问是否计算各层级小计
+        
+        Returns:
+            Optional[str]: 'rollup'、'cube'，不计算小计时返回None
+        """
+        print("\n💡 已选择全部维度，可同时计算各层级小计：")
+        print("   1. 不计算小计（直接回车）")
+        print("   2. 逐层小计 ROLLUP（按维度顺序逐层汇总）")
+        print("   3. 全组合小计 CUBE（所有维度组合）")
+        while True:
+            try:
+                choice = input("请选择小计方式（1/2/3）: ").strip()
+                if choice in ('', '1'):
+                    return None
+                elif choice == '2':
+                    print("✓ 已选择：ROLLUP逐层小计")
+                    return 'rollup'
+                elif choice == '3':
+                    print("✓ 已选择：CUBE全组合小计")
+                    return 'cube'
+                else:
+                    print("✗ 无效选择，请输入1、2或3")
+            except KeyboardInterrupt:
+                print("\n\n程序已退出")
+                sys.exit(0)
+    
     def format_and_display_results(self, result_df: pd.DataFrame, analysis_type: str = "") -> None:
         """
         格式化并显示分析结果
@@ -581,31 +2076,268 @@ class ExcelDataAnalyzer:
         self.display_dimension_options(self.dimension_columns)
         selected_dimensions = self.get_user_dimension_selection(self.dimension_columns)
         
+        # 选择全部维度时可附加各层级小计
+        subtotal_mode = None
+        if len(selected_dimensions) > 1 and len(selected_dimensions) == len(self.dimension_columns):
+            if self.uses_extended_aggregates():
+                print("💡 已配置附加统计量，小计只支持合计，本次不计算小计")
+            else:
+                subtotal_mode = self.get_subtotal_mode_choice()
+        
         # 执行数据分析
         print(f"\n⚙️ 正在执行按维度汇总分析...")
         print("-" * 40)
         
-        print("正在处理本月数据...")
-        current_summary = self.group_and_summarize(
-            self.current_month_data, selected_dimensions, self.metric_columns
-        )
+        return self.dimension_comparison(selected_dimensions, subtotal_mode)
+    
+    def dimension_spec(self, selected_dimensions: List[str], subtotal_mode: Optional[str] = None) -> Dict:
+        """按维度汇总的分析参数（对比结果磁盘缓存的键）"""
+        return self.comparison_spec('维度汇总', dimensions=selected_dimensions, subtotal=subtotal_mode,
+                                    **self.aggregate_params())
+    
+    def dimension_comparison(self, selected_dimensions: List[str],
+                             subtotal_mode: Optional[str] = None) -> pd.DataFrame:
+        """
+        按维度汇总两个月份并计算环比（先查对比结果磁盘缓存）
         
-        print("正在处理上月数据...")
-        previous_summary = self.group_and_summarize(
-            self.previous_month_data, selected_dimensions, self.metric_columns
+        Args:
+            selected_dimensions: 分组维度列
+            subtotal_mode: 小计模式（'rollup' / 'cube'），为None时不计算小计
+            
+        Returns:
+            pd.DataFrame: 分析结果
+        """
+        return self.cached_comparison(
+            self.dimension_spec(selected_dimensions, subtotal_mode),
+            lambda: self.compute_dimension_comparison(selected_dimensions, subtotal_mode)
         )
+    
+    def compute_dimension_comparison(self, selected_dimensions: List[str],
+                                     subtotal_mode: Optional[str] = None) -> pd.DataFrame:
+        """
+        按维度汇总两个月份并计算环比
         
-        if current_summary.empty or previous_summary.empty:
+        Args:
+            selected_dimensions: 分组维度列
+            subtotal_mode: 小计模式（'rollup' / 'cube'），为None时不计算小计
+            
+        Returns:
+            pd.DataFrame: 分析结果
+        """
+        # 优先从月度立方体再汇总，立方体缺失或过期时才读取原始行（立方体只保存合计和计数）
+        cubes = None
+        if not self.streaming and self.use_cube and not self.uses_extended_aggregates():
+            cubes = self.ensure_month_cubes()
+        
+        if cubes is not None:
+            current_source, previous_source = cubes
+        elif not self.streaming:
+            # 上月汇总结果可能已持久化，先只加载本月数据
+            columns = selected_dimensions + self.metric_columns + self.distinct_columns
+            if not self.ensure_month_data(columns, include_previous=False):
+                return pd.DataFrame()
+            current_source, previous_source = self.current_month_data, None
+        else:
+            current_source, previous_source = None, None
+        
+        if subtotal_mode is not None:
+            print("正在计算最细粒度汇总...")
+            if self.streaming:
+                current_finest = self.stream_group_and_summarize(
+                    self.current_filename, selected_dimensions, self.metric_columns, dropna=False
+                )
+            else:
+                current_finest = self.group_and_summarize(
+                    current_source, selected_dimensions, self.metric_columns, dropna=False
+                )
+            previous_finest = self.summarize_previous_month(
+                selected_dimensions, self.metric_columns, previous_source, dropna=False
+            )
+            
+            if current_finest.empty or previous_finest.empty:
+                print("✗ 数据汇总失败")
+                return pd.DataFrame()
+            
+            print("正在由最细粒度推导各层级小计...")
+            return self.compute_grouping_sets(
+                current_finest, previous_finest, selected_dimensions, self.metric_columns, subtotal_mode
+            )
+        
+        if cubes is not None:
+            print("正在汇总两个月份数据并计算环比对比...")
+            return self.summarize_two_periods(
+                current_source, previous_source, selected_dimensions, self.metric_columns
+            )
+        
+        previous_summary = None
+        if self.streaming:
+            print("正在流式处理本月数据...")
+            current_summary = self.stream_group_and_summarize(
+                self.current_filename, selected_dimensions, self.metric_columns
+            )
+        else:
+            if not self.uses_extended_aggregates():
+                # 上月汇总已保存时只汇总本月；否则两个月份单次分组汇总，顺带保存上月部分
+                params = self.previous_group_params(selected_dimensions, self.metric_columns)
+                previous_summary = self.load_previous_aggregate('分组汇总', params)
+                if previous_summary is None:
+                    previous_data = self.previous_month_frame(
+                        selected_dimensions + self.metric_columns + self.distinct_columns
+                    )
+                    if previous_data is None:
+                        return pd.DataFrame()
+                    print("正在汇总两个月份数据并计算环比对比...")
+                    return self.summarize_two_periods(
+                        current_source, previous_data, selected_dimensions, self.metric_columns,
+                        on_previous_summary=lambda summary: self.save_previous_aggregate(
+                            '分组汇总', params, summary
+                        )
+                    )
+            print("正在汇总本月数据...")
+            current_summary = self.group_and_summarize(
+                current_source, selected_dimensions, self.metric_columns
+            )
+        
+        if previous_summary is None:
+            print("正在处理上月数据...")
+            previous_summary = self.summarize_previous_month(
+                selected_dimensions, self.metric_columns, previous_source
+            )
+        
+        if current_summary.empty or previous_summary.empty:
             print("✗ 数据汇总失败")
             return pd.DataFrame()
         
         print("正在计算环比对比...")
         final_result = self.calculate_comparison(
-            current_summary, previous_summary, selected_dimensions, self.metric_columns
+            current_summary, previous_summary, selected_dimensions,
+            self.aggregate_output_columns(self.metric_columns)
         )
         
         return final_result
     
+    def _previous_aggregate_variant(self, kind: str, params: Dict) -> str:
+        """上月汇总结果在旁路缓存中的变体名（汇总类型 + 规范化的查询参数）"""
+        return f"上月汇总:{kind}:v{RESULT_FORMAT_VERSION}:" + json.dumps(params, ensure_ascii=False, sort_keys=True, default=str)
+    
+    def load_previous_aggregate(self, kind: str, params: Dict) -> Optional[pd.DataFrame]:
+        """
+        读取已保存的上月汇总结果
+        
+        Args:
+            kind: 汇总类型
+            params: 查询参数
+            
+        Returns:
+            Optional[pd.DataFrame]: 命中时返回汇总结果，否则返回None
+        """
+        if self.data_cache is None:
+            return None
+        try:
+            cached = self.data_cache.load_frame(
+                self.previous_filename, variant=self._previous_aggregate_variant(kind, params)
+            )
+        except Exception as e:
+            print(f"⚠️ 读取上月汇总缓存失败: {str(e)}")
+            return None
+        if cached is not None:
+            print(f"✓ 复用已保存的上月{kind}结果，不再读取上月数据")
+        return cached
+    
+    def save_previous_aggregate(self, kind: str, params: Dict, result: Optional[pd.DataFrame]) -> None:
+        """
+        保存上月汇总结果
+        
+        Args:
+            kind: 汇总类型
+            params: 查询参数
+            result: 汇总结果（为空时不保存）
+        """
+        if self.data_cache is None or result is None or result.empty:
+            return
+        try:
+            self.data_cache.save_frame(
+                self.previous_filename, result, variant=self._previous_aggregate_variant(kind, params)
+            )
+        except Exception as e:
+            print(f"⚠️ 写入上月汇总缓存失败: {str(e)}")
+    
+    def persisted_previous_aggregate(self, kind: str, params: Dict,
+                                     compute: Callable[[], pd.DataFrame]) -> pd.DataFrame:
+        """
+        上月汇总结果的持久化复用
+        
+        上月文件在月末后不再变化，其汇总结果按查询参数保存在上月工作簿的旁路缓存中；
+        之后的运行直接读取，不再加载和汇总上月数据。上月文件变化后条目自动失效。
+        
+        Args:
+            kind: 汇总类型
+            params: 查询参数
+            compute: 缓存未命中时计算汇总结果的函数
+            
+        Returns:
+            pd.DataFrame: 上月汇总结果
+        """
+        cached = self.load_previous_aggregate(kind, params)
+        if cached is not None:
+            return cached
+        
+        result = compute()
+        self.save_previous_aggregate(kind, params, result)
+        return result
+    
+    def previous_month_frame(self, columns: List[str]) -> Optional[pd.DataFrame]:
+        """
+        按需加载上月数据（只在上月汇总结果未持久化时调用）
+        
+        Args:
+            columns: 需要的列
+            
+        Returns:
+            Optional[pd.DataFrame]: 上月数据，流式模式或加载失败时返回None
+        """
+        if self.streaming or not self.ensure_month_data(columns):
+            return None
+        return self.previous_month_data
+    
+    def summarize_previous_month(self, group_by_cols: List[str], metric_cols: List[str],
+                                 source: Optional[pd.DataFrame] = None, dropna: bool = True) -> pd.DataFrame:
+        """
+        上月分组汇总：从立方体汇总时直接计算，从原始数据汇总时结果持久化复用
+        
+        Args:
+            group_by_cols: 分组维度列
+            metric_cols: 指标列
+            source: 上月立方体，为None时汇总原始数据
+            dropna: 是否丢弃维度值为空的行
+            
+        Returns:
+            pd.DataFrame: 上月汇总结果
+        """
+        if source is not None:
+            return self.group_and_summarize(source, group_by_cols, metric_cols, dropna=dropna)
+        
+        def compute() -> pd.DataFrame:
+            if self.streaming:
+                return self.stream_group_and_summarize(
+                    self.previous_filename, group_by_cols, metric_cols, dropna=dropna
+                )
+            previous_data = self.previous_month_frame(group_by_cols + metric_cols + self.distinct_columns)
+            if previous_data is None:
+                return pd.DataFrame()
+            return self.group_and_summarize(previous_data, group_by_cols, metric_cols, dropna=dropna)
+        
+        return self.persisted_previous_aggregate(
+            '分组汇总', self.previous_group_params(group_by_cols, metric_cols, dropna), compute
+        )
+    
+    def previous_group_params(self, group_by_cols: List[str], metric_cols: List[str],
+                              dropna: bool = True) -> Dict:
+        """上月分组汇总的查询参数（持久化的键）"""
+        params = {'dimensions': group_by_cols, 'metrics': metric_cols, 'dropna': dropna}
+        params.update(self.aggregate_params())
+        return params
+    
     def run_metric_interval_summary(self) -> pd.DataFrame:
         """
         执行按指标区间汇总分析模式
@@ -624,117 +2356,821 @@ class ExcelDataAnalyzer:
         self.display_metric_options(self.metric_columns)
         selected_metric = self.get_user_metric_selection(self.metric_columns)
         
+        # 按需加载指标列
+        if not self.streaming and not self.ensure_month_data(self.metric_columns, include_previous=False):
+            return pd.DataFrame()
+        
         # 分析指标范围
         min_val, max_val = self.analyze_metric_range(selected_metric)
         
-        # 获取区间切分点
-        cutpoints = self.get_interval_cutpoints(selected_metric, min_val, max_val)
+        # 获取区间切分方案
+        schemes = self.get_interval_cutpoints(selected_metric, min_val, max_val)
         
-        # 创建区间标签
-        labels = self.create_interval_labels(cutpoints, min_val, max_val)
-        print(f"✓ 创建区间标签: {labels}")
+        self.last_interval_query = {'metric': selected_metric, 'min': min_val, 'max': max_val}
         
         # 执行数据分析
         print(f"\n⚙️ 正在执行按指标区间汇总分析...")
         print("-" * 40)
         
-        print("正在对本月数据进行分箱...")
-        current_binned = self.apply_interval_binning(
-            self.current_month_data, selected_metric, cutpoints, labels
-        )
+        return self.compute_interval_comparison(selected_metric, schemes, min_val, max_val)
+    
+    def stream_interval_summaries(self, filename: str, metric_name: str,
+                                  schemes: Dict[str, List[float]],
+                                  labels: Dict[str, List[str]],
+                                  sum_cols: List[str]) -> Dict[str, pd.DataFrame]:
+        """
+        流式读取工作簿一次，同时按全部切分方案分箱汇总
         
-        print("正在对上月数据进行分箱...")
-        previous_binned = self.apply_interval_binning(
-            self.previous_month_data, selected_metric, cutpoints, labels
-        )
+        Args:
+            filename: Excel文件路径
+            metric_name: 分箱指标列名
+            schemes: {方案名: 切分点}
+            labels: {方案名: 区间标签}
+            sum_cols: 需要汇总的指标列
+            
+        Returns:
+            Dict[str, pd.DataFrame]: {方案名: 区间汇总表}，失败时返回空字典
+        """
+        try:
+            accumulator = BinAccumulator(metric_name, schemes, sum_cols)
+            row_count = 0
+            for batch in iter_row_batches(filename, self.batch_size, columns=[metric_name] + sum_cols):
+                row_count += len(batch)
+                for col in [metric_name] + sum_cols:
+                    batch[col] = pd.to_numeric(batch[col], errors='coerce')
+                accumulator.update(batch)
+            
+            print(f"✓ 流式分箱完成，共读取 {row_count} 行，{len(schemes)} 套切分方案")
+            return {name: accumulator.summarize(name, labels[name]) for name in schemes}
+            
+        except Exception as e:
+            print(f"✗ 流式汇总失败: {str(e)}")
+            return {}
+    
+    def comparison_spec(self, mode: str, **params) -> Dict:
+        """
+        规范化的分析参数，作为对比结果磁盘缓存的键
+        
+        Args:
+            mode: 分析模式
+            **params: 模式相关参数（维度、分箱指标、切分点等）
+            
+        Returns:
+            Dict: 分析参数
+        """
+        spec = {'mode': mode}
+        spec.update(self.comparison_fields())
+        spec.update(params)
+        return spec
+    
+    def comparison_fields(self) -> Dict:
+        """各分析模式共有的分析参数（指标列、是否含派生指标）"""
+        return {'metrics': list(self.metric_columns), 'derived': bool(self.derived_measures)}
+    
+    def cached_comparison(self, spec: Dict, compute: Callable[[], pd.DataFrame]) -> pd.DataFrame:
+        """
+        先查对比结果磁盘缓存，未命中时计算并写入缓存（耗时记录在 last_compute_seconds）
+        
+        Args:
+            spec: 分析参数
+            compute: 计算对比结果的函数
+            
+        Returns:
+            pd.DataFrame: 分析结果
+        """
+        start = time.perf_counter()
+        cached = None
+        if self.result_cache is not None:
+            try:
+                cached = self.result_cache.load(self.current_filename, self.previous_filename, spec)
+            except OSError as e:
+                print(f"⚠️ 对比结果缓存读取失败，重新计算: {str(e)}")
+        if cached is not None:
+            print(f"✓ 命中对比结果缓存，跳过数据加载与汇总计算，共 {len(cached)} 个维度组合")
+            self.last_compute_seconds = time.perf_counter() - start
+            return cached
+        
+        result = compute()
+        self.last_compute_seconds = time.perf_counter() - start
+        if self.result_cache is not None and not result.empty:
+            try:
+                self.result_cache.save(self.current_filename, self.previous_filename, spec, result)
+            except OSError as e:
+                print(f"⚠️ 对比结果缓存写入失败: {str(e)}")
+        return result
+    
+    def interval_summaries(self, period: int, metric_name: str, schemes: Dict[str, List[float]],
+                           labels: Dict[str, List[str]], sum_cols: List[str]) -> Dict[str, pd.DataFrame]:
+        """
+        单个月份按各切分方案的区间汇总
+        
+        先查会话内结果缓存；上月再查已保存的汇总结果；只计算仍未命中的方案。
+        
+        Args:
+            period: 期间编号（0为本月，1为上月）
+            metric_name: 分箱指标列名
+            schemes: {方案名: 切分点}
+            labels: {方案名: 区间标签}
+            sum_cols: 需要汇总的指标列
+            
+        Returns:
+            Dict[str, pd.DataFrame]: {方案名: 区间汇总表}
+        """
+        filename = self.current_filename if period == 0 else self.previous_filename
+        fingerprint = self.result_memo.file_fingerprint(filename)
+        
+        summaries, memo_keys, params = {}, {}, {}
+        for name, cutpoints in schemes.items():
+            memo_keys[name] = ('区间', fingerprint, metric_name, tuple(sum_cols), tuple(cutpoints))
+            params[name] = {'metric': metric_name, 'metrics': sum_cols, 'cutpoints': cutpoints}
+            cached = self.result_memo.get(memo_keys[name])
+            if cached is None and period == 1:
+                cached = self.load_previous_aggregate('区间汇总', params[name])
+            if cached is not None:
+                summaries[name] = cached
+        
+        missing = {name: cutpoints for name, cutpoints in schemes.items() if name not in summaries}
+        if not missing:
+            print(f"✓ 命中结果缓存: {os.path.basename(filename)}")
+            return summaries
+        
+        if self.streaming:
+            computed = self.stream_interval_summaries(filename, metric_name, missing, labels, sum_cols)
+        else:
+            month_data = self.current_month_data if period == 0 else \
+                self.previous_month_frame(self.metric_columns)
+            if month_data is None:
+                return {}
+            index = self.get_interval_index(filename, month_data, metric_name)
+            computed = {name: index.summarize(cutpoints, labels[name])
+                        for name, cutpoints in missing.items()}
+        
+        for name, summary in computed.items():
+            self.result_memo.put(memo_keys[name], summary)
+            if period == 1:
+                self.save_previous_aggregate('区间汇总', params[name], summary)
+        summaries.update(computed)
+        return summaries
+    
+    def print_memo_stats(self) -> None:
+        """输出会话内结果缓存的命中统计，用于调整内存预算"""
+        stats = self.result_memo.stats()
+        if stats['hits'] + stats['misses'] == 0:
+            return
+        print(f"🧠 结果缓存：命中 {stats['hits']} 次 / 未命中 {stats['misses']} 次"
+              f"（命中率 {stats['hit_rate']:.1%}），{stats['entries']} 个结果"
+              f"占用 {stats['bytes'] / 1024 / 1024:.2f}MB / {stats['max_bytes'] / 1024 / 1024:.0f}MB，"
+              f"淘汰 {stats['evictions']} 次")
+    
+    def interval_spec(self, metric_name: str, schemes: Dict[str, List[float]]) -> Dict:
+        """按指标区间汇总的分析参数（对比结果磁盘缓存的键）"""
+        return self.comparison_spec('区间汇总', metric=metric_name, schemes=schemes)
+    
+    def compute_interval_comparison(self, metric_name: str, schemes: Dict[str, List[float]],
+                                    min_val: Optional[float] = None,
+                                    max_val: Optional[float] = None) -> pd.DataFrame:
+        """
+        按切分方案计算区间环比（先查对比结果磁盘缓存）
+        
+        Args:
+            metric_name: 分箱指标列名
+            schemes: {方案名: 升序切分点}
+            min_val: 最小值，为None时由两个月份合并的分位数草图得到
+            max_val: 最大值，为None时由两个月份合并的分位数草图得到
+            
+        Returns:
+            pd.DataFrame: 分析结果
+        """
+        def compute() -> pd.DataFrame:
+            low, high = min_val, max_val
+            if low is None or high is None:
+                sketch = self.get_combined_sketch(metric_name)
+                low, high = sketch.min, sketch.max
+            return self.summarize_interval_schemes(metric_name, schemes, low, high)
+        
+        return self.cached_comparison(self.interval_spec(metric_name, schemes), compute)
+    
+    def summarize_interval_schemes(self, metric_name: str, schemes: Dict[str, List[float]],
+                                   min_val: float, max_val: float) -> pd.DataFrame:
+        """
+        按一套或多套切分方案对两个月份分箱汇总并计算环比
+        
+        常规模式下使用排序前缀和索引，任意切分点只需二分查找边界并对前缀和作差，与数据行数无关；
+        流式模式下每个文件只扫描一次，在同一次扫描中为全部方案分箱。
+        多套方案时结果按方案纵向堆叠，首列为"方案"。
         
+        Args:
+            metric_name: 分箱指标列名
+            schemes: {方案名: 升序切分点}
+            min_val: 最小值
+            max_val: 最大值
+            
+        Returns:
+            pd.DataFrame: 分析结果
+        """
         # 其他指标列（排除用于分箱的指标）
-        other_metrics = [col for col in self.metric_columns if col != selected_metric]
+        other_metrics = [col for col in self.metric_columns if col != metric_name]
+        
+        labels = {}
+        for name, cutpoints in schemes.items():
+            labels[name] = self.create_interval_labels(cutpoints, min_val, max_val)
+            tag = '' if len(schemes) == 1 else f" [{name}]"
+            print(f"✓ 创建区间标签{tag}: {labels[name]}")
+        
+        if self.streaming:
+            print("正在流式分箱并汇总两个月份数据...")
+        else:
+            print("正在基于排序索引按区间汇总两个月份数据...")
+        current_summaries = self.interval_summaries(0, metric_name, schemes, labels, other_metrics)
+        previous_summaries = self.interval_summaries(1, metric_name, schemes, labels, other_metrics)
+        
+        results = []
+        for name in schemes:
+            current_summary = current_summaries.get(name, pd.DataFrame())
+            previous_summary = previous_summaries.get(name, pd.DataFrame())
+            if current_summary.empty or previous_summary.empty:
+                print("✗ 数据汇总失败")
+                return pd.DataFrame()
+            
+            tag = '' if len(schemes) == 1 else f" [{name}]"
+            print(f"正在计算环比对比{tag}...")
+            result = self.calculate_comparison(
+                current_summary, previous_summary, ['区间'], other_metrics
+            )
+            if len(schemes) > 1:
+                # 各方案的区间标签不同，堆叠时区间列转为普通文本
+                result['区间'] = result['区间'].astype(str)
+                result.insert(0, '方案', name)
+            results.append(result)
+        
+        if len(results) == 1:
+            return results[0]
+        return pd.concat(results, ignore_index=True)
+    
+    def rebin_interactively(self, result_df: pd.DataFrame) -> pd.DataFrame:
+        """
+        区间分析完成后，允许分析人员反复尝试新的切分点（同样支持多套命名方案）
+        
+        Args:
+            result_df: 当前分析结果
+            
+        Returns:
+            pd.DataFrame: 最后一次分析结果
+        """
+        query = self.last_interval_query
+        if query is None:
+            return result_df
+        
+        while True:
+            try:
+                user_input = input("\n🔁 输入新的切分点重新分箱（直接回车结束）: ").strip()
+            except KeyboardInterrupt:
+                print("\n\n程序已退出")
+                sys.exit(0)
+            
+            if not user_input:
+                return result_df
+            
+            schemes = self.parse_cutpoint_schemes(user_input, query['metric'], query['min'], query['max'])
+            if schemes is None:
+                continue
+            
+            new_result = self.compute_interval_comparison(
+                query['metric'], schemes, query['min'], query['max']
+            )
+            if not new_result.empty:
+                result_df = new_result
+                self.format_and_display_results(result_df, "按指标区间汇总")
+    
+    def get_optional_dimension(self, dimensions: List[str]) -> Optional[str]:
+        """
+        获取可选的附加维度（直接回车跳过）
+        
+        Args:
+            dimensions: 可选维度列表
+            
+        Returns:
+            Optional[str]: 选中的维度列，跳过时返回None
+        """
+        if not dimensions:
+            return None
+        
+        print("\n📊 可附加一个维度列参与交叉：")
+        for i, dim in enumerate(dimensions, 1):
+            print(f"{i:2d}. {dim}")
+        
+        while True:
+            try:
+                selection = input("\n请选择附加维度（输入数字，直接回车跳过）: ").strip()
+                if not selection:
+                    print("✓ 不附加维度")
+                    return None
+                
+                idx = int(selection)
+                if 1 <= idx <= len(dimensions):
+                    print(f"✓ 已选择维度: {dimensions[idx - 1]}")
+                    return dimensions[idx - 1]
+                print(f"✗ 无效的选择: {idx}，请输入1-{len(dimensions)}之间的数字")
+                
+            except ValueError:
+                print("✗ 输入格式错误，请输入数字")
+            except KeyboardInterrupt:
+                print("\n\n程序已退出")
+                sys.exit(0)
+    
+    def get_single_cutpoints(self, metric_name: str) -> Tuple[List[float], List[str]]:
+        """
+        分析指标范围并获取一组切分点（交叉分箱时每个指标只使用一套方案）
         
-        print("正在按区间汇总本月数据...")
-        current_summary = self.group_and_summarize(
-            current_binned, ['区间'], other_metrics
+        Args:
+            metric_name: 指标列名
+            
+        Returns:
+            Tuple[List[float], List[str]]: (切分点, 区间标签)
+        """
+        min_val, max_val = self.analyze_metric_range(metric_name)
+        schemes = self.get_interval_cutpoints(metric_name, min_val, max_val)
+        name, cutpoints = next(iter(schemes.items()))
+        if len(schemes) > 1:
+            print(f"⚠️ 交叉分箱每个指标只使用一套方案，已选用 [{name}]")
+        
+        labels = self.create_interval_labels(cutpoints, min_val, max_val)
+        print(f"✓ 创建区间标签: {labels}")
+        return cutpoints, labels
+    
+    def run_cross_interval_summary(self) -> pd.DataFrame:
+        """
+        执行按双指标交叉区间汇总分析模式
+        
+        Returns:
+            pd.DataFrame: 分析结果
+        """
+        print(f"\n🎯 模式三：按双指标交叉区间汇总分析")
+        print("-" * 60)
+        
+        if len(self.metric_columns) < 2:
+            print("✗ 至少需要两个指标列才能交叉分箱")
+            return pd.DataFrame()
+        
+        # 依次选择两个分箱指标和可选的附加维度
+        self.display_metric_options(self.metric_columns)
+        x_metric = self.get_user_metric_selection(self.metric_columns)
+        remaining = [col for col in self.metric_columns if col != x_metric]
+        self.display_metric_options(remaining)
+        y_metric = self.get_user_metric_selection(remaining)
+        dimension = self.get_optional_dimension(self.dimension_columns)
+        
+        # 按需加载用到的列
+        columns = ([dimension] if dimension else []) + self.metric_columns
+        if not self.streaming and not self.ensure_month_data(columns, include_previous=False):
+            return pd.DataFrame()
+        
+        x_cutpoints, x_labels = self.get_single_cutpoints(x_metric)
+        y_cutpoints, y_labels = self.get_single_cutpoints(y_metric)
+        
+        print(f"\n⚙️ 正在执行按双指标交叉区间汇总分析...")
+        print("-" * 40)
+        
+        return self.compute_cross_comparison(
+            (x_metric, x_cutpoints, x_labels), (y_metric, y_cutpoints, y_labels), dimension
         )
+    
+    def compute_cross_comparison(self, x_binning: Tuple[str, List[float], List[str]],
+                                 y_binning: Tuple[str, List[float], List[str]],
+                                 dimension: Optional[str] = None) -> pd.DataFrame:
+        """
+        计算交叉区间环比（先查对比结果磁盘缓存）
         
-        print("正在按区间汇总上月数据...")
-        previous_summary = self.group_and_summarize(
-            previous_binned, ['区间'], other_metrics
+        Args:
+            x_binning: 第一个分箱参数 (指标列名, 切分点, 区间标签)
+            y_binning: 第二个分箱参数 (指标列名, 切分点, 区间标签)
+            dimension: 附加的维度列
+            
+        Returns:
+            pd.DataFrame: 分析结果
+        """
+        spec = self.comparison_spec('交叉区间汇总', x=[x_binning[0], x_binning[1]],
+                                    y=[y_binning[0], y_binning[1]], dimension=dimension)
+        return self.cached_comparison(
+            spec, lambda: self.summarize_cross_bins(x_binning, y_binning, dimension)
         )
+    
+    def summarize_cross_bins(self, x_binning: Tuple[str, List[float], List[str]],
+                             y_binning: Tuple[str, List[float], List[str]],
+                             dimension: Optional[str] = None) -> pd.DataFrame:
+        """
+        两个指标交叉分箱（可附加一个维度）后计算环比
         
+        两个月份累计到同一个二维直方图中，区间编码由 np.searchsorted 向量化计算，
+        各单元格合计由 np.bincount 一次得到；流式模式下按批次累计。
+        上月的交叉汇总结果已保存时直接复用，只累计本月数据。
+        
+        Args:
+            x_binning: 第一个分箱参数 (指标列名, 切分点, 区间标签)
+            y_binning: 第二个分箱参数 (指标列名, 切分点, 区间标签)
+            dimension: 附加的维度列
+            
+        Returns:
+            pd.DataFrame: 分析结果
+        """
+        x_metric, x_cutpoints, x_labels = x_binning
+        y_metric, y_cutpoints, y_labels = y_binning
+        
+        # 汇总两个分箱指标以外的指标；没有其他指标时汇总分箱指标本身
+        sum_cols = [col for col in self.metric_columns if col not in (x_metric, y_metric)]
+        if not sum_cols:
+            sum_cols = [x_metric, y_metric]
+        
+        accumulator = CrossBinAccumulator(x_metric, x_cutpoints, y_metric, y_cutpoints,
+                                          sum_cols, dimension)
+        source_cols = ([dimension] if dimension else []) + \
+            list(dict.fromkeys([x_metric, y_metric] + sum_cols))
+        numeric_cols = source_cols[1:] if dimension else source_cols
+        
+        def accumulate(period: int) -> None:
+            print(f"正在交叉分箱{'本月' if period == 0 else '上月'}数据...")
+            filename = self.current_filename if period == 0 else self.previous_filename
+            if self.streaming:
+                for batch in iter_row_batches(filename, self.batch_size, columns=source_cols):
+                    for col in numeric_cols:
+                        batch[col] = pd.to_numeric(batch[col], errors='coerce')
+                    accumulator.update(batch, period)
+            else:
+                month_data = self.current_month_data if period == 0 else \
+                    self.previous_month_frame(source_cols)
+                if month_data is None:
+                    raise ValueError("上月数据加载失败")
+                accumulator.update(month_data, period)
+        
+        def summarize_previous() -> pd.DataFrame:
+            accumulate(1)
+            return accumulator.summarize(1, x_labels, y_labels)
+        
+        try:
+            accumulate(0)
+            params = {'x': [x_metric, x_cutpoints], 'y': [y_metric, y_cutpoints],
+                      'dimension': dimension, 'metrics': sum_cols}
+            previous_summary = self.persisted_previous_aggregate('交叉分箱', params, summarize_previous)
+        except Exception as e:
+            print(f"✗ 交叉分箱失败: {str(e)}")
+            return pd.DataFrame()
+        
+        current_summary = accumulator.summarize(0, x_labels, y_labels)
         if current_summary.empty or previous_summary.empty:
             print("✗ 数据汇总失败")
             return pd.DataFrame()
         
+        keys = [col for col in current_summary.columns if col not in sum_cols]
         print("正在计算环比对比...")
-        final_result = self.calculate_comparison(
-            current_summary, previous_summary, ['区间'], other_metrics
-        )
+        return self.calculate_comparison(current_summary, previous_summary, keys, sum_cols)
+    
+    def discover_snapshots(self, directory: str) -> List[Tuple[str, str]]:
+        """
+        查找目录下所有 数据_YYYY-MM-DD.xlsx 快照文件
         
-        return final_result
+        同一个月有多个快照时只保留日期最晚的一个。
+        
+        Args:
+            directory: 目录路径
+            
+        Returns:
+            List[Tuple[str, str]]: 按日期排序的 (日期, 文件路径) 列表
+        """
+        by_month = {}
+        for path in glob.glob(os.path.join(directory, "数据_*.xlsx")):
+            date_str = os.path.basename(path)[len("数据_"):-len(".xlsx")]
+            if not self.validate_date_format(date_str):
+                continue
+            month = date_str[:7]
+            if month not in by_month or date_str > by_month[month][0]:
+                by_month[month] = (date_str, path)
+        
+        return sorted(by_month.values())
     
-    def run(self) -> None:
-        """运行主程序"""
-        print("="*80)
-        print("🎯 欢迎使用交互式Excel数据分析工具 V2.0")
-        print("="*80)
-        print("功能：智能分析Excel文件，支持双模式分析")
-        print("模式一：按维度汇总 | 模式二：按指标区间汇总")
-        print()
+    def build_time_series(self, monthly_data: Dict[str, pd.DataFrame], group_by_cols: List[str],
+                          metric_cols: List[str],
+                          window: int = DEFAULT_ROLLING_WINDOW) -> Dict[str, pd.DataFrame]:
+        """
+        构建 分组 × 月份 的指标矩阵，并一次性计算环比、同比和滚动均值
         
-        try:
-            # 1. 获取用户输入的日期
-            print("📅 第一步：输入分析日期")
-            print("-" * 40)
+        所有月份的数据合并后只做一次分组汇总，再展开为矩阵；
+        环比/同比/滚动窗口均在矩阵上按列向量化计算。
+        月份按自然月补齐，缺失快照的月份为空值，不参与环比/同比计算。
+        
+        Args:
+            monthly_data: {日期: 当月数据}
+            group_by_cols: 分组维度列
+            metric_cols: 指标列
+            window: 滚动窗口月数
             
-            while True:
-                current_date = input("请输入本月末日期 (YYYY-MM-DD 格式，如 2023-10-31): ").strip()
-                if self.validate_date_format(current_date):
-                    break
-                print("✗ 日期格式错误，请使用 YYYY-MM-DD 格式")
+        Returns:
+            Dict[str, pd.DataFrame]: {表名: 结果表}，每个指标包含汇总、环比、同比和滚动均值四张表
+        """
+        frames = []
+        for date_str, df in monthly_data.items():
+            available = [col for col in group_by_cols + metric_cols if col in df.columns]
+            month_frame = df[available].copy()
+            month_frame['月份'] = pd.Period(date_str, freq='M')
+            frames.append(month_frame)
+        
+        # 各月份共享同一维度字典，合并后仍为分类类型；指标列在合并前统一数值化
+        self.encode_dimension_columns(frames, group_by_cols)
+        for month_frame in frames:
+            self.coerce_metric_columns(month_frame, metric_cols)
+        combined = pd.concat(frames, ignore_index=True)
+        metrics = [col for col in metric_cols if col in combined.columns]
+        
+        grouped = combined.groupby(group_by_cols + ['月份'], observed=True)[metrics].sum()
+        
+        # 展开为 分组 × 月份 矩阵；快照中不存在的分组记为0，缺失快照的月份记为空值
+        observed_months = sorted(grouped.index.get_level_values('月份').unique())
+        all_months = pd.period_range(observed_months[0], observed_months[-1], freq='M')
+        matrix = grouped.unstack('月份').fillna(0)
+        
+        results = {}
+        for col in metrics:
+            values = matrix[col].reindex(columns=all_months)
+            values.columns = [str(month) for month in all_months]
+            array = values.to_numpy(dtype=float)
             
-            while True:
-                previous_date = input("请输入上月末日期 (YYYY-MM-DD 格式，如 2023-09-30): ").strip()
-                if self.validate_date_format(previous_date):
-                    break
-                print("✗ 日期格式错误，请使用 YYYY-MM-DD 格式")
+            mom = np.full_like(array, np.nan)
+            mom[:, 1:] = compute_growth_rate(array[:, 1:], array[:, :-1])
             
-            # 2. 生成文件名并检查文件存在性
-            print(f"\n📁 第二步：查找Excel文件")
-            print("-" * 40)
+            yoy = np.full_like(array, np.nan)
+            if array.shape[1] > 12:
+                yoy[:, 12:] = compute_growth_rate(array[:, 12:], array[:, :-12])
             
-            current_filename = self.generate_filename(current_date)
-            previous_filename = self.generate_filename(previous_date)
+            rolling = values.T.rolling(window, min_periods=window).mean().T.round(2)
+            
+            results[col] = values.reset_index()
+            results[f"{col}_环比(%)"] = pd.DataFrame(mom, index=values.index, columns=values.columns).reset_index()
+            results[f"{col}_同比(%)"] = pd.DataFrame(yoy, index=values.index, columns=values.columns).reset_index()
+            results[f"{col}_滚动{window}月均值"] = rolling.reset_index()
+        
+        return results
+    
+    def run_time_series(self, directory: str, window: int = DEFAULT_ROLLING_WINDOW) -> None:
+        """
+        运行多月时间序列模式：汇总目录下所有月份快照
+        
+        Args:
+            directory: 快照文件所在目录
+            window: 滚动窗口月数
+        """
+        print("="*80)
+        print("🎯 多月时间序列分析")
+        print("="*80)
+        
+        try:
+            snapshots = self.discover_snapshots(directory)
+            if len(snapshots) < 2:
+                print(f"✗ 目录 {directory} 中至少需要两个 数据_YYYY-MM-DD.xlsx 文件")
+                return
             
-            print(f"查找本月文件: {current_filename}")
-            print(f"查找上月文件: {previous_filename}")
+            print(f"✓ 找到 {len(snapshots)} 个月份快照：")
+            for date_str, path in snapshots:
+                print(f"   {date_str}: {os.path.basename(path)}")
             
-            if not self.check_file_exists(current_filename):
-                print(f"✗ 本月文件不存在: {current_filename}")
+            # 以最新一期的表头识别维度列和指标列
+            sample = self.sniff_workbook(snapshots[-1][1])
+            if sample is None:
+                return
+            self.dimension_columns, self.metric_columns = self.analyze_columns(sample)
+            if not self.dimension_columns or not self.metric_columns:
+                print("✗ 未找到维度列或指标列，无法进行分析")
                 return
             
-            if not self.check_file_exists(previous_filename):
-                print(f"✗ 上月文件不存在: {previous_filename}")
+            self.display_dimension_options(self.dimension_columns)
+            selected_dimensions = self.get_user_dimension_selection(self.dimension_columns)
+            
+            print(f"\n⚙️ 正在并行加载 {len(snapshots)} 个月份的数据...")
+            frames = self.load_files_concurrently(
+                [path for _, path in snapshots], columns=selected_dimensions + self.metric_columns
+            )
+            monthly_data = {
+                date_str: df for (date_str, _), df in zip(snapshots, frames) if df is not None
+            }
+            if len(monthly_data) < 2:
+                print("✗ 可用的月份数据不足两个，无法进行分析")
                 return
             
-            # 3. 加载数据
-            print(f"\n📊 第三步：加载数据文件")
-            print("-" * 40)
+            print("正在构建时间序列矩阵...")
+            results = self.build_time_series(monthly_data, selected_dimensions, self.metric_columns, window)
             
-            self.current_month_data = self.load_excel_data(current_filename)
-            self.previous_month_data = self.load_excel_data(previous_filename)
+            for name, table in results.items():
+                print("\n" + "="*100)
+                print(f"📈 {name}")
+                print("="*100)
+                print(table.to_string(index=False))
             
-            if self.current_month_data is None or self.previous_month_data is None:
-                print("✗ 数据加载失败，程序终止")
-                return
+            print(f"\n💾 是否保存分析结果？")
+            save_choice = input("输入 'y' 保存到Excel文件，其他任意键跳过: ").strip().lower()
+            if save_choice == 'y':
+                output_filename = f"分析结果_时间序列_{snapshots[0][0]}_至_{snapshots[-1][0]}.xlsx"
+                try:
+                    with pd.ExcelWriter(output_filename) as writer:
+                        for name, table in results.items():
+                            # Excel工作表名最长31个字符，且不能包含部分特殊字符
+                            sheet_name = name.replace('(%)', '').replace('/', '_')[:31]
+                            table.to_excel(writer, sheet_name=sheet_name, index=False)
+                    print(f"✓ 结果已保存到: {output_filename}")
+                except Exception as e:
+                    print(f"✗ 保存失败: {str(e)}")
             
-            # 4. 智能分析列结构
-            print(f"\n🔍 第四步：智能分析数据结构")
-            print("-" * 40)
+            self.print_memo_stats()
+            print(f"\n🎉 分析完成！感谢使用Excel数据分析工具 V2.0")
+            
+        except KeyboardInterrupt:
+            print(f"\n\n⚠️ 程序被用户中断")
+        except Exception as e:
+            print(f"\n✗ 程序执行出错: {str(e)}")
+            print("请检查数据文件格式和内容是否正确")
+    
+    def prompt_month_files(self) -> Optional[Tuple[str, str]]:
+        """
+        询问本月和上月日期，检查文件存在后切换到这两个月份
+        
+        Returns:
+            Optional[Tuple[str, str]]: (本月日期, 上月日期)，文件不存在时返回None
+        """
+        # 1. 获取用户输入的日期
+        print("📅 第一步：输入分析日期")
+        print("-" * 40)
+        
+        while True:
+            current_date = input("请输入本月末日期 (YYYY-MM-DD 格式，如 2023-10-31): ").strip()
+            if self.validate_date_format(current_date):
+                break
+            print("✗ 日期格式错误，请使用 YYYY-MM-DD 格式")
+        # 用户输入上月日期期间，在后台开始加载本月数据
+        self.prefetch_month(self.generate_filename(current_date))
+        
+        while True:
+            previous_date = input("请输入上月末日期 (YYYY-MM-DD 格式，如 2023-09-30): ").strip()
+            if self.validate_date_format(previous_date):
+                break
+            print("✗ 日期格式错误，请使用 YYYY-MM-DD 格式")
+        self.prefetch_month(self.generate_filename(previous_date), self.generate_filename(current_date))
+        
+        # 2. 生成文件名并检查文件存在性
+        print(f"\n📁 第二步：查找Excel文件")
+        print("-" * 40)
+        
+        current_filename = self.generate_filename(current_date)
+        previous_filename = self.generate_filename(previous_date)
+        
+        print(f"查找本月文件: {current_filename}")
+        print(f"查找上月文件: {previous_filename}")
+        
+        if not self.check_file_exists(current_filename):
+            print(f"✗ 本月文件不存在: {current_filename}")
+            return None
+        
+        if not self.check_file_exists(previous_filename):
+            print(f"✗ 上月文件不存在: {previous_filename}")
+            return None
+        
+        self.switch_months(current_filename, previous_filename)
+        return current_date, previous_date
+    
+    def switch_months(self, current_filename: str, previous_filename: str) -> None:
+        """
+        切换分析的月份：已加载的月份数据保留在会话中，切换回来时不再重新解析
+        
+        Args:
+            current_filename: 本月文件路径
+            previous_filename: 上月文件路径
+        """
+        for filename, df in ((self.current_filename, self.current_month_data),
+                             (self.previous_filename, self.previous_month_data)):
+            if filename is not None and df is not None:
+                self.session_months[os.path.abspath(filename)] = df
+        
+        self.current_filename = current_filename
+        self.previous_filename = previous_filename
+        self.current_month_data = self.session_months.get(os.path.abspath(current_filename))
+        self.previous_month_data = self.session_months.get(os.path.abspath(previous_filename))
+        self.last_interval_query = None
+        
+        # 两个月份重新共用同一维度字典
+        loaded = [df for df in (self.current_month_data, self.previous_month_data) if df is not None]
+        if loaded:
+            self.normalize_frames(loaded)
+    
+    def spawn_worker(self) -> 'ExcelDataAnalyzer':
+        """
+        复制当前配置，得到月份数据、立方体和结果缓存均独立的分析器（供批量模式在线程中并行分析）
+        
+        工作簿旁路缓存、对比结果缓存、执行后端以及草图和区间索引的锁与原分析器共用。
+        
+        Returns:
+            ExcelDataAnalyzer: 新的分析器
+        """
+        worker = copy.copy(self)
+        worker.current_month_data = worker.previous_month_data = None
+        worker.current_filename = worker.previous_filename = None
+        worker.month_cubes, worker.interval_indexes, worker.metric_sketches = {}, {}, {}
+        worker.last_interval_query = None
+        worker.session_months = {}
+        worker.last_compute_seconds = 0.0
+        worker.prefetch = False
+        worker.prefetched_months, worker.prefetch_projections, worker.speculative_cubes = {}, {}, {}
+        worker.sniffed_samples = {}
+        worker._prefetch_pool = worker._speculation_pool = None
+        worker.result_memo = ResultMemo(self.result_memo.max_bytes)
+        worker.dimension_columns, worker.metric_columns = [], []
+        worker.distinct_columns = list(self.distinct_columns)
+        return worker
+    
+    def inspect_columns(self) -> bool:
+        """
+        读取本月表头和样本行，识别维度列和指标列
+        
+        Returns:
+            bool: 是否成功
+        """
+        # 3. 读取表头和样本行（完整数据在选定分析列后按列投影加载）
+        print(f"\n📊 第三步：读取表头和样本数据")
+        print("-" * 40)
+        
+        sample = self.sniff_workbook(self.current_filename)
+        if sample is None:
+            print("✗ 数据加载失败，程序终止")
+            return False
+        
+        # 4. 智能分析列结构
+        print(f"\n🔍 第四步：智能分析数据结构")
+        print("-" * 40)
+        
+        self.dimension_columns, self.metric_columns = self.analyze_columns(sample)
+        
+        print(f"✓ 识别到 {len(self.dimension_columns)} 个维度列: {self.dimension_columns}")
+        print(f"✓ 识别到 {len(self.metric_columns)} 个指标列: {self.metric_columns}")
+        
+        missing = [col for col in self.distinct_columns if col not in sample.columns]
+        if missing:
+            print(f"⚠️  去重计数列不存在，已忽略: {missing}")
+            self.distinct_columns = [col for col in self.distinct_columns if col in sample.columns]
+        return True
+    
+    def execute_analysis(self, mode_choice: int) -> Tuple[pd.DataFrame, str]:
+        """
+        执行所选模式的分析
+        
+        Args:
+            mode_choice: 分析模式（1/2/3）
             
-            self.dimension_columns, self.metric_columns = self.analyze_columns(self.current_month_data)
+        Returns:
+            Tuple[pd.DataFrame, str]: (分析结果, 分析类型描述)
+        """
+        if mode_choice == 1:
+            # 执行按维度汇总分析
+            return self.run_dimension_summary(), "按维度汇总"
+        elif mode_choice == 2:
+            # 执行按指标区间汇总分析
+            return self.run_metric_interval_summary(), "按指标区间汇总"
+        else:
+            # 执行按双指标交叉区间汇总分析
+            return self.run_cross_interval_summary(), "按双指标交叉区间汇总"
+    
+    def save_result(self, result_df: pd.DataFrame, mode_choice: int,
+                    current_date: str, previous_date: str) -> None:
+        """
+        保存分析结果到Excel文件
+        
+        Args:
+            result_df: 分析结果
+            mode_choice: 分析模式（1/2/3）
+            current_date: 本月日期
+            previous_date: 上月日期
+        """
+        mode_suffix = {1: "维度汇总", 2: "区间汇总", 3: "交叉区间汇总"}[mode_choice]
+        output_filename = f"分析结果_{mode_suffix}_{current_date}_vs_{previous_date}.xlsx"
+        try:
+            result_df.to_excel(output_filename, index=False)
+            print(f"✓ 结果已保存到: {output_filename}")
+        except Exception as e:
+            print(f"✗ 保存失败: {str(e)}")
+    
+    def run(self) -> None:
+        """运行主程序"""
+        print("="*80)
+        print("🎯 欢迎使用交互式Excel数据分析工具 V2.0")
+        print("="*80)
+        print("功能：智能分析Excel文件，支持双模式分析")
+        print("模式一：按维度汇总 | 模式二：按指标区间汇总 | 模式三：按双指标交叉区间汇总")
+        print()
+        
+        try:
+            months = self.prompt_month_files()
+            if months is None:
+                return
+            current_date, previous_date = months
             
-            print(f"✓ 识别到 {len(self.dimension_columns)} 个维度列: {self.dimension_columns}")
-            print(f"✓ 识别到 {len(self.metric_columns)} 个指标列: {self.metric_columns}")
+            if not self.inspect_columns():
+                return
+            # 用户浏览菜单期间，在后台为已预加载的月份预先构建立方体
+            self.start_speculative_cubes()
             
             # 5. 显示分析模式菜单并获取选择
             print(f"\n🎯 第五步：选择分析模式")
@@ -743,36 +3179,26 @@ class ExcelDataAnalyzer:
             
             # 6. 根据选择执行相应的分析
             print(f"\n⚙️ 第六步：执行数据分析")
-            
-            if mode_choice == 1:
-                # 执行按维度汇总分析
-                final_result = self.run_dimension_summary()
-                analysis_type = "按维度汇总"
-            else:
-                # 执行按指标区间汇总分析
-                final_result = self.run_metric_interval_summary()
-                analysis_type = "按指标区间汇总"
+            final_result, analysis_type = self.execute_analysis(mode_choice)
             
             # 7. 显示分析结果
             if not final_result.empty:
                 print(f"\n📈 第七步：分析结果")
                 self.format_and_display_results(final_result, analysis_type)
                 
+                if mode_choice == 2:
+                    final_result = self.rebin_interactively(final_result)
+                
                 # 8. 询问是否保存结果
                 print(f"\n💾 是否保存分析结果？")
                 save_choice = input("输入 'y' 保存到Excel文件，其他任意键跳过: ").strip().lower()
                 
                 if save_choice == 'y':
-                    mode_suffix = "维度汇总" if mode_choice == 1 else "区间汇总"
-                    output_filename = f"分析结果_{mode_suffix}_{current_date}_vs_{previous_date}.xlsx"
-                    try:
-                        final_result.to_excel(output_filename, index=False)
-                        print(f"✓ 结果已保存到: {output_filename}")
-                    except Exception as e:
-                        print(f"✗ 保存失败: {str(e)}")
+                    self.save_result(final_result, mode_choice, current_date, previous_date)
             else:
                 print("✗ 分析失败，未生成结果")
             
+            self.print_memo_stats()
             print(f"\n🎉 分析完成！感谢使用Excel数据分析工具 V2.0")
             
         except KeyboardInterrupt:
@@ -780,12 +3206,575 @@ class ExcelDataAnalyzer:
         except Exception as e:
             print(f"\n✗ 程序执行出错: {str(e)}")
             print("请检查数据文件格式和内容是否正确")
+        finally:
+            self.shutdown_background()
+    
+    def preload_session_data(self) -> None:
+        """会话模式：一次加载两个月份的全部分析列并规范化，之后的查询直接使用内存数据"""
+        if self.streaming:
+            print("💡 流式模式下不预加载数据，每次查询按批次读取")
+            return
+        
+        start = time.perf_counter()
+        columns = self.dimension_columns + self.metric_columns + self.distinct_columns
+        if self.ensure_month_data(columns):
+            print(f"✓ 两个月份数据已驻留内存，耗时 {time.perf_counter() - start:.2f} 秒")
+    
+    def run_session(self) -> None:
+        """
+        运行会话模式：月份数据只加载一次并常驻内存，可连续执行任意次分析、切换月份和保存结果
+        
+        已加载的月份、立方体、区间索引和汇总结果在整个会话中复用，
+        首次加载之后的查询不再解析Excel。
+        """
+        print("="*80)
+        print("🎯 欢迎使用交互式Excel数据分析工具 V2.0（会话模式）")
+        print("="*80)
+        print("月份数据加载一次后常驻内存，可连续执行多次分析")
+        print()
+        
+        try:
+            months = self.prompt_month_files()
+            if months is None or not self.inspect_columns():
+                return
+            self.preload_session_data()
+            
+            last_result = None
+            while True:
+                current_date, previous_date = months
+                print(f"\n🔁 当前月份：{current_date} vs {previous_date}")
+                print("   1/2/3. 按维度汇总 / 按指标区间汇总 / 按双指标交叉区间汇总")
+                print("   m. 切换月份 | s. 保存上一次结果 | q. 退出")
+                command = input("请输入命令: ").strip().lower()
+                
+                if command in ('1', '2', '3'):
+                    mode_choice = int(command)
+                    final_result, analysis_type = self.execute_analysis(mode_choice)
+                    if final_result.empty:
+                        print("✗ 分析失败，未生成结果")
+                        continue
+                    self.format_and_display_results(final_result, analysis_type)
+                    if mode_choice == 2:
+                        final_result = self.rebin_interactively(final_result)
+                    print(f"⏱️  本次计算耗时 {self.last_compute_seconds * 1000:.0f} 毫秒")
+                    last_result = (final_result, mode_choice, current_date, previous_date)
+                elif command == 'm':
+                    switched = self.prompt_month_files()
+                    if switched is None:
+                        continue
+                    # 新月份的表头可能不同，重新识别列结构
+                    if switched != months:
+                        months = switched
+                        if self.inspect_columns():
+                            self.preload_session_data()
+                elif command == 's':
+                    if last_result is None:
+                        print("✗ 还没有可保存的结果")
+                    else:
+                        self.save_result(*last_result)
+                elif command == 'q':
+                    break
+                else:
+                    print("✗ 无效命令，请输入 1、2、3、m、s 或 q")
+            
+            self.print_memo_stats()
+            print(f"\n🎉 会话结束！感谢使用Excel数据分析工具 V2.0")
+            
+        except KeyboardInterrupt:
+            print(f"\n\n⚠️ 程序被用户中断")
+        except Exception as e:
+            print(f"\n✗ 程序执行出错: {str(e)}")
+            print("请检查数据文件格式和内容是否正确")
+        finally:
+            self.shutdown_background()
+
+    def load_batch_spec(self, spec_path: str) -> Dict:
+        """
+        读取并校验批量分析配置（JSON，或安装了pyyaml时的YAML）
+        
+        配置格式：
+          output_dir: 结果输出目录（可选，默认当前目录）
+          months:     [{current: 本月日期, previous: 上月日期}, ...]
+          analyses:   [{name: 名称（可选）, type: dimension, dimensions: [...], subtotal: rollup / cube（可选）},
+                       {name: 名称（可选）, type: interval, metric: 指标,
+                        cutpoints: [...] 或 schemes: {方案名: [...] 或 qN / logN / jenksN}}, ...]
+        
+        Args:
+            spec_path: 配置文件路径
+            
+        Returns:
+            Dict: 规范化后的配置（months 为 (本月日期, 上月日期) 列表，每个分析都带有唯一名称）
+            
+        Raises:
+            ValueError: 配置格式错误
+        """
+        with open(spec_path, encoding='utf-8') as f:
+            text = f.read()
+        
+        if spec_path.lower().endswith(('.yaml', '.yml')):
+            try:
+                import yaml
+            except ImportError:
+                raise ValueError("读取YAML配置需要安装 pyyaml，或改用JSON格式")
+            try:
+                raw = yaml.safe_load(text)
+            except yaml.YAMLError as e:
+                raise ValueError(f"YAML格式错误: {str(e)}")
+        else:
+            raw = json.loads(text)
+        
+        if not isinstance(raw, dict):
+            raise ValueError("配置顶层应为对象")
+        
+        months = []
+        for pair in raw.get('months') or []:
+            if not isinstance(pair, dict) or 'current' not in pair or 'previous' not in pair:
+                raise ValueError(f"月份组合格式错误: {pair}，应包含 current 和 previous")
+            # YAML会把未加引号的日期解析为日期对象
+            current_date, previous_date = str(pair['current']), str(pair['previous'])
+            for date_str in (current_date, previous_date):
+                if not self.validate_date_format(date_str):
+                    raise ValueError(f"日期格式错误: {date_str}，应为 YYYY-MM-DD")
+            months.append((current_date, previous_date))
+        if not months:
+            raise ValueError("请在 months 中配置至少一个月份组合")
+        
+        analyses = []
+        names = set()
+        for entry in raw.get('analyses') or []:
+            if not isinstance(entry, dict) or entry.get('type') not in BATCH_ANALYSIS_TYPES:
+                raise ValueError(f"分析配置错误: {entry}，type 应为 {' / '.join(BATCH_ANALYSIS_TYPES)}")
+            
+            analysis = {'type': entry['type']}
+            if entry['type'] == 'dimension':
+                dimensions = entry.get('dimensions')
+                if not isinstance(dimensions, list) or not dimensions:
+                    raise ValueError(f"维度汇总需要非空的 dimensions 列表: {entry}")
+                if entry.get('subtotal') not in (None, 'rollup', 'cube'):
+                    raise ValueError(f"subtotal 应为 rollup 或 cube: {entry}")
+                analysis.update(dimensions=[str(col) for col in dimensions], subtotal=entry.get('subtotal'))
+                default_name = '维度_' + '+'.join(analysis['dimensions'])
+            else:
+                if not entry.get('metric'):
+                    raise ValueError(f"区间汇总需要 metric: {entry}")
+                if ('cutpoints' in entry) == ('schemes' in entry):
+                    raise ValueError(f"区间汇总需要 cutpoints 或 schemes 其中之一: {entry}")
+                raw_schemes = entry['schemes'] if 'schemes' in entry else {DEFAULT_SCHEME_NAME: entry['cutpoints']}
+                if not isinstance(raw_schemes, dict) or not raw_schemes:
+                    raise ValueError(f"schemes 应为 {{方案名: 切分点}}: {entry}")
+                
+                schemes = {}
+                for name, spec in raw_schemes.items():
+                    if isinstance(spec, str):
+                        suggestion = re.fullmatch(r'(q|log|jenks)(\d+)', spec.strip().lower())
+                        if not suggestion or int(suggestion.group(2)) < 2:
+                            raise ValueError(f"方案 {name} 格式错误: '{spec}'，应为切分点列表或 qN / logN / jenksN")
+                        schemes[str(name)] = suggestion.group(0)
+                        continue
+                    try:
+                        cutpoints = sorted({float(point) for point in spec})
+                    except (TypeError, ValueError):
+                        raise ValueError(f"方案 {name} 的切分点应为数字列表: {spec}")
+                    if not cutpoints or not np.all(np.isfinite(cutpoints)):
+                        raise ValueError(f"方案 {name} 的切分点应为非空的有限数字: {spec}")
+                    schemes[str(name)] = cutpoints
+                analysis.update(metric=str(entry['metric']), schemes=schemes)
+                default_name = f"区间_{analysis['metric']}"
+            
+            # 未命名或重名的分析自动编号
+            name = str(entry.get('name') or default_name)
+            unique, index = name, 2
+            while unique in names:
+                unique, index = f"{name}_{index}", index + 1
+            names.add(unique)
+            analysis['name'] = unique
+            analyses.append(analysis)
+        if not analyses:
+            raise ValueError("请在 analyses 中配置至少一个分析")
+        
+        return {'output_dir': str(raw.get('output_dir') or '.'), 'months': months, 'analyses': analyses}
+    
+    def check_batch_analysis(self, analysis: Dict) -> Optional[str]:
+        """
+        检查分析所需的列是否存在于当前月份（需先识别列结构）
+        
+        Args:
+            analysis: 规范化后的分析配置
+            
+        Returns:
+            Optional[str]: 问题描述，可以执行时返回None
+        """
+        if analysis['type'] == 'dimension':
+            missing = [col for col in analysis['dimensions'] if col not in self.dimension_columns]
+            if missing:
+                return f"维度列不存在: {missing}"
+            if not self.metric_columns:
+                return "未找到指标列"
+            if analysis['subtotal'] is not None and self.uses_extended_aggregates():
+                return "已配置附加统计量，小计只支持合计"
+        elif analysis['metric'] not in self.metric_columns:
+            return f"指标列不存在: {analysis['metric']}"
+        return None
+    
+    def batch_result_spec(self, analysis: Dict) -> Optional[Dict]:
+        """分析在对比结果缓存中的键；切分点需由数据生成（qN等）时返回None"""
+        if analysis['type'] == 'dimension':
+            return self.dimension_spec(analysis['dimensions'], analysis['subtotal'])
+        if any(isinstance(spec, str) for spec in analysis['schemes'].values()):
+            return None
+        return self.interval_spec(analysis['metric'], analysis['schemes'])
+    
+    def resolve_batch_schemes(self, metric_name: str,
+                              schemes: Dict[str, Union[str, List[float]]]) -> Optional[Dict[str, List[float]]]:
+        """
+        由数据生成 qN / logN / jenksN 方案的切分点，并检查切分点在数据范围内
+        
+        Args:
+            metric_name: 分箱指标列名
+            schemes: {方案名: 切分点或方案写法}
+            
+        Returns:
+            Optional[Dict[str, List[float]]]: {方案名: 切分点}，无法生成或超出范围时返回None
+        """
+        sketch = self.get_combined_sketch(metric_name)
+        resolved = {}
+        for name, spec in schemes.items():
+            if isinstance(spec, str):
+                suggestion = re.fullmatch(r'(q|log|jenks)(\d+)', spec)
+                cutpoints = self.suggested_cutpoints(metric_name, int(suggestion.group(2)), suggestion.group(1))
+                if not cutpoints:
+                    return None
+            else:
+                cutpoints = spec
+                outside = [point for point in cutpoints if point < sketch.min or point > sketch.max]
+                if outside:
+                    print(f"✗ 方案 {name} 的切分点 {outside} 超出数据范围 [{sketch.min:.2f}, {sketch.max:.2f}]")
+                    return None
+            resolved[name] = cutpoints
+        return resolved
+    
+    def group_batch_analyses(self, analyses: List[Dict]) -> List[List[Dict]]:
+        """
+        按共用的中间结果将同一月份组合的分析分组
+        
+        维度汇总共用月度立方体和分组汇总结果，归为一组；区间汇总按分箱指标分组，
+        同一指标的分析共用区间索引。不同组之间没有共用的中间结果，可以并发执行。
+        
+        Args:
+            analyses: 规范化后的分析配置
+            
+        Returns:
+            List[List[Dict]]: 各组分析（保持配置中的先后顺序）
+        """
+        groups = {}
+        for analysis in analyses:
+            key = ('dimension',) if analysis['type'] == 'dimension' else ('interval', analysis['metric'])
+            groups.setdefault(key, []).append(analysis)
+        return list(groups.values())
+    
+    def fork_batch_worker(self) -> 'ExcelDataAnalyzer':
+        """
+        复制已切换到月份组合的分析器，供同一组合中的另一组分析在其他线程中执行
+        
+        新分析器直接使用已加载并规范化的月份数据、列结构、分位数草图和区间索引，
+        立方体和会话内结果缓存各自独立。
+        
+        Returns:
+            ExcelDataAnalyzer: 新的分析器
+        """
+        worker = self.spawn_worker()
+        worker.current_filename, worker.previous_filename = self.current_filename, self.previous_filename
+        worker.current_month_data, worker.previous_month_data = self.current_month_data, self.previous_month_data
+        worker.dimension_columns, worker.metric_columns = self.dimension_columns, self.metric_columns
+        worker.distinct_columns = list(self.distinct_columns)
+        worker.metric_sketches, worker.interval_indexes = self.metric_sketches, self.interval_indexes
+        return worker
+    
+    def run_batch_analyses(self, analyses: List[Dict]) -> Dict[str, pd.DataFrame]:
+        """
+        对当前月份组合依次执行一组分析
+        
+        组内的分析共用月度立方体、区间索引、分位数草图和会话内结果缓存，
+        维度或指标重叠的分析不会重复汇总。
+        
+        Args:
+            analyses: 规范化后的分析配置
+            
+        Returns:
+            Dict[str, pd.DataFrame]: {分析名称: 分析结果}，失败的分析不包含在内
+        """
+        results = {}
+        for analysis in analyses:
+            print(f"\n⚙️ [{os.path.basename(self.current_filename)} vs "
+                  f"{os.path.basename(self.previous_filename)}] {analysis['name']}")
+            try:
+                if analysis['type'] == 'dimension':
+                    result = self.dimension_comparison(analysis['dimensions'], analysis['subtotal'])
+                else:
+                    schemes = self.resolve_batch_schemes(analysis['metric'], analysis['schemes'])
+                    result = pd.DataFrame() if schemes is None else self.compute_interval_comparison(
+                        analysis['metric'], schemes
+                    )
+            except Exception as e:
+                print(f"✗ 分析出错: {analysis['name']}，{str(e)}")
+                continue
+            
+            if result.empty:
+                print(f"✗ 分析失败: {analysis['name']}")
+            else:
+                results[analysis['name']] = result
+        return results
+    
+    def write_batch_workbook(self, output_filename: str, analyses: List[Dict],
+                             results: Dict[str, pd.DataFrame]) -> bool:
+        """
+        将一个月份组合的全部分析结果写入同一工作簿，每个分析一个工作表
+        
+        Args:
+            output_filename: 输出文件路径
+            analyses: 规范化后的分析配置（决定工作表顺序）
+            results: {分析名称: 分析结果}
+            
+        Returns:
+            bool: 是否保存成功
+        """
+        sheet_names = set()
+        try:
+            with pd.ExcelWriter(output_filename) as writer:
+                for analysis in analyses:
+                    if analysis['name'] not in results:
+                        continue
+                    # 工作表名不能包含 []:*?/\ 且最长31个字符
+                    base = re.sub(r'[\[\]:*?/\\]', '_', analysis['name'])[:31]
+                    sheet, index = base, 2
+                    while sheet in sheet_names:
+                        suffix = f"_{index}"
+                        sheet, index = base[:31 - len(suffix)] + suffix, index + 1
+                    sheet_names.add(sheet)
+                    results[analysis['name']].to_excel(writer, sheet_name=sheet, index=False)
+            print(f"✓ 结果已保存到: {output_filename}（{len(sheet_names)} 个工作表）")
+            return True
+        except Exception as e:
+            print(f"✗ 保存失败: {output_filename}，{str(e)}")
+            return False
+    
+    def run_batch(self, spec_path: str) -> bool:
+        """
+        批量模式：按配置文件对多个月份组合执行多个分析，无需交互
+        
+        先为每个月份组合识别列结构并查询对比结果缓存；仍需计算的分析涉及的工作簿
+        每个只加载一次（多个月份组合共用同一工作簿时共享数据）。各月份组合互相独立；
+        同一组合内的分析按共用的中间结果分组（见 group_batch_analyses），组内依次执行，
+        所有组合的所有分组在线程中并发执行，各组的输出收集后整段输出。
+        
+        Args:
+            spec_path: 配置文件路径
+            
+        Returns:
+            bool: 全部分析是否成功并保存
+        """
+        print("="*80)
+        print("🎯 Excel数据分析工具 V2.0（批量模式）")
+        print("="*80)
+        start = time.perf_counter()
+        
+        try:
+            spec = self.load_batch_spec(spec_path)
+        except (OSError, ValueError) as e:
+            print(f"✗ 批量配置无效: {str(e)}")
+            return False
+        analyses = spec['analyses']
+        print(f"✓ 读取配置: {len(spec['months'])} 个月份组合 × {len(analyses)} 个分析")
+        
+        # 1. 每个月份组合一个独立的分析器：识别列结构，先查对比结果缓存
+        jobs = []
+        succeeded = True
+        for current_date, previous_date in spec['months']:
+            print(f"\n📅 {current_date} vs {previous_date}")
+            print("-" * 40)
+            current_filename = self.generate_filename(current_date)
+            previous_filename = self.generate_filename(previous_date)
+            missing = [f for f in (current_filename, previous_filename) if not self.check_file_exists(f)]
+            if missing:
+                print(f"✗ 文件不存在，跳过该月份组合: {missing}")
+                succeeded = False
+                continue
+            
+            worker = self.spawn_worker()
+            worker.switch_months(current_filename, previous_filename)
+            sample = worker.sniff_workbook(current_filename)
+            if sample is None:
+                succeeded = False
+                continue
+            worker.dimension_columns, worker.metric_columns = worker.analyze_columns(sample)
+            worker.distinct_columns = [col for col in worker.distinct_columns if col in sample.columns]
+            
+            results, pending = {}, []
+            for analysis in analyses:
+                problem = worker.check_batch_analysis(analysis)
+                if problem is not None:
+                    print(f"✗ 跳过分析 {analysis['name']}: {problem}")
+                    succeeded = False
+                    continue
+                
+                result_spec = worker.batch_result_spec(analysis)
+                cached = None
+                if worker.result_cache is not None and result_spec is not None:
+                    try:
+                        cached = worker.result_cache.load(current_filename, previous_filename, result_spec)
+                    except OSError as e:
+                        print(f"⚠️ 对比结果缓存读取失败，重新计算: {str(e)}")
+                if cached is not None:
+                    print(f"✓ 命中对比结果缓存: {analysis['name']}")
+                    results[analysis['name']] = cached
+                else:
+                    pending.append(analysis)
+            jobs.append({'dates': (current_date, previous_date), 'worker': worker,
+                         'results': results, 'pending': pending})
+        
+        # 2. 仍需计算的月份组合涉及的工作簿，每个只加载一次
+        pending_jobs = [job for job in jobs if job['pending']]
+        filenames = list(dict.fromkeys(
+            f for job in pending_jobs for f in (job['worker'].current_filename, job['worker'].previous_filename)
+        ))
+        loaded = 0 if self.streaming else len(filenames)
+        if loaded:
+            columns = list(dict.fromkeys(
+                col for job in pending_jobs for col in (job['worker'].dimension_columns
+                                                        + job['worker'].metric_columns
+                                                        + job['worker'].distinct_columns)
+            ))
+            print(f"\n⚙️ 正在并行加载 {len(filenames)} 个工作簿（每个只加载一次）...")
+            frames = dict(zip(filenames, self.load_files_concurrently(filenames, columns=columns)))
+            for job in pending_jobs:
+                worker = job['worker']
+                # 浅复制：各组合共享数据，规范化时各自替换列，互不影响
+                worker.session_months = {
+                    os.path.abspath(f): frames[f].copy(deep=False)
+                    for f in (worker.current_filename, worker.previous_filename) if frames[f] is not None
+                }
+                worker.switch_months(worker.current_filename, worker.previous_filename)
+        
+        # 3. 各月份组合的各组分析并发执行；分位数草图和区间索引与维度字典无关，在组合之间共用
+        if pending_jobs:
+            shared_sketches, shared_indexes, shared_lock = {}, {}, threading.RLock()
+            tasks = []
+            for job in pending_jobs:
+                job['worker'].metric_sketches = shared_sketches
+                job['worker'].interval_indexes = shared_indexes
+                job['worker'].index_lock = shared_lock
+                for i, group in enumerate(job['worker'].group_batch_analyses(job['pending'])):
+                    worker = job['worker'] if i == 0 else job['worker'].fork_batch_worker()
+                    tasks.append((job, worker, group))
+            
+            output = _ThreadOutput(sys.stdout)
+            workers = max(1, min(len(tasks), os.cpu_count() or 1))
+            with contextlib.redirect_stdout(output), ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = {executor.submit(output.collect, worker.run_batch_analyses, group): job
+                           for job, worker, group in tasks}
+                # 各组完成后整段输出其进度信息
+                for future in as_completed(futures):
+                    job = futures[future]
+                    try:
+                        text, results = future.result()
+                    except Exception as e:
+                        print(f"✗ 月份组合 {job['dates'][0]} vs {job['dates'][1]} 执行出错: {str(e)}")
+                        continue
+                    print(text, end='')
+                    job['results'].update(results)
+        
+        # 4. 每个月份组合的结果写入一个工作簿
+        print(f"\n💾 保存分析结果")
+        print("-" * 40)
+        os.makedirs(spec['output_dir'], exist_ok=True)
+        cache_hits = computed = 0
+        for job in jobs:
+            current_date, previous_date = job['dates']
+            computed_names = {analysis['name'] for analysis in job['pending']}
+            computed += len(computed_names & set(job['results']))
+            cache_hits += len(set(job['results']) - computed_names)
+            if not computed_names <= set(job['results']):
+                succeeded = False
+            if not job['results']:
+                print(f"✗ {current_date} vs {previous_date} 没有可保存的结果")
+                succeeded = False
+                continue
+            output_filename = os.path.join(
+                spec['output_dir'], f"分析结果_批量_{current_date}_vs_{previous_date}.xlsx"
+            )
+            succeeded = self.write_batch_workbook(output_filename, analyses, job['results']) and succeeded
+        
+        print(f"\n📋 批量分析完成：命中缓存 {cache_hits} 个，计算 {computed} 个，"
+              f"加载工作簿 {loaded} 个，"
+              f"耗时 {time.perf_counter() - start:.2f} 秒")
+        return succeeded
 
 
 def main():
     """主函数"""
-    analyzer = ExcelDataAnalyzer()
-    analyzer.run()
+    parser = argparse.ArgumentParser(description="交互式Excel数据分析工具 V2.0")
+    parser.add_argument('--stream', action='store_true',
+                        help="流式模式：按批次读取并汇总，适用于超出内存的大文件")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f"流式模式每批次行数（默认 {DEFAULT_BATCH_SIZE}）")
+    parser.add_argument('--no-cache', action='store_true', help="禁用工作簿旁路缓存")
+    parser.add_argument('--engine', default='auto',
+                        help=f"读取引擎（默认auto自动选择，当前可用: {', '.join(available_engines())}）")
+    parser.add_argument('--backend', default='pandas', choices=['pandas', 'polars', 'duckdb', 'parallel'],
+                        help=f"分组汇总、区间分箱、两期合并的执行后端（默认pandas，当前可用: {', '.join(available_backends())}）")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="parallel后端的进程数（默认CPU核数）")
+    parser.add_argument('--aggregates', default='sum',
+                        help=f"按维度汇总时计算的统计量，逗号分隔（默认sum，可选: {', '.join(AGGREGATE_SUFFIXES)}）")
+    parser.add_argument('--distinct', default='',
+                        help="按维度汇总时近似去重计数（HyperLogLog）的ID类列，逗号分隔")
+    parser.add_argument('--no-cube', action='store_true',
+                        help="按维度汇总时不使用预聚合的月度立方体，直接汇总原始数据")
+    parser.add_argument('--memo-mb', type=int, default=DEFAULT_MEMO_BYTES // 1024 ** 2,
+                        help=f"会话内汇总结果缓存的内存预算MB（默认 {DEFAULT_MEMO_BYTES // 1024 ** 2}，0为不缓存）")
+    parser.add_argument('--no-result-cache', action='store_true',
+                        help="禁用对比结果磁盘缓存")
+    parser.add_argument('--result-max-age', type=float, default=DEFAULT_RESULT_MAX_AGE / 86400,
+                        help=f"对比结果缓存的保留天数（默认 {DEFAULT_RESULT_MAX_AGE // 86400}）")
+    parser.add_argument('--derived', action='store_true',
+                        help="对比结果附加派生指标：本月占比、变化贡献、变化排名")
+    parser.add_argument('--no-prefetch', action='store_true',
+                        help="交互时不在后台预加载工作簿和预先构建立方体")
+    parser.add_argument('--session', action='store_true',
+                        help="会话模式：月份数据加载一次并常驻内存，可连续执行多次分析")
+    parser.add_argument('--batch', metavar='SPEC',
+                        help="批量模式：按JSON/YAML配置文件对多个月份组合执行多个分析并保存结果，无需交互")
+    parser.add_argument('--timeseries', metavar='DIR', nargs='?', const='.',
+                        help="多月时间序列模式：汇总目录下所有 数据_*.xlsx（默认当前目录）")
+    parser.add_argument('--window', type=int, default=DEFAULT_ROLLING_WINDOW,
+                        help=f"时间序列模式的滚动窗口月数（默认 {DEFAULT_ROLLING_WINDOW}）")
+    args = parser.parse_args()
+    
+    aggregates = [agg.strip() for agg in args.aggregates.split(',') if agg.strip()]
+    unknown = [agg for agg in aggregates if agg not in AGGREGATE_SUFFIXES]
+    if unknown or not aggregates:
+        parser.error(f"未知的统计量: {unknown}，可选: {', '.join(AGGREGATE_SUFFIXES)}")
+    
+    analyzer = ExcelDataAnalyzer(
+        use_cache=not args.no_cache, streaming=args.stream, batch_size=args.batch_size,
+        reader_engine=args.engine, derived_measures=args.derived, use_cube=not args.no_cube,
+        memo_max_bytes=args.memo_mb * 1024 ** 2, use_result_cache=not args.no_result_cache,
+        result_max_age=args.result_max_age * 86400, backend=args.backend,
+        workers=args.workers, aggregates=aggregates,
+        distinct_columns=[col.strip() for col in args.distinct.split(',') if col.strip()],
+        prefetch=not args.no_prefetch
+    )
+    try:
+        if args.batch is not None:
+            sys.exit(0 if analyzer.run_batch(args.batch) else 1)
+        elif args.timeseries is not None:
+            analyzer.run_time_series(args.timeseries, window=args.window)
+        elif args.session:
+            analyzer.run_session()
+        else:
+            analyzer.run()
+    finally:
+        analyzer.backend.close()
 
 
 if __name__ == "__main__":
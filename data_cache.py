@@ -0,0 +1,594 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据缓存模块
+功能：为Excel数据分析工具提供列式旁路缓存（sidecar），避免重复解析Excel文件
+
+缓存条目按 文件路径 + 文件大小 + 修改时间 + 内容哈希 建立索引，
+文件变化后旧条目自动失效；缓存目录总大小超出上限时按最近访问时间淘汰
+（命中时只更新数据文件的修改时间，读取不加锁也不改写索引）。
+安装了pyarrow时使用不压缩的Feather格式（内存映射读取，只读取所需的列），否则退化为pickle格式。
+
+ResultCache 缓存最终的对比结果，按 两个工作簿的内容哈希 + 分析参数 建立索引，
+命中时无需加载工作簿；条目按保存时间过期，总大小超出上限时按最近访问时间淘汰。
+两种缓存各自使用独立的索引文件（CacheIndex），大小上限和淘汰互不影响；
+多个进程（及线程）可以共享缓存目录：索引的读取-修改-写入在该索引的文件锁内进行。
+"""
+
+import contextlib
+import hashlib
+import json
+import os
+import pickle
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+try:
+    import pyarrow.feather as feather
+    HAS_PYARROW = True
+except ImportError:
+    feather = None
+    HAS_PYARROW = False
+
+try:
+    import fcntl
+    msvcrt = None
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+
+# 缓存目录名（位于工作簿所在目录下）
+CACHE_DIR_NAME = '.数据缓存'
+# 缓存目录默认大小上限：2GB
+DEFAULT_MAX_CACHE_BYTES = 2 * 1024 ** 3
+# 计算内容哈希时每次读取的块大小
+HASH_CHUNK_SIZE = 4 * 1024 * 1024
+# 对比结果缓存子目录名
+RESULT_DIR_NAME = '对比结果'
+# 对比结果默认保留时间：7天
+DEFAULT_RESULT_MAX_AGE = 7 * 24 * 3600
+# 对比结果缓存默认大小上限：512MB
+DEFAULT_RESULT_MAX_BYTES = 512 * 1024 ** 2
+# 结果格式版本，对比结果或上月汇总结果的结构变化时递增，使旧条目失效
+RESULT_FORMAT_VERSION = 1
+# 对比结果索引文件名（位于对比结果子目录下）
+RESULT_INDEX_FILENAME = 'results.json'
+
+
+def tmp_path_for(path: str) -> str:
+    """
+    写入 path 前使用的临时文件路径（写完后 os.replace 到 path）
+
+    文件名包含进程号和线程号，多个进程或同一进程的多个线程写同一条目时互不覆盖对方的临时文件。
+
+    Args:
+        path: 目标文件路径
+
+    Returns:
+        str: 临时文件路径
+    """
+    return f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+
+@contextlib.contextmanager
+def index_lock(lock_path: str):
+    """
+    排他文件锁：持有期间其他进程和本进程的其他线程都不能修改对应的索引
+
+    每次加锁都重新打开锁文件，同一进程内的不同线程之间同样互斥；锁不可重入。
+
+    Args:
+        lock_path: 锁文件路径
+    """
+    os.makedirs(os.path.dirname(lock_path), exist_ok=True)
+    with open(lock_path, 'a+b') as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class CacheIndex:
+    """缓存目录中的一个索引文件（JSON），记录条目及其数据文件"""
+
+    def __init__(self, cache_dir: str, filename: str, sections: Tuple[str, ...] = ('entries',)):
+        """
+        Args:
+            cache_dir: 缓存目录
+            filename: 索引文件名（同一目录下的不同缓存使用不同的索引文件）
+            sections: 索引包含的表名，每个表为 {键: 记录}
+        """
+        self.cache_dir = cache_dir
+        self.path = os.path.join(cache_dir, filename)
+        self.sections = tuple(sections)
+
+    def lock(self):
+        """索引的读取-修改-写入锁（跨进程），用法：with index_file.lock(): ..."""
+        return index_lock(os.path.splitext(self.path)[0] + '.lock')
+
+    def read(self) -> Dict:
+        """读取索引，不存在或损坏时返回空索引"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            index = {}
+        for section in self.sections:
+            index.setdefault(section, {})
+        return index
+
+    def write(self, index: Dict) -> None:
+        """原子写入索引"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = tmp_path_for(self.path)
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.path)
+
+    def touch(self, entry: Dict) -> None:
+        """记录条目被访问：更新数据文件的修改时间（不改写索引，读取之间无需加锁）"""
+        try:
+            os.utime(os.path.join(self.cache_dir, entry['file']))
+        except OSError:
+            pass
+
+    def last_access(self, entry: Dict) -> float:
+        """条目的最近访问时间：索引中记录的写入时间与数据文件修改时间中较晚者"""
+        try:
+            return max(entry['last_access'], os.path.getmtime(os.path.join(self.cache_dir, entry['file'])))
+        except OSError:
+            return entry['last_access']
+
+    def remove_file(self, entry: Dict) -> None:
+        """删除条目对应的数据文件"""
+        try:
+            os.remove(os.path.join(self.cache_dir, entry['file']))
+        except OSError:
+            pass
+
+
+class SidecarCache:
+    """工作簿旁路缓存"""
+
+    INDEX_FILENAME = 'index.json'
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_CACHE_BYTES, cache_dir: Optional[str] = None):
+        """
+        初始化缓存
+
+        Args:
+            max_bytes: 单个缓存目录的大小上限（字节）
+            cache_dir: 指定缓存目录，为None时使用工作簿所在目录下的 .数据缓存
+        """
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+
+    def get_cache_dir(self, filename: str) -> str:
+        """
+        获取文件对应的缓存目录
+
+        Args:
+            filename: 工作簿路径
+
+        Returns:
+            str: 缓存目录路径
+        """
+        if self.cache_dir:
+            return self.cache_dir
+        return os.path.join(os.path.dirname(os.path.abspath(filename)), CACHE_DIR_NAME)
+
+    def index_file(self, cache_dir: str) -> CacheIndex:
+        """缓存目录中的工作簿缓存索引（条目表 + 内容哈希表）"""
+        return CacheIndex(cache_dir, self.INDEX_FILENAME, ('entries', 'hashes'))
+
+    def file_fingerprint(self, filename: str) -> Dict:
+        """
+        计算文件指纹（路径、大小、修改时间、内容哈希）
+
+        大小和修改时间未变化时复用索引中记录的内容哈希，避免每次重新读取整个文件。
+
+        Args:
+            filename: 文件路径
+
+        Returns:
+            Dict: 文件指纹
+        """
+        path = os.path.abspath(filename)
+        stat = os.stat(path)
+        cache_dir = self.get_cache_dir(filename)
+        index_file = self.index_file(cache_dir)
+        known = index_file.read()['hashes'].get(path)
+
+        if known and known['size'] == stat.st_size and known['mtime_ns'] == stat.st_mtime_ns:
+            content_hash = known['sha256']
+        else:
+            digest = hashlib.sha256()
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+                    digest.update(chunk)
+            content_hash = digest.hexdigest()
+
+            try:
+                with index_file.lock():
+                    index = index_file.read()
+                    index['hashes'][path] = {
+                        'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': content_hash
+                    }
+                    index_file.write(index)
+            except OSError:
+                pass
+
+        return {
+            'path': path,
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'sha256': content_hash,
+        }
+
+    def _entry_key(self, fingerprint: Dict, variant: str) -> str:
+        """根据文件指纹和变体名生成缓存键"""
+        raw = '|'.join([
+            fingerprint['path'], str(fingerprint['size']),
+            str(fingerprint['mtime_ns']), fingerprint['sha256'], variant
+        ])
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()[:32]
+
+    def _fingerprint_id(self, fingerprint: Dict) -> str:
+        """文件指纹的紧凑表示，用于判断条目是否属于文件的当前版本"""
+        return f"{fingerprint['size']}:{fingerprint['mtime_ns']}:{fingerprint['sha256']}"
+
+    def _drop_stale_entries(self, index: Dict, index_file: CacheIndex, fingerprint: Dict,
+                            variant: str, current_key: str) -> None:
+        """删除同一文件已失效的旧条目（文件版本已变化，或同一变体的旧键）"""
+        fingerprint_id = self._fingerprint_id(fingerprint)
+        for key in list(index['entries']):
+            entry = index['entries'][key]
+            if entry['path'] != fingerprint['path'] or key == current_key:
+                continue
+            if entry.get('fingerprint') != fingerprint_id or entry['variant'] == variant:
+                index_file.remove_file(entry)
+                del index['entries'][key]
+
+    def load_frame(self, filename: str, variant: str = '',
+                   columns: Optional[List[str]] = None) -> Optional[pd.DataFrame]:
+        """
+        从缓存读取工作簿对应的DataFrame
+
+        Args:
+            filename: 工作簿路径
+            variant: 缓存变体名（同一文件的不同派生数据）
+            columns: 只读取的列，为None时读取全部列
+
+        Returns:
+            Optional[pd.DataFrame]: 缓存命中时返回数据，否则返回None
+        """
+        fingerprint = self.file_fingerprint(filename)
+        cache_dir = self.get_cache_dir(filename)
+        index_file = self.index_file(cache_dir)
+        key = self._entry_key(fingerprint, variant)
+        entry = index_file.read()['entries'].get(key)
+
+        if entry is None:
+            return None
+        if columns is not None and not set(columns) <= set(entry.get('columns', [])):
+            # 该条目不包含所需的全部列
+            return None
+
+        # 数据文件在锁外读取；命中时只更新数据文件的修改时间作为访问时间，不加锁、不改写索引
+        entry_path = os.path.join(cache_dir, entry['file'])
+        try:
+            if entry['format'] == 'feather':
+                table = feather.read_table(entry_path, columns=columns, memory_map=True)
+                df = table.to_pandas()
+            else:
+                df = pd.read_pickle(entry_path)
+                if columns is not None:
+                    df = df[columns]
+        except Exception:
+            df = None
+
+        if df is not None:
+            index_file.touch(entry)
+            return df
+
+        with index_file.lock():
+            index = index_file.read()
+            current = index['entries'].get(key)
+            if current is not None and current['file'] == entry['file']:
+                # 缓存文件损坏或格式不可用，丢弃该条目
+                index_file.remove_file(current)
+                del index['entries'][key]
+                index_file.write(index)
+        return None
+
+    def save_frame(self, filename: str, df: pd.DataFrame, variant: str = '') -> None:
+        """
+        将DataFrame写入缓存
+
+        Args:
+            filename: 工作簿路径
+            df: 要缓存的数据
+            variant: 缓存变体名
+        """
+        fingerprint = self.file_fingerprint(filename)
+        cache_dir = self.get_cache_dir(filename)
+        index_file = self.index_file(cache_dir)
+        os.makedirs(cache_dir, exist_ok=True)
+        key = self._entry_key(fingerprint, variant)
+
+        data = df.reset_index(drop=True)
+        data.columns = [str(col) for col in data.columns]
+
+        entry_format = 'pickle'
+        entry_file = f"{key}.pkl"
+        if HAS_PYARROW:
+            try:
+                entry_path = os.path.join(cache_dir, f"{key}.feather")
+                tmp_path = tmp_path_for(entry_path)
+                # 不压缩：压缩的文件读取时需要整列解压，内存映射不起作用
+                feather.write_feather(data, tmp_path, compression='uncompressed')
+                os.replace(tmp_path, entry_path)
+                entry_format = 'feather'
+                entry_file = f"{key}.feather"
+            except Exception:
+                # 部分列类型Feather不支持，退化为pickle
+                pass
+
+        if entry_format == 'pickle':
+            entry_path = os.path.join(cache_dir, entry_file)
+            tmp_path = tmp_path_for(entry_path)
+            data.to_pickle(tmp_path, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, entry_path)
+
+        with index_file.lock():
+            index = index_file.read()
+            self._drop_stale_entries(index, index_file, fingerprint, variant, key)
+            index['entries'][key] = {
+                'path': fingerprint['path'],
+                'fingerprint': self._fingerprint_id(fingerprint),
+                'variant': variant,
+                'file': entry_file,
+                'format': entry_format,
+                'columns': list(data.columns),
+                'bytes': os.path.getsize(os.path.join(cache_dir, entry_file)),
+                'last_access': time.time(),
+            }
+            self._evict(index, index_file)
+            index_file.write(index)
+
+    def _evict(self, index: Dict, index_file: CacheIndex) -> None:
+        """缓存总大小超出上限时，按最近访问时间从旧到新淘汰条目"""
+        total = sum(entry['bytes'] for entry in index['entries'].values())
+        if total <= self.max_bytes:
+            return
+
+        by_access = sorted(index['entries'].items(), key=lambda item: index_file.last_access(item[1]))
+        for key, entry in by_access:
+            if total <= self.max_bytes:
+                break
+            index_file.remove_file(entry)
+            total -= entry['bytes']
+            del index['entries'][key]
+
+    def has_variant(self, filename: str, prefix: str) -> bool:
+        """
+        工作簿的当前版本是否已有变体名以指定前缀开头的缓存条目（只查索引，不读取数据）
+
+        Args:
+            filename: 工作簿路径
+            prefix: 变体名前缀
+
+        Returns:
+            bool: 是否存在
+        """
+        path = os.path.abspath(filename)
+        entries = [entry for entry in self.index_file(self.get_cache_dir(filename)).read()['entries'].values()
+                   if entry['path'] == path and entry['variant'].startswith(prefix)]
+        if not entries:
+            return False
+        fingerprint_id = self._fingerprint_id(self.file_fingerprint(filename))
+        return any(entry.get('fingerprint') == fingerprint_id for entry in entries)
+
+    def invalidate(self, filename: str) -> None:
+        """
+        删除某个工作簿的全部缓存条目
+
+        Args:
+            filename: 工作簿路径
+        """
+        path = os.path.abspath(filename)
+        cache_dir = self.get_cache_dir(filename)
+        index_file = self.index_file(cache_dir)
+        with index_file.lock():
+            index = index_file.read()
+            for key in list(index['entries']):
+                if index['entries'][key]['path'] == path:
+                    index_file.remove_file(index['entries'][key])
+                    del index['entries'][key]
+            index['hashes'].pop(path, None)
+            index_file.write(index)
+
+
+class ResultCache:
+    """对比结果磁盘缓存"""
+
+    def __init__(self, max_age: float = DEFAULT_RESULT_MAX_AGE, max_bytes: int = DEFAULT_RESULT_MAX_BYTES,
+                 fingerprints: Optional[SidecarCache] = None):
+        """
+        初始化结果缓存
+
+        Args:
+            max_age: 条目保留时间（秒）
+            max_bytes: 结果缓存目录的大小上限（字节）
+            fingerprints: 用于计算工作簿内容哈希的旁路缓存（复用其中记录的哈希）
+        """
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self.fingerprints = fingerprints or SidecarCache()
+
+    def get_cache_dir(self, filename: str) -> str:
+        """结果缓存目录（位于本月工作簿的缓存目录下）"""
+        return os.path.join(self.fingerprints.get_cache_dir(filename), RESULT_DIR_NAME)
+
+    def index_file(self, cache_dir: str) -> CacheIndex:
+        """对比结果目录中的结果索引（与工作簿缓存的索引分开）"""
+        return CacheIndex(cache_dir, RESULT_INDEX_FILENAME)
+
+    def result_key(self, current_filename: str, previous_filename: str, spec: Dict) -> str:
+        """
+        根据两个工作簿的内容哈希和规范化的分析参数生成缓存键
+
+        Args:
+            current_filename: 本月工作簿
+            previous_filename: 上月工作簿
+            spec: 分析参数（模式、维度、指标、切分点等）
+
+        Returns:
+            str: 缓存键
+        """
+        current_hash, previous_hash = self.pair_hashes(current_filename, previous_filename)
+        canonical = json.dumps({
+            'version': RESULT_FORMAT_VERSION,
+            'current': current_hash,
+            'previous': previous_hash,
+            'spec': spec,
+        }, ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:32]
+
+    def pair_hashes(self, current_filename: str, previous_filename: str) -> Tuple[str, str]:
+        """两个工作簿当前版本的内容哈希"""
+        return (self.fingerprints.file_fingerprint(current_filename)['sha256'],
+                self.fingerprints.file_fingerprint(previous_filename)['sha256'])
+
+    def has_results(self, current_filename: str, previous_filename: str, spec_fields: Dict) -> bool:
+        """
+        这两个工作簿的当前版本是否已有未过期的对比结果（只查索引，不读取结果）
+
+        Args:
+            current_filename: 本月工作簿
+            previous_filename: 上月工作簿
+            spec_fields: 分析参数中必须一致的字段（如指标列）
+
+        Returns:
+            bool: 是否存在
+        """
+        current, previous = os.path.abspath(current_filename), os.path.abspath(previous_filename)
+        now = time.time()
+        entries = [
+            entry for entry in self.index_file(self.get_cache_dir(current_filename)).read()['entries'].values()
+            if entry['current'] == current and entry['previous'] == previous
+            and now - entry['created'] <= self.max_age
+            and all(entry['spec'].get(field) == value for field, value in spec_fields.items())
+        ]
+        if not entries:
+            return False
+        hashes = list(self.pair_hashes(current_filename, previous_filename))
+        return any(entry.get('hashes') == hashes for entry in entries)
+
+    def load(self, current_filename: str, previous_filename: str, spec: Dict) -> Optional[pd.DataFrame]:
+        """
+        读取缓存的对比结果
+
+        Args:
+            current_filename: 本月工作簿
+            previous_filename: 上月工作簿
+            spec: 分析参数
+
+        Returns:
+            Optional[pd.DataFrame]: 命中且未过期时返回结果，否则返回None
+        """
+        cache_dir = self.get_cache_dir(current_filename)
+        index_file = self.index_file(cache_dir)
+        key = self.result_key(current_filename, previous_filename, spec)
+        entry = index_file.read()['entries'].get(key)
+        if entry is None:
+            return None
+
+        try:
+            if time.time() - entry['created'] > self.max_age:
+                raise ValueError('条目已过期')
+            df = pd.read_pickle(os.path.join(cache_dir, entry['file']))
+        except Exception:
+            df = None
+
+        if df is not None:
+            # 命中时只更新结果文件的修改时间，不加锁、不改写索引
+            index_file.touch(entry)
+            return df
+
+        with index_file.lock():
+            index = index_file.read()
+            current = index['entries'].get(key)
+            if current is not None and current['created'] == entry['created']:
+                index_file.remove_file(current)
+                del index['entries'][key]
+                index_file.write(index)
+        return None
+
+    def save(self, current_filename: str, previous_filename: str, spec: Dict, df: pd.DataFrame) -> None:
+        """
+        写入对比结果，并清理过期和超出大小上限的条目
+
+        Args:
+            current_filename: 本月工作簿
+            previous_filename: 上月工作簿
+            spec: 分析参数
+            df: 对比结果
+        """
+        cache_dir = self.get_cache_dir(current_filename)
+        index_file = self.index_file(cache_dir)
+        os.makedirs(cache_dir, exist_ok=True)
+        key = self.result_key(current_filename, previous_filename, spec)
+        hashes = list(self.pair_hashes(current_filename, previous_filename))
+        entry_file = f"{key}.pkl"
+
+        entry_path = os.path.join(cache_dir, entry_file)
+        tmp_path = tmp_path_for(entry_path)
+        df.to_pickle(tmp_path, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, entry_path)
+
+        now = time.time()
+        with index_file.lock():
+            index = index_file.read()
+            index['entries'][key] = {
+                'current': os.path.abspath(current_filename),
+                'previous': os.path.abspath(previous_filename),
+                'spec': spec,
+                'hashes': hashes,
+                'file': entry_file,
+                'bytes': os.path.getsize(os.path.join(cache_dir, entry_file)),
+                'created': now,
+                'last_access': now,
+            }
+            self._expire(index, index_file, now)
+            index_file.write(index)
+
+    def _expire(self, index: Dict, index_file: CacheIndex, now: float) -> None:
+        """删除过期条目；总大小仍超出上限时按最近访问时间从旧到新淘汰"""
+        for key in list(index['entries']):
+            entry = index['entries'][key]
+            if now - entry['created'] > self.max_age:
+                index_file.remove_file(entry)
+                del index['entries'][key]
+
+        total = sum(entry['bytes'] for entry in index['entries'].values())
+        by_access = sorted(index['entries'].items(), key=lambda item: index_file.last_access(item[1]))
+        for key, entry in by_access:
+            if total <= self.max_bytes:
+                break
+            index_file.remove_file(entry)
+            total -= entry['bytes']
+            del index['entries'][key]
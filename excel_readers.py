@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Excel读取模块
+功能：以只读流式方式按批次读取工作簿，支持超出内存的大文件；
+提供可插拔的读取引擎（fastexcel / calamine / openpyxl / CSV / Parquet），
+根据已安装的库和文件大小自动选择。
+
+说明：单元格取值规则与 pd.read_excel(engine='openpyxl') 保持一致，
+整数值的浮点数转换为int，空行跳过，空表头命名为 "Unnamed: 序号"。
+"""
+
+import importlib.util
+import os
+import time
+from abc import ABC, abstractmethod
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+
+
+# 流式读取时每批次的默认行数
+DEFAULT_BATCH_SIZE = 50000
+# 小于该大小的工作簿直接使用pd.read_excel，更大的文件使用只读流式读取
+STREAMING_THRESHOLD_BYTES = 20 * 1024 * 1024
+
+
+def _convert_cell(value):
+    """按pandas的规则转换单元格值（整数值的浮点数转为int）"""
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def _normalize_header(header_row) -> List[str]:
+    """规范化表头，空表头按pandas规则命名"""
+    header = []
+    for i, value in enumerate(header_row):
+        if value is None:
+            header.append(f"Unnamed: {i}")
+        else:
+            header.append(str(_convert_cell(value)))
+    return header
+
+
+def read_header(filename: str) -> List[str]:
+    """
+    只读取工作簿第一个工作表的表头
+
+    Args:
+        filename: Excel文件路径
+
+    Returns:
+        List[str]: 列名列表
+    """
+    workbook = load_workbook(filename, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        return _normalize_header(next(rows, ()))
+    finally:
+        workbook.close()
+
+
+def iter_row_batches(filename: str, batch_size: int = DEFAULT_BATCH_SIZE,
+                     columns: Optional[List[str]] = None) -> Iterator[pd.DataFrame]:
+    """
+    按批次流式读取工作簿第一个工作表
+
+    每次只在内存中保留一个批次的数据，适合超出内存的大文件。
+
+    Args:
+        filename: Excel文件路径
+        batch_size: 每批次行数
+        columns: 只读取的列，为None时读取全部列
+
+    Yields:
+        pd.DataFrame: 每个批次的数据
+    """
+    workbook = load_workbook(filename, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = _normalize_header(next(rows, ()))
+        width = len(header)
+
+        if columns is None:
+            positions = list(range(width))
+        else:
+            missing = [col for col in columns if col not in header]
+            if missing:
+                raise KeyError(f"列不存在: {missing}")
+            positions = [header.index(col) for col in columns]
+        names = [header[i] for i in positions]
+
+        batch = []
+        for row in rows:
+            if row is None or all(value is None for value in row):
+                continue
+            if len(row) < width:
+                row = tuple(row) + (None,) * (width - len(row))
+            batch.append([_convert_cell(row[i]) for i in positions])
+
+            if len(batch) >= batch_size:
+                yield pd.DataFrame.from_records(batch, columns=names)
+                batch = []
+
+        if batch:
+            yield pd.DataFrame.from_records(batch, columns=names)
+    finally:
+        workbook.close()
+
+
+def read_columns(filename: str, columns: List[str]) -> pd.DataFrame:
+    """
+    只读取指定列（列投影读取）
+
+    按列收集单元格值，跳过未选中列的取值转换和DataFrame构建。
+
+    Args:
+        filename: Excel文件路径
+        columns: 要读取的列
+
+    Returns:
+        pd.DataFrame: 只包含指定列的数据
+    """
+    workbook = load_workbook(filename, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = _normalize_header(next(rows, ()))
+
+        missing = [col for col in columns if col not in header]
+        if missing:
+            raise KeyError(f"列不存在: {missing}")
+        positions = [header.index(col) for col in columns]
+        values = [[] for _ in positions]
+
+        for row in rows:
+            if row is None or all(value is None for value in row):
+                continue
+            width = len(row)
+            for target, i in zip(values, positions):
+                target.append(_convert_cell(row[i]) if i < width else None)
+
+        return pd.DataFrame({col: target for col, target in zip(columns, values)}, columns=columns)
+    finally:
+        workbook.close()
+
+
+def read_sample(filename: str, nrows: int = 1000) -> pd.DataFrame:
+    """
+    读取工作簿的前若干行，用于列结构分析
+
+    Args:
+        filename: Excel文件路径
+        nrows: 读取行数
+
+    Returns:
+        pd.DataFrame: 样本数据
+    """
+    for batch in iter_row_batches(filename, batch_size=nrows):
+        return batch
+    return pd.DataFrame(columns=read_header(filename))
+
+
+def _module_available(name: str) -> bool:
+    """检查可选依赖是否已安装"""
+    return importlib.util.find_spec(name) is not None
+
+
+def _restore_integer_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """将全部为整数值且无缺失的浮点列转为int64，与pd.read_excel的列类型保持一致"""
+    for col in df.columns:
+        values = df[col]
+        if values.dtype.kind == 'f' and values.notna().all():
+            array = values.to_numpy()
+            if np.all(np.isfinite(array)) and np.all(array == np.floor(array)) \
+                    and np.all(np.abs(array) < 2 ** 63):
+                df[col] = array.astype(np.int64)
+    return df
+
+
+class ReaderEngine(ABC):
+    """读取引擎基类（子类实现 read）"""
+    
+    name = ''
+    extensions: Tuple[str, ...] = ()
+    
+    def is_available(self) -> bool:
+        """引擎依赖是否已安装"""
+        return True
+    
+    def supports(self, filename: str) -> bool:
+        """引擎是否支持该文件类型"""
+        return os.path.splitext(filename)[1].lower() in self.extensions
+    
+    @abstractmethod
+    def read(self, filename: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        读取文件第一个工作表（或整张表）
+        
+        Args:
+            filename: 文件路径
+            columns: 只读取的列，为None时读取全部列
+            
+        Returns:
+            pd.DataFrame: 数据
+        """
+
+
+class FastexcelEngine(ReaderEngine):
+    """fastexcel引擎（Rust calamine + Arrow，支持列投影）"""
+    
+    name = 'fastexcel'
+    extensions = ('.xlsx', '.xlsm', '.xlsb', '.xls', '.ods')
+    
+    def is_available(self) -> bool:
+        return _module_available('fastexcel') and _module_available('pyarrow')
+    
+    def read(self, filename: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        import fastexcel
+        sheet = fastexcel.read_excel(filename).load_sheet(0, use_columns=columns)
+        df = sheet.to_pandas()
+        if columns is not None:
+            df = df[columns]
+        return _restore_integer_columns(df)
+
+
+class CalamineEngine(ReaderEngine):
+    """python-calamine引擎（通过pd.read_excel(engine='calamine')）"""
+    
+    name = 'calamine'
+    extensions = ('.xlsx', '.xlsm', '.xlsb', '.xls', '.ods')
+    
+    def is_available(self) -> bool:
+        return _module_available('python_calamine')
+    
+    def read(self, filename: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        df = pd.read_excel(filename, sheet_name=0, engine='calamine', usecols=columns)
+        return df if columns is None else df[columns]
+
+
+class OpenpyxlEngine(ReaderEngine):
+    """openpyxl引擎（pd.read_excel默认引擎）"""
+    
+    name = 'openpyxl'
+    extensions = ('.xlsx', '.xlsm')
+    
+    def read(self, filename: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        if columns is not None:
+            return read_columns(filename, columns)
+        return pd.read_excel(filename, sheet_name=0)
+
+
+class OpenpyxlStreamingEngine(ReaderEngine):
+    """openpyxl只读流式引擎（逐行读取，只收集需要的列）"""
+    
+    name = 'openpyxl-stream'
+    extensions = ('.xlsx', '.xlsm')
+    
+    def read(self, filename: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        if columns is None:
+            columns = read_header(filename)
+        return read_columns(filename, columns)
+
+
+class CsvEngine(ReaderEngine):
+    """CSV直读引擎"""
+    
+    name = 'csv'
+    extensions = ('.csv',)
+    
+    def read(self, filename: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        df = pd.read_csv(filename, usecols=columns)
+        return df if columns is None else df[columns]
+
+
+class ParquetEngine(ReaderEngine):
+    """Parquet / Feather直读引擎"""
+    
+    name = 'parquet'
+    extensions = ('.parquet', '.feather')
+    
+    def is_available(self) -> bool:
+        return _module_available('pyarrow')
+    
+    def read(self, filename: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        if filename.lower().endswith('.feather'):
+            return pd.read_feather(filename, columns=columns)
+        return pd.read_parquet(filename, columns=columns)
+
+
+# 按优先级排列的读取引擎
+READER_ENGINES = [
+    FastexcelEngine(),
+    CalamineEngine(),
+    OpenpyxlEngine(),
+    OpenpyxlStreamingEngine(),
+    CsvEngine(),
+    ParquetEngine(),
+]
+
+
+def get_engine(name: str) -> ReaderEngine:
+    """
+    按名称获取读取引擎
+    
+    Args:
+        name: 引擎名称
+        
+    Returns:
+        ReaderEngine: 读取引擎
+    """
+    for engine in READER_ENGINES:
+        if engine.name == name:
+            return engine
+    raise ValueError(f"未知的读取引擎: {name}，可选: {[e.name for e in READER_ENGINES]}")
+
+
+def available_engines() -> List[str]:
+    """返回当前环境中可用的读取引擎名称"""
+    return [engine.name for engine in READER_ENGINES if engine.is_available()]
+
+
+def select_engine(filename: str) -> ReaderEngine:
+    """
+    根据文件类型、已安装的库和文件大小自动选择读取引擎
+    
+    Excel文件优先使用fastexcel或calamine；都未安装时，小文件使用pd.read_excel，
+    大文件使用openpyxl只读流式读取。
+    
+    Args:
+        filename: 文件路径
+        
+    Returns:
+        ReaderEngine: 选中的读取引擎
+    """
+    candidates = [e for e in READER_ENGINES if e.supports(filename) and e.is_available()]
+    if not candidates:
+        raise ValueError(f"没有可用的读取引擎支持该文件: {filename}")
+    
+    for engine in candidates:
+        if engine.name in ('fastexcel', 'calamine'):
+            return engine
+    
+    if os.path.getsize(filename) >= STREAMING_THRESHOLD_BYTES:
+        for engine in candidates:
+            if engine.name == 'openpyxl-stream':
+                return engine
+    return candidates[0]
+
+
+def read_table(filename: str, columns: Optional[List[str]] = None,
+               engine: Optional[str] = None) -> Tuple[pd.DataFrame, str, float]:
+    """
+    使用指定或自动选择的引擎读取文件
+    
+    Args:
+        filename: 文件路径
+        columns: 只读取的列，为None时读取全部列
+        engine: 引擎名称，为None或'auto'时自动选择
+        
+    Returns:
+        Tuple[pd.DataFrame, str, float]: (数据, 引擎名称, 耗时秒数)
+    """
+    if engine in (None, 'auto'):
+        reader = select_engine(filename)
+    else:
+        reader = get_engine(engine)
+        if not reader.is_available():
+            raise ValueError(f"读取引擎 {engine} 的依赖未安装")
+    
+    start = time.perf_counter()
+    df = reader.read(filename, columns)
+    return df, reader.name, time.perf_counter() - start
@@ -0,0 +1,532 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+执行后端模块
+功能：把分析核心中的 分组汇总、区间分箱、两期合并 三个操作抽象为可替换的执行后端。
+pandas 为参考实现；安装了 polars 或 duckdb 时可选用对应后端，以多线程、惰性方式执行；
+parallel 后端按分组键哈希分区，在多个进程中通过共享内存并行分组汇总。
+
+各后端的结果必须与pandas参考实现一致：
+  - 分组结果按分组键排序（分类列按类别顺序，文本按字典序），空值排在最后
+  - 整数指标的合计为int64，浮点指标的合计为float64，空值不参与求和
+  - 分类类型的分组键在结果中保持原有类型
+
+一致性测试见 tests/test_execution_backends.py。
+"""
+
+import importlib.util
+import os
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+# 两期合并时指标列的后缀
+PERIOD_SUFFIXES = ('_本月', '_上月')
+# 并行分组汇总的最少行数，行数较少时进程启动开销超过收益，直接单进程汇总
+PARALLEL_MIN_ROWS = 500000
+
+
+def _widen_sums(df: pd.DataFrame, metric_cols: List[str]) -> pd.DataFrame:
+    """合计列统一为int64 / float64"""
+    for col in metric_cols:
+        if pd.api.types.is_integer_dtype(df[col]):
+            df[col] = df[col].astype(np.int64)
+        elif pd.api.types.is_float_dtype(df[col]):
+            df[col] = df[col].astype(np.float64)
+    return df
+
+
+class KeyCodec:
+    """
+    分组键编解码：分类键替换为整数编码（排序即类别顺序），其余键保持原值
+
+    非pandas后端在编码后的键上分组、合并和排序，结果再还原为原有类型，
+    从而与pandas按类别顺序排序的行为一致。
+    """
+
+    def __init__(self, frames: List[pd.DataFrame], keys: List[str]):
+        """
+        Args:
+            frames: 参与运算的数据（合并时为两期数据）
+            keys: 分组键
+        """
+        self.dtypes: Dict[str, pd.CategoricalDtype] = {}
+        for key in keys:
+            dtypes = [frame[key].dtype for frame in frames]
+            # 所有输入的类别完全一致时才按编码处理，否则与pandas一样按取值处理
+            if all(isinstance(dtype, pd.CategoricalDtype) for dtype in dtypes) and \
+                    all(dtype == dtypes[0] for dtype in dtypes):
+                self.dtypes[key] = dtypes[0]
+
+    def encode(self, df: pd.DataFrame, columns: List[str]) -> pd.DataFrame:
+        """取出指定列，分类键替换为编码（空值编码为缺失）"""
+        encoded = {}
+        for col in columns:
+            values = df[col]
+            if col in self.dtypes:
+                encoded[col] = pd.array(np.where(values.cat.codes >= 0, values.cat.codes, np.nan)).astype('Int64')
+            elif isinstance(values.dtype, pd.CategoricalDtype):
+                encoded[col] = values.astype(object)
+            else:
+                encoded[col] = values
+        return pd.DataFrame(encoded, columns=columns)
+
+    def decode(self, df: pd.DataFrame) -> pd.DataFrame:
+        """将编码后的键还原为分类类型"""
+        for col, dtype in self.dtypes.items():
+            if col in df.columns:
+                codes = pd.to_numeric(df[col]).fillna(-1).to_numpy(dtype=np.int64)
+                df[col] = pd.Categorical.from_codes(codes, dtype=dtype)
+        return df
+
+
+class ExecutionBackend:
+    """执行后端基类（pandas参考实现）"""
+
+    name = 'pandas'
+    description = 'pandas参考实现（单线程）'
+
+    def is_available(self) -> bool:
+        """后端依赖是否已安装"""
+        return True
+
+    def group_sum(self, df: pd.DataFrame, group_by_cols: List[str], metric_cols: List[str],
+                  dropna: bool = True) -> pd.DataFrame:
+        """
+        按分组键对指标求和
+
+        Args:
+            df: 数据（指标列应为数值类型）
+            group_by_cols: 分组键
+            metric_cols: 指标列
+            dropna: 是否丢弃分组键为空的行
+
+        Returns:
+            pd.DataFrame: 分组键 + 各指标合计，按分组键排序
+        """
+        grouped = df.groupby(group_by_cols, observed=True, dropna=dropna)[metric_cols].sum().reset_index()
+        return _widen_sums(grouped, metric_cols)
+
+    def bin_interval(self, values: pd.Series, cutpoints: List[float], labels: List[str]) -> pd.Categorical:
+        """
+        按切分点分箱，区间左闭右开
+
+        Args:
+            values: 数值
+            cutpoints: 升序切分点
+            labels: 区间标签
+
+        Returns:
+            pd.Categorical: 区间（空值为缺失）
+        """
+        bins = [-np.inf] + list(cutpoints) + [np.inf]
+        return pd.cut(values, bins=bins, labels=labels, include_lowest=True, right=False).array
+
+    def merge_periods(self, current_df: pd.DataFrame, previous_df: pd.DataFrame,
+                      group_by_cols: List[str]) -> pd.DataFrame:
+        """
+        两期数据按分组键全外连接，同名指标列分别加 _本月 / _上月 后缀
+
+        Args:
+            current_df: 本月汇总
+            previous_df: 上月汇总
+            group_by_cols: 分组键
+
+        Returns:
+            pd.DataFrame: 合并结果，按分组键排序
+        """
+        return pd.merge(current_df, previous_df, on=group_by_cols, how='outer', suffixes=PERIOD_SUFFIXES)
+
+    def close(self) -> None:
+        """释放后端持有的资源（如进程池），之后再次使用时重新创建"""
+
+
+class ExternalBackend(ExecutionBackend, ABC):
+    """非pandas后端的公共逻辑：键编码、空键处理、列重命名和结果还原（子类实现分组求和与全外连接）"""
+
+    module_name = ''
+
+    def is_available(self) -> bool:
+        return importlib.util.find_spec(self.module_name) is not None
+
+    def group_sum(self, df: pd.DataFrame, group_by_cols: List[str], metric_cols: List[str],
+                  dropna: bool = True) -> pd.DataFrame:
+        codec = KeyCodec([df], group_by_cols)
+        frame = codec.encode(df, group_by_cols)
+        for col in metric_cols:
+            frame[col] = df[col].to_numpy()
+        integer_cols = [col for col in metric_cols if pd.api.types.is_integer_dtype(df[col])]
+
+        result = self._group_sum(frame, group_by_cols, metric_cols, integer_cols, dropna)
+        return _widen_sums(codec.decode(result).reset_index(drop=True), metric_cols)
+
+    def merge_periods(self, current_df: pd.DataFrame, previous_df: pd.DataFrame,
+                      group_by_cols: List[str]) -> pd.DataFrame:
+        # pandas合并时空键互相匹配，其他后端不匹配；含空键时使用参考实现
+        if any(frame[col].isna().any() for frame in (current_df, previous_df) for col in group_by_cols):
+            return super().merge_periods(current_df, previous_df, group_by_cols)
+
+        codec = KeyCodec([current_df, previous_df], group_by_cols)
+        overlap = [col for col in current_df.columns
+                   if col in previous_df.columns and col not in group_by_cols]
+        left = codec.encode(current_df, list(current_df.columns)).rename(
+            columns={col: col + PERIOD_SUFFIXES[0] for col in overlap})
+        right = codec.encode(previous_df, list(previous_df.columns)).rename(
+            columns={col: col + PERIOD_SUFFIXES[1] for col in overlap})
+
+        columns = list(left.columns) + [col for col in right.columns if col not in group_by_cols]
+        merged = self._outer_join(left, right, group_by_cols)[columns]
+        # 与pandas一致：未匹配而出现缺失的整数列为float64
+        for col in merged.columns:
+            if col not in group_by_cols and isinstance(merged[col].dtype, pd.api.extensions.ExtensionDtype) \
+                    and pd.api.types.is_integer_dtype(merged[col]):
+                merged[col] = merged[col].astype(np.float64 if merged[col].isna().any() else np.int64)
+        return codec.decode(merged.reset_index(drop=True))
+
+    @abstractmethod
+    def _group_sum(self, frame: pd.DataFrame, keys: List[str], metric_cols: List[str],
+                   integer_cols: List[str], dropna: bool) -> pd.DataFrame:
+        """
+        在编码后的键上分组求和
+
+        Args:
+            frame: 编码后的分组键 + 指标列
+            keys: 分组键
+            metric_cols: 指标列
+            integer_cols: 合计应为int64的指标列
+            dropna: 是否丢弃分组键为空的行
+
+        Returns:
+            pd.DataFrame: 分组键 + 各指标合计，按分组键排序（空值在最后）
+        """
+
+    @abstractmethod
+    def _outer_join(self, left: pd.DataFrame, right: pd.DataFrame, keys: List[str]) -> pd.DataFrame:
+        """
+        在编码后的键上全外连接（键不含空值）
+
+        Args:
+            left: 本月（指标列已加后缀）
+            right: 上月（指标列已加后缀）
+            keys: 连接键
+
+        Returns:
+            pd.DataFrame: 合并结果，按连接键排序
+        """
+
+
+class PolarsBackend(ExternalBackend):
+    """Polars后端（惰性执行，多线程）"""
+
+    name = 'polars'
+    description = 'Polars（惰性执行，多线程）'
+    module_name = 'polars'
+
+    def _group_sum(self, frame: pd.DataFrame, keys: List[str], metric_cols: List[str],
+                   integer_cols: List[str], dropna: bool) -> pd.DataFrame:
+        import polars as pl
+        query = pl.from_pandas(frame).lazy()
+        if dropna:
+            query = query.drop_nulls(subset=keys)
+        query = query.group_by(keys).agg([
+            pl.col(col).sum().cast(pl.Int64 if col in integer_cols else pl.Float64)
+            for col in metric_cols
+        ]).sort(keys, nulls_last=True)
+        return query.collect().to_pandas()
+
+    def bin_interval(self, values: pd.Series, cutpoints: List[float], labels: List[str]) -> pd.Categorical:
+        import polars as pl
+        series = pl.Series(values.to_numpy(dtype=float), nan_to_null=True)
+        # 区间编号即值在切分点中的右侧插入位置（左闭右开），空值编号为-1
+        positions = pl.Series(list(cutpoints), dtype=pl.Float64).search_sorted(series, side='right')
+        codes = pl.select(pl.when(series.is_null()).then(-1).otherwise(positions).cast(pl.Int64)).to_series()
+        return pd.Categorical.from_codes(codes.to_numpy(), categories=labels, ordered=True)
+
+    def _outer_join(self, left: pd.DataFrame, right: pd.DataFrame, keys: List[str]) -> pd.DataFrame:
+        import polars as pl
+        query = pl.from_pandas(left).lazy().join(
+            pl.from_pandas(right).lazy(), on=keys, how='full', coalesce=True
+        ).sort(keys)
+        return query.collect().to_pandas()
+
+
+class DuckDBBackend(ExternalBackend):
+    """DuckDB后端（直接扫描内存中的DataFrame，多线程）"""
+
+    name = 'duckdb'
+    description = 'DuckDB（向量化SQL，多线程）'
+    module_name = 'duckdb'
+
+    @staticmethod
+    def _quote(name: str) -> str:
+        return '"' + str(name).replace('"', '""') + '"'
+
+    def _group_sum(self, frame: pd.DataFrame, keys: List[str], metric_cols: List[str],
+                   integer_cols: List[str], dropna: bool) -> pd.DataFrame:
+        import duckdb
+        key_list = ', '.join(self._quote(col) for col in keys)
+        sums = ', '.join(
+            f"COALESCE(SUM({self._quote(col)}), 0)::{'BIGINT' if col in integer_cols else 'DOUBLE'} "
+            f"AS {self._quote(col)}" for col in metric_cols
+        )
+        where = ' AND '.join(f"{self._quote(col)} IS NOT NULL" for col in keys) if dropna else 'TRUE'
+        connection = duckdb.connect()
+        try:
+            connection.register('数据', frame)
+            return connection.execute(
+                f"SELECT {key_list}, {sums} FROM 数据 WHERE {where} "
+                f"GROUP BY {key_list} ORDER BY {key_list} NULLS LAST"
+            ).df()
+        finally:
+            connection.close()
+
+    def bin_interval(self, values: pd.Series, cutpoints: List[float], labels: List[str]) -> pd.Categorical:
+        import duckdb
+        cases = ' '.join(f"WHEN v < {float(point)!r} THEN {i}" for i, point in enumerate(cutpoints))
+        connection = duckdb.connect()
+        try:
+            connection.register('数值', pd.DataFrame({'v': values.to_numpy(dtype=float)}))
+            codes = connection.execute(
+                f"SELECT CASE WHEN v IS NULL OR isnan(v) THEN -1 {cases} ELSE {len(cutpoints)} END AS c "
+                f"FROM 数值"
+            ).df()['c'].to_numpy(dtype=np.int64)
+        finally:
+            connection.close()
+        return pd.Categorical.from_codes(codes, categories=labels, ordered=True)
+
+    def _outer_join(self, left: pd.DataFrame, right: pd.DataFrame, keys: List[str]) -> pd.DataFrame:
+        import duckdb
+        key_select = ', '.join(
+            f"COALESCE(l.{self._quote(col)}, r.{self._quote(col)}) AS {self._quote(col)}" for col in keys
+        )
+        others = [f"l.{self._quote(col)}" for col in left.columns if col not in keys] + \
+            [f"r.{self._quote(col)}" for col in right.columns if col not in keys]
+        condition = ' AND '.join(f"l.{self._quote(col)} = r.{self._quote(col)}" for col in keys)
+        order = ', '.join(str(i + 1) for i in range(len(keys)))
+        connection = duckdb.connect()
+        try:
+            connection.register('本月', left)
+            connection.register('上月', right)
+            return connection.execute(
+                f"SELECT {', '.join([key_select] + others)} FROM 本月 l FULL OUTER JOIN 上月 r "
+                f"ON {condition} ORDER BY {order}"
+            ).df()
+        finally:
+            connection.close()
+
+
+def _attach_array(spec: Tuple[str, str, int]) -> Tuple[shared_memory.SharedMemory, np.ndarray]:
+    """按 (共享内存名, 类型, 长度) 附加到共享内存中的数组"""
+    name, dtype, length = spec
+    block = shared_memory.SharedMemory(name=name)
+    return block, np.ndarray(length, dtype=np.dtype(dtype), buffer=block.buf)
+
+
+def _partition_group_sum(offset: int, length: int, key_specs: Dict[str, Tuple[str, str, int]],
+                         metric_specs: Dict[str, Tuple[str, str, int]]) -> pd.DataFrame:
+    """
+    在子进程中汇总一个分区（供进程池调用，必须定义在模块顶层）
+
+    共享内存中的数组已按分区排好序，每个分区是一段连续的行 [offset, offset + length)。
+
+    Args:
+        offset: 分区首行位置
+        length: 分区行数
+        key_specs: {分组键: 编码数组}
+        metric_specs: {指标: 数值数组}
+
+    Returns:
+        pd.DataFrame: 该分区的 分组键编码 + 指标合计
+    """
+    blocks = []
+    try:
+        frame = {}
+        for col, spec in list(key_specs.items()) + list(metric_specs.items()):
+            block, values = _attach_array(spec)
+            blocks.append(block)
+            frame[col] = values[offset:offset + length]
+        frame = pd.DataFrame(frame)
+        return frame.groupby(list(key_specs), sort=False)[list(metric_specs)].sum().reset_index()
+    finally:
+        for block in blocks:
+            block.close()
+
+
+class ParallelBackend(ExecutionBackend):
+    """
+    多进程pandas后端：按分组键哈希分区，各分区在子进程中通过共享内存汇总，结果直接拼接
+
+    主进程按分区编号稳定排序一次，各分区成为共享内存中的一段连续行，子进程只读取自己的区段。
+    同一分组的所有行落在同一分区且保持原有顺序，每个分区的合计与单进程汇总完全相同。
+    子进程在首次并行汇总时启动并常驻，之后的每次汇总复用同一进程池，close() 时关闭。
+
+    只有对原始行的分组求和（group_and_summarize）会走并行路径：关闭立方体（use_cube=False / --no-cube）
+    按维度汇总时的本月、上月汇总，以及小计模式的最细粒度汇总。立方体的行数通常低于 min_rows，直接单进程汇总；
+    两个月份单次分组汇总、区间分箱和两期合并的数据量小或已预先汇总，沿用pandas参考实现。
+    """
+
+    name = 'parallel'
+    description = '多进程pandas（哈希分区 + 共享内存）'
+
+    def __init__(self, workers: Optional[int] = None, min_rows: int = PARALLEL_MIN_ROWS):
+        """
+        Args:
+            workers: 进程数，为None时使用CPU核数
+            min_rows: 行数少于该值时单进程汇总
+        """
+        if workers is not None and workers < 1:
+            raise ValueError(f"进程数必须为正整数: {workers}")
+        self.workers = workers or os.cpu_count() or 1
+        self.min_rows = min_rows
+        self._executor = None
+        self._executor_workers = 0
+        # 批量模式下多个线程共用同一后端，进程池的创建和关闭在此锁内进行
+        self._executor_lock = threading.Lock()
+
+    def _pool(self) -> ProcessPoolExecutor:
+        """常驻进程池：首次使用时创建，进程数改变后重新创建"""
+        with self._executor_lock:
+            if self._executor is not None and self._executor_workers != self.workers:
+                self._executor.shutdown()
+                self._executor = None
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                self._executor_workers = self.workers
+            return self._executor
+
+    def close(self) -> None:
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+    @staticmethod
+    def _encode_key(values: pd.Series) -> Tuple[np.ndarray, object]:
+        """
+        分组键编码为int64（编码顺序即排序顺序，空值为-1）
+
+        Returns:
+            Tuple[np.ndarray, object]: (编码, 解码所需的类别类型或取值)
+        """
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            return values.cat.codes.to_numpy(dtype=np.int64), values.dtype
+        codes, uniques = pd.factorize(values, sort=True)
+        return codes.astype(np.int64), uniques
+
+    @staticmethod
+    def _decode_key(codes: np.ndarray, decoder: object) -> pd.Series:
+        """
+        由编码还原分组键，类型与原始列一致（与pandas分组结果相同：含空值的整数键为float64）
+
+        Args:
+            codes: 编码（空值为-1）
+            decoder: _encode_key 返回的类别类型或取值
+
+        Returns:
+            pd.Series: 分组键
+        """
+        if isinstance(decoder, pd.CategoricalDtype):
+            return pd.Series(pd.Categorical.from_codes(codes, dtype=decoder))
+        values = pd.Series(decoder.take(np.where(codes < 0, 0, codes)))
+        missing = codes < 0
+        return values.where(~missing) if missing.any() else values
+
+    @staticmethod
+    def _hash_partitions(codes: List[np.ndarray], partitions: int) -> np.ndarray:
+        """由各分组键的编码计算行哈希并取模得到分区编号"""
+        with np.errstate(over='ignore'):
+            hashed = np.zeros(len(codes[0]), dtype=np.uint64)
+            for key_codes in codes:
+                hashed = hashed * np.uint64(0x100000001B3) + (key_codes + 1).astype(np.uint64)
+            # splitmix64 末端混合，使相邻编码分散到不同分区
+            hashed ^= hashed >> np.uint64(30)
+            hashed *= np.uint64(0xBF58476D1CE4E5B9)
+            hashed ^= hashed >> np.uint64(27)
+            hashed *= np.uint64(0x94D049BB133111EB)
+            hashed ^= hashed >> np.uint64(31)
+        return (hashed % np.uint64(partitions)).astype(np.intp)
+
+    def group_sum(self, df: pd.DataFrame, group_by_cols: List[str], metric_cols: List[str],
+                  dropna: bool = True) -> pd.DataFrame:
+        numeric = all(isinstance(df[col].dtype, np.dtype) and df[col].dtype.kind in 'iuf' for col in metric_cols)
+        if self.workers < 2 or len(df) < self.min_rows or not numeric:
+            return super().group_sum(df, group_by_cols, metric_cols, dropna)
+
+        encoded = {col: self._encode_key(df[col]) for col in group_by_cols}
+        partitions = self._hash_partitions([codes for codes, _ in encoded.values()], self.workers)
+        if dropna:
+            # 分组键为空的行不分配给任何分区（排序后位于所有分区之前）
+            for codes, _ in encoded.values():
+                partitions[codes < 0] = -1
+
+        # 按分区编号稳定排序一次：每个分区成为一段连续行，分区内保持原有行顺序
+        order = np.argsort(partitions, kind='stable')
+        sizes = np.bincount(partitions[partitions >= 0], minlength=self.workers)
+        offsets = np.searchsorted(partitions[order], np.arange(self.workers), side='left')
+
+        blocks = []
+
+        def share(values: np.ndarray) -> Tuple[str, str, int]:
+            """按分区顺序把数组写入共享内存"""
+            block = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+            blocks.append(block)
+            np.take(values, order, out=np.ndarray(len(values), dtype=values.dtype, buffer=block.buf))
+            return block.name, values.dtype.str, len(values)
+
+        try:
+            key_specs = {col: share(codes) for col, (codes, _) in encoded.items()}
+            metric_specs = {col: share(df[col].to_numpy()) for col in metric_cols}
+            parts = list(self._pool().map(
+                _partition_group_sum, offsets.tolist(), sizes.tolist(),
+                [key_specs] * self.workers, [metric_specs] * self.workers
+            ))
+        except BrokenProcessPool:
+            # 子进程异常退出后进程池不可再用，丢弃以便下次重新创建
+            self._executor = None
+            raise
+        finally:
+            for block in blocks:
+                block.close()
+                block.unlink()
+
+        # 分区互不相交，直接拼接后按编码排序（空值编码排在最后）
+        grouped = pd.concat(parts, ignore_index=True)
+        order = np.lexsort([np.where(grouped[col] < 0, np.iinfo(np.int64).max, grouped[col])
+                            for col in reversed(group_by_cols)])
+        grouped = grouped.iloc[order].reset_index(drop=True)
+        for col, (_, decoder) in encoded.items():
+            grouped[col] = self._decode_key(grouped[col].to_numpy(), decoder)
+        return _widen_sums(grouped, metric_cols)
+
+
+# 已注册的执行后端
+EXECUTION_BACKENDS = [ExecutionBackend(), PolarsBackend(), DuckDBBackend(), ParallelBackend()]
+
+
+def get_backend(name: str) -> ExecutionBackend:
+    """
+    按名称获取执行后端
+
+    Args:
+        name: 后端名称
+
+    Returns:
+        ExecutionBackend: 执行后端
+    """
+    for backend in EXECUTION_BACKENDS:
+        if backend.name == name:
+            return backend
+    raise ValueError(f"未知的执行后端: {name}，可选: {[b.name for b in EXECUTION_BACKENDS]}")
+
+
+def available_backends() -> List[str]:
+    """返回当前环境中可用的执行后端名称"""
+    return [backend.name for backend in EXECUTION_BACKENDS if backend.is_available()]
+
@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+区间分箱索引模块
+功能：按分箱指标排序一次并保存其他指标的前缀和，
+之后任意切分点的区间边界只需 np.searchsorted，各区间合计为两个前缀和之差，
+耗时只与切分点个数有关，不再分箱、分组或扫描数据行。
+整数指标的前缀和为int64，结果精确；浮点指标的前缀和带补偿项（约双倍精度），
+各区间合计接近精确和（误差通常在末位量级），与分组求和的结果近似一致，但不保证逐位相同。
+
+区间规则与 pd.cut(bins=[-inf, *切分点, inf], right=False) 一致：
+每个区间左闭右开，即 [切分点i, 切分点i+1)。
+流式模式下使用 BinAccumulator 在一次扫描中为多套切分方案同时累计各区间合计；
+CrossBinAccumulator 以二维直方图对两个指标交叉分箱。两者的整数指标都按int64精确累加。
+"""
+
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+
+def assign_bins(values: np.ndarray, cutpoints: List[float]) -> np.ndarray:
+    """
+    向量化计算每个值所在区间的序号（0 ~ 切分点个数）
+
+    Args:
+        values: 指标值（不含空值）
+        cutpoints: 升序切分点
+
+    Returns:
+        np.ndarray: 区间序号
+    """
+    return np.searchsorted(np.asarray(cutpoints, dtype=float), values, side='right')
+
+
+def _two_sum(a: np.ndarray, b: np.ndarray):
+    """无误差加法：返回 (a+b 的浮点结果, 舍入误差)，两者之和精确等于 a+b"""
+    total = a + b
+    b_virtual = total - a
+    return total, (a - (total - b_virtual)) + (b - b_virtual)
+
+
+def prefix_sums(column: np.ndarray):
+    """
+    计算前缀和（首项为0）
+
+    整数列返回 (int64前缀和, None)；浮点列返回 (float64前缀和, 累计舍入误差)，
+    逐项累加的舍入误差由无误差加法得到，其累计作为补偿项。
+
+    Args:
+        column: 指标值（整数列为int64，浮点列不含空值）
+
+    Returns:
+        Tuple[np.ndarray, Optional[np.ndarray]]: (前缀和, 补偿项)
+    """
+    if np.issubdtype(column.dtype, np.integer):
+        return np.concatenate([[0], np.cumsum(column, dtype=np.int64)]), None
+    prefix = np.concatenate([[0.0], np.cumsum(column)])
+    _, errors = _two_sum(prefix[:-1], column)
+    return prefix, np.concatenate([[0.0], np.cumsum(errors)])
+
+
+def range_sums(prefix: np.ndarray, compensation: Optional[np.ndarray],
+               starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """
+    由前缀和计算各区段 [起点, 终点) 的合计
+
+    Args:
+        prefix: 前缀和
+        compensation: 浮点前缀和的补偿项，整数列为None
+        starts: 区段起点
+        ends: 区段终点
+
+    Returns:
+        np.ndarray: 各区段合计
+    """
+    if compensation is None:
+        return prefix[ends] - prefix[starts]
+    # 两个前缀相减的舍入误差同样精确求出，与补偿项之差一起加回
+    difference, error = _two_sum(prefix[ends], -prefix[starts])
+    return difference + (error + (compensation[ends] - compensation[starts]))
+
+
+def bin_totals(codes: np.ndarray, column: np.ndarray, size: int) -> np.ndarray:
+    """
+    按区间编码对一个批次的指标求和
+
+    整数列在int64上累加，结果精确（float64权重在合计超过2^53后会丢失精度）；
+    浮点列按float64累加，空值不参与求和。
+
+    Args:
+        codes: 每行的区间编码
+        column: 指标值
+        size: 区间个数
+
+    Returns:
+        np.ndarray: 各区间合计（整数列为int64，浮点列为float64）
+    """
+    if np.issubdtype(column.dtype, np.integer):
+        totals = np.zeros(size, dtype=np.int64)
+        np.add.at(totals, codes, column.astype(np.int64))
+        return totals
+    return np.bincount(codes, weights=np.nan_to_num(column.astype(float), nan=0.0), minlength=size)
+
+
+def add_totals(accumulated: np.ndarray, totals: np.ndarray) -> np.ndarray:
+    """
+    把本批次的合计加入累计结果
+
+    某个批次的指标列为浮点（如含空值）时，累计结果从int64转为float64，与整表加载时该列为浮点一致。
+
+    Args:
+        accumulated: 累计结果
+        totals: 本批次合计（长度不超过累计结果）
+
+    Returns:
+        np.ndarray: 新的累计结果
+    """
+    if accumulated.dtype.kind == 'i' and totals.dtype.kind == 'f':
+        accumulated = accumulated.astype(np.float64)
+    accumulated[:len(totals)] += totals
+    return accumulated
+
+
+def bins_to_frame(labels: List[str], sums: Dict[str, np.ndarray], sum_cols: List[str]) -> pd.DataFrame:
+    """
+    将各区间的合计整理为 区间 + 各指标合计 的表
+
+    与对分类区间列分组汇总（observed=False）的结果一致：没有数据的区间也输出一行，各指标合计为0。
+
+    Args:
+        labels: 区间标签
+        sums: {指标: 各区间合计}
+        sum_cols: 输出的指标列顺序
+
+    Returns:
+        pd.DataFrame: 区间汇总表
+    """
+    result = pd.DataFrame({'区间': pd.Categorical(labels, categories=labels, ordered=True)})
+    for col in sum_cols:
+        result[col] = sums[col]
+    return result
+
+
+class SortedBinIndex:
+    """按单个指标排序的区间分箱索引"""
+
+    def __init__(self, df: pd.DataFrame, metric_name: str, sum_cols: List[str]):
+        """
+        构建索引（分箱指标为空的行不参与分箱，与pd.cut的结果一致）
+
+        Args:
+            df: 规范化后的月度数据
+            metric_name: 用于分箱的指标列
+            sum_cols: 需要在区间内汇总的指标列
+        """
+        values = pd.to_numeric(df[metric_name], errors='coerce').to_numpy(dtype=float)
+        valid = ~np.isnan(values)
+        order = np.argsort(values[valid], kind='stable')
+
+        self.metric_name = metric_name
+        self.sum_cols = list(sum_cols)
+        self.sorted_values = values[valid][order]
+        # {指标: (前缀和, 补偿项)}
+        self.prefixes: Dict[str, tuple] = {}
+
+        for col in self.sum_cols:
+            column = pd.to_numeric(df[col], errors='coerce')[valid].to_numpy()[order]
+            if np.issubdtype(column.dtype, np.integer):
+                # 整数列用int64累加，保证结果精确
+                column = column.astype(np.int64)
+            else:
+                column = np.nan_to_num(column.astype(float), nan=0.0)
+            self.prefixes[col] = prefix_sums(column)
+
+    def __len__(self) -> int:
+        return len(self.sorted_values)
+
+    def bin_counts_and_sums(self, cutpoints: List[float]):
+        """
+        计算各区间的行数和各指标合计（二分查找边界后对前缀和作差，耗时与数据行数无关）
+
+        Args:
+            cutpoints: 升序切分点
+
+        Returns:
+            Tuple[np.ndarray, Dict[str, np.ndarray]]: (各区间行数, {指标: 各区间合计})
+        """
+        positions = np.searchsorted(self.sorted_values, np.asarray(cutpoints, dtype=float), side='left')
+        boundaries = np.concatenate([[0], positions, [len(self.sorted_values)]])
+        counts = np.diff(boundaries)
+        sums = {col: range_sums(prefix, compensation, boundaries[:-1], boundaries[1:])
+                for col, (prefix, compensation) in self.prefixes.items()}
+        return counts, sums
+
+    def summarize(self, cutpoints: List[float], labels: List[str]) -> pd.DataFrame:
+        """
+        按切分点汇总，输出与 按区间分组汇总 相同的表结构（没有数据的区间合计为0）
+
+        Args:
+            cutpoints: 升序切分点
+            labels: 区间标签
+
+        Returns:
+            pd.DataFrame: 区间列 + 各指标合计
+        """
+        _, sums = self.bin_counts_and_sums(cutpoints)
+        return bins_to_frame(labels, sums, self.sum_cols)
+
+
+class BinAccumulator:
+    """流式分箱累计器：逐批次为多套切分方案同时累计各区间的行数和指标合计"""
+
+    def __init__(self, metric_name: str, schemes: Dict[str, List[float]], sum_cols: List[str]):
+        """
+        Args:
+            metric_name: 用于分箱的指标列
+            schemes: {方案名: 升序切分点}
+            sum_cols: 需要在区间内汇总的指标列
+        """
+        self.metric_name = metric_name
+        self.schemes = {name: list(cutpoints) for name, cutpoints in schemes.items()}
+        self.sum_cols = list(sum_cols)
+        self.counts = {name: np.zeros(len(cutpoints) + 1, dtype=np.int64)
+                       for name, cutpoints in self.schemes.items()}
+        # 整数指标按int64累加；出现浮点批次后该列转为float64
+        self.sums = {name: {col: np.zeros(len(cutpoints) + 1, dtype=np.int64) for col in self.sum_cols}
+                     for name, cutpoints in self.schemes.items()}
+
+    def update(self, batch: pd.DataFrame) -> None:
+        """
+        累计一个批次（指标列应已转换为数值类型）
+
+        Args:
+            batch: 批次数据
+        """
+        values = batch[self.metric_name].to_numpy(dtype=float)
+        valid = ~np.isnan(values)
+        values = values[valid]
+
+        columns = {col: batch[col].to_numpy()[valid] for col in self.sum_cols}
+
+        for name, cutpoints in self.schemes.items():
+            codes = assign_bins(values, cutpoints)
+            size = len(cutpoints) + 1
+            self.counts[name] += np.bincount(codes, minlength=size)
+            for col, column in columns.items():
+                self.sums[name][col] = add_totals(self.sums[name][col], bin_totals(codes, column, size))
+
+    def summarize(self, name: str, labels: List[str]) -> pd.DataFrame:
+        """
+        输出某个方案的区间汇总表
+
+        Args:
+            name: 方案名
+            labels: 区间标签
+
+        Returns:
+            pd.DataFrame: 区间列 + 各指标合计
+        """
+        return bins_to_frame(labels, self.sums[name], self.sum_cols)
+
+
+class CrossBinAccumulator:
+    """双指标交叉分箱累计器：二维直方图，可附加一个维度列，两个月份共用同一组区间编码"""
+
+    def __init__(self, x_metric: str, x_cutpoints: List[float], y_metric: str,
+                 y_cutpoints: List[float], sum_cols: List[str], dimension: Optional[str] = None):
+        """
+        Args:
+            x_metric: 第一个分箱指标
+            x_cutpoints: 第一个指标的升序切分点
+            y_metric: 第二个分箱指标
+            y_cutpoints: 第二个指标的升序切分点
+            sum_cols: 需要在交叉区间内汇总的指标列
+            dimension: 附加的维度列，为None时只按两个区间交叉
+        """
+        self.x_metric, self.x_cutpoints = x_metric, list(x_cutpoints)
+        self.y_metric, self.y_cutpoints = y_metric, list(y_cutpoints)
+        self.sum_cols = list(sum_cols)
+        self.dimension = dimension
+        self.nx = len(self.x_cutpoints) + 1
+        self.ny = len(self.y_cutpoints) + 1
+        # 维度取值 -> 全局编码
+        self.dimension_ids: Dict = {}
+        # 每个期间一组直方图：{期间: 行数}、{期间: {指标: 合计}}
+        self.counts: Dict[int, np.ndarray] = {}
+        self.sums: Dict[int, Dict[str, np.ndarray]] = {}
+
+    def _dimension_codes(self, values: pd.Series) -> np.ndarray:
+        """将维度值映射为全局编码，空值为-1"""
+        codes, uniques = pd.factorize(values)
+        if len(uniques) == 0:
+            return np.full(len(codes), -1, dtype=np.int64)
+        ids = np.array([self.dimension_ids.setdefault(value, len(self.dimension_ids))
+                        for value in uniques], dtype=np.int64)
+        return np.where(codes >= 0, ids[codes], -1)
+
+    def update(self, batch: pd.DataFrame, period: int) -> None:
+        """
+        累计一个批次（指标列应已转换为数值类型）
+
+        Args:
+            batch: 批次数据
+            period: 期间编号（0为本月，1为上月）
+        """
+        x = batch[self.x_metric].to_numpy(dtype=float)
+        y = batch[self.y_metric].to_numpy(dtype=float)
+        valid = ~np.isnan(x) & ~np.isnan(y)
+        if self.dimension is not None:
+            groups = self._dimension_codes(batch[self.dimension])
+            valid &= groups >= 0
+            groups = groups[valid]
+        else:
+            groups = np.zeros(int(valid.sum()), dtype=np.int64)
+
+        cells = (groups * self.nx + assign_bins(x[valid], self.x_cutpoints)) * self.ny \
+            + assign_bins(y[valid], self.y_cutpoints)
+        size = max(len(self.dimension_ids), 1) * self.nx * self.ny
+
+        self._add(self.counts, period, np.bincount(cells, minlength=size))
+        period_sums = self.sums.setdefault(period, {})
+        for col in self.sum_cols:
+            self._add(period_sums, col, bin_totals(cells, batch[col].to_numpy()[valid], size))
+
+    @staticmethod
+    def _add(store: Dict, key, histogram: np.ndarray) -> None:
+        """把本批次的直方图加入累计结果（维度取值增加时累计数组随之加长）"""
+        current = store.get(key)
+        if current is None:
+            store[key] = histogram.astype(np.int64 if histogram.dtype.kind == 'i' else float)
+            return
+        if len(current) < len(histogram):
+            current = np.concatenate([current, np.zeros(len(histogram) - len(current), dtype=current.dtype)])
+        store[key] = add_totals(current, histogram)
+
+    def summarize(self, period: int, x_labels: List[str], y_labels: List[str]) -> pd.DataFrame:
+        """
+        输出某个期间的交叉汇总表
+
+        与区间分箱一致，没有数据的区间组合也输出一行（合计为0）；
+        附加维度时，本期有数据的每个维度取值都输出完整的区间组合。
+
+        Args:
+            period: 期间编号
+            x_labels: 第一个指标的区间标签
+            y_labels: 第二个指标的区间标签
+
+        Returns:
+            pd.DataFrame: [维度列] + 两个区间列 + 各指标合计
+        """
+        block = self.nx * self.ny
+        counts = self.counts.get(period, np.zeros(0, dtype=np.int64))
+        if self.dimension is None:
+            present = np.zeros(1, dtype=np.int64)
+        else:
+            present = np.flatnonzero(counts.reshape(-1, block).sum(axis=1))
+        cells = (present[:, None] * block + np.arange(block)).ravel()
+        groups, rest = np.divmod(cells, block)
+        x_codes, y_codes = np.divmod(rest, self.ny)
+
+        result = pd.DataFrame()
+        keys = [f'{self.x_metric}区间', f'{self.y_metric}区间']
+        if self.dimension is not None:
+            keys.insert(0, self.dimension)
+            values = list(self.dimension_ids)
+            try:
+                categories = sorted(values)
+            except TypeError:
+                categories = values
+            result[self.dimension] = pd.Categorical(
+                np.asarray(values, dtype=object)[groups] if len(values) else [], categories=categories
+            )
+        result[keys[-2]] = pd.Categorical.from_codes(x_codes, categories=x_labels, ordered=True)
+        result[keys[-1]] = pd.Categorical.from_codes(y_codes, categories=y_labels, ordered=True)
+        for col in self.sum_cols:
+            total = self.sums.get(period, {}).get(col, np.zeros(0))
+            result[col] = total[cells] if len(total) else np.zeros(len(cells), dtype=np.int64)
+        return result.sort_values(keys, ignore_index=True)
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分位数草图模块
+功能：提供可合并的KLL分位数草图，按批次累计指标值，
+在不保留（也不合并）原始数据的情况下给出近似分位数和精确的最小值、最大值、均值；
+并基于草图生成等频、对数、自然断点（Jenks）三种切分点建议。
+
+草图按月份分别构建，合并后即得到两个月份整体的分布，流式模式与常规模式共用。
+"""
+
+from typing import Callable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+
+# 草图默认精度参数，越大越精确（k=200时秩误差约1%）
+DEFAULT_SKETCH_K = 200
+# 自然断点计算时从草图中取的代表值个数
+JENKS_SAMPLE_SIZE = 256
+# 切分点建议方法：{名称: 方案前缀}
+SUGGESTION_METHODS = {'等频': 'q', '对数': 'log', '自然断点': 'jenks'}
+
+
+class KLLSketch:
+    """KLL分位数草图（可合并）"""
+
+    def __init__(self, k: int = DEFAULT_SKETCH_K, seed: int = 0):
+        """
+        Args:
+            k: 精度参数
+            seed: 压缩时随机取奇偶位置的种子（固定种子保证结果可复现）
+        """
+        self.k = k
+        self.compactors: List[np.ndarray] = [np.empty(0)]
+        self.count = 0
+        self.total = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+        self._rng = np.random.default_rng(seed)
+
+    def __len__(self) -> int:
+        """草图中保留的样本个数"""
+        return sum(len(items) for items in self.compactors)
+
+    def _capacity(self, level: int) -> int:
+        """各层容量：顶层为k，往下逐层按2/3递减"""
+        depth = len(self.compactors) - level - 1
+        return max(int(np.ceil(self.k * (2 / 3) ** depth)), 2)
+
+    def update(self, values) -> None:
+        """
+        批量加入数值（空值忽略）
+
+        Args:
+            values: 数值数组
+        """
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return
+
+        self.count += len(values)
+        self.total += float(values.sum())
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self.compactors[0] = np.concatenate([self.compactors[0], values])
+        self._compress()
+
+    def merge(self, other: 'KLLSketch') -> 'KLLSketch':
+        """
+        合并另一个草图，返回新草图（两个输入均不修改）
+
+        Args:
+            other: 另一个草图
+
+        Returns:
+            KLLSketch: 合并后的草图
+        """
+        merged = KLLSketch(max(self.k, other.k))
+        levels = max(len(self.compactors), len(other.compactors))
+        merged.compactors = [
+            np.concatenate([sketch.compactors[level] for sketch in (self, other)
+                            if level < len(sketch.compactors)])
+            for level in range(levels)
+        ]
+        merged.count = self.count + other.count
+        merged.total = self.total + other.total
+        merged.min = min(self.min, other.min)
+        merged.max = max(self.max, other.max)
+        merged._compress()
+        return merged
+
+    def _compress(self) -> None:
+        """逐层压缩：超出容量的层排序后隔一取一，权重翻倍进入上一层"""
+        level = 0
+        while level < len(self.compactors):
+            items = self.compactors[level]
+            if len(items) <= self._capacity(level):
+                level += 1
+                continue
+
+            if level + 1 == len(self.compactors):
+                self.compactors.append(np.empty(0))
+            items = np.sort(items)
+            # 奇数个时保留一个留在本层
+            kept = items[-1:] if len(items) % 2 else items[:0]
+            items = items[:len(items) - len(kept)]
+            promoted = items[self._rng.integers(2)::2]
+
+            self.compactors[level] = kept
+            self.compactors[level + 1] = np.concatenate([self.compactors[level + 1], promoted])
+            # 新增层后下层容量变化，从底层重新检查
+            level = 0
+
+    def quantile(self, q):
+        """
+        近似分位数
+
+        Args:
+            q: 分位点（0~1），可以是数组
+
+        Returns:
+            分位数（与q形状一致）
+        """
+        q = np.asarray(q, dtype=float)
+        if self.count == 0:
+            return np.full(q.shape, np.nan)
+
+        items = np.concatenate(self.compactors)
+        weights = np.concatenate([np.full(len(c), 2.0 ** level) for level, c in enumerate(self.compactors)])
+        order = np.argsort(items, kind='stable')
+        items, cumulative = items[order], np.cumsum(weights[order])
+
+        positions = np.searchsorted(cumulative, q * cumulative[-1], side='left')
+        result = items[np.minimum(positions, len(items) - 1)]
+        result = np.where(q <= 0, self.min, np.where(q >= 1, self.max, result))
+        return result
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        序列化为DataFrame（用于写入旁路缓存）
+
+        前6行（层级为-1）依次为 最小值、最大值、合计、个数、精度参数、层数，其后为各层样本。
+
+        Returns:
+            pd.DataFrame: 列为 值、层级
+        """
+        stats = [self.min, self.max, self.total, self.count, self.k, len(self.compactors)]
+        levels = [np.full(len(items), level) for level, items in enumerate(self.compactors)]
+        return pd.DataFrame({
+            '值': np.concatenate([np.asarray(stats, dtype=float)] + list(self.compactors)),
+            '层级': np.concatenate([np.full(len(stats), -1)] + levels).astype(np.int64),
+        })
+
+    @classmethod
+    def from_frame(cls, frame: pd.DataFrame) -> 'KLLSketch':
+        """
+        由 to_frame 的结果还原草图
+
+        Args:
+            frame: 序列化后的草图
+
+        Returns:
+            KLLSketch: 草图
+        """
+        values = frame['值'].to_numpy(dtype=float)
+        levels = frame['层级'].to_numpy()
+        min_val, max_val, total, count, k, depth = values[:6]
+
+        sketch = cls(int(k))
+        sketch.min, sketch.max, sketch.total, sketch.count = min_val, max_val, total, int(count)
+        sketch.compactors = [values[6:][levels[6:] == level] for level in range(int(depth))]
+        return sketch
+
+    @property
+    def mean(self) -> float:
+        """精确均值"""
+        return self.total / self.count if self.count else np.nan
+
+
+def jenks_breaks(values, bands: int) -> List[float]:
+    """
+    自然断点（Fisher-Jenks）：使各区间内的方差之和最小
+
+    Args:
+        values: 代表值（会先排序）
+        bands: 区间个数
+
+    Returns:
+        List[float]: 切分点（每个区间的起始值，不含第一个区间）
+    """
+    values = np.sort(np.asarray(values, dtype=float))
+    n = len(values)
+    if n <= bands:
+        return [float(v) for v in np.unique(values)[1:]]
+
+    s1 = np.concatenate([[0.0], np.cumsum(values)])
+    s2 = np.concatenate([[0.0], np.cumsum(values ** 2)])
+
+    def class_cost(starts: np.ndarray, end: int) -> np.ndarray:
+        """values[start:end] 的离差平方和"""
+        size = end - starts
+        total = s1[end] - s1[starts]
+        return s2[end] - s2[starts] - total * total / size
+
+    # cost[b, j]: 前j个值分为b+1个区间的最小代价；start[b, j]: 最后一个区间的起点
+    cost = np.full((bands, n + 1), np.inf)
+    start = np.zeros((bands, n + 1), dtype=int)
+    ends = np.arange(1, n + 1)
+    cost[0, 1:] = class_cost(np.zeros(n, dtype=int), ends)
+    for b in range(1, bands):
+        for j in range(b + 1, n + 1):
+            starts = np.arange(b, j)
+            candidates = cost[b - 1, starts] + class_cost(starts, j)
+            best = int(np.argmin(candidates))
+            cost[b, j] = candidates[best]
+            start[b, j] = starts[best]
+
+    breaks = []
+    end = n
+    for b in range(bands - 1, 0, -1):
+        end = start[b, end]
+        breaks.append(float(values[end]))
+    return sorted(set(breaks))
+
+
+def suggest_cutpoints(quantile: Callable, min_val: float, max_val: float,
+                      bands: int, method: str) -> Optional[List[float]]:
+    """
+    生成切分点建议
+
+    Args:
+        quantile: 分位数函数（接受0~1的数组）
+        min_val: 最小值
+        max_val: 最大值
+        bands: 区间个数
+        method: 'q'（等频）、'log'（对数等比）或 'jenks'（自然断点）
+
+    Returns:
+        Optional[List[float]]: 保留两位小数、去重后的切分点，无法生成时返回None
+    """
+    if bands < 2 or not np.isfinite(min_val) or not np.isfinite(max_val) or min_val >= max_val:
+        return None
+
+    if method == 'q':
+        points = quantile(np.arange(1, bands) / bands)
+    elif method == 'log':
+        # 对数等比切分只适用于正数部分
+        low = min_val
+        if low <= 0:
+            grid = quantile(np.linspace(0, 1, JENKS_SAMPLE_SIZE))
+            positive = grid[grid > 0]
+            if len(positive) == 0:
+                return None
+            low = positive[0]
+        if low >= max_val:
+            return None
+        points = np.geomspace(low, max_val, bands + 1)[1:-1]
+    elif method == 'jenks':
+        sample = quantile((np.arange(JENKS_SAMPLE_SIZE) + 0.5) / JENKS_SAMPLE_SIZE)
+        points = jenks_breaks(sample, bands)
+    else:
+        raise ValueError(f"未知的切分点建议方法: {method}")
+
+    points = np.unique(np.round(np.asarray(points, dtype=float), 2))
+    points = points[(points > min_val) & (points <= max_val)]
+    return [float(point) for point in points] or None
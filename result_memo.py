@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+汇总结果记忆模块
+功能：在一次分析会话中缓存分组汇总、区间汇总等中间结果，
+分析人员在不同视图之间来回切换时直接复用，不再重复计算。
+
+缓存键由 数据指纹 + 查询参数 组成；内存中的DataFrame按对象身份分配指纹，
+对象被回收时撤销其指纹并丢弃该指纹下的结果；对象被就地修改时需调用 invalidate_frame 更换指纹。
+超出内存预算时按最近最少使用（LRU）淘汰。
+"""
+
+import itertools
+import os
+import weakref
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Tuple
+
+import pandas as pd
+
+
+# 默认内存预算：256MB
+DEFAULT_MEMO_BYTES = 256 * 1024 ** 2
+
+
+class ResultMemo:
+    """会话级LRU结果缓存"""
+
+    def __init__(self, max_bytes: int = DEFAULT_MEMO_BYTES):
+        """
+        Args:
+            max_bytes: 缓存结果的内存预算（字节），为0时不缓存
+        """
+        self.max_bytes = max_bytes
+        self.entries: 'OrderedDict[Hashable, Tuple[pd.DataFrame, int]]' = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # 数据指纹登记：{id(DataFrame): (弱引用, 指纹)}
+        self._frame_tokens: Dict[int, Tuple[weakref.ref, str]] = {}
+        self._token_counter = itertools.count(1)
+
+    def frame_fingerprint(self, df: pd.DataFrame) -> str:
+        """
+        内存中DataFrame的指纹：同一对象始终返回同一指纹，新对象分配新指纹
+
+        Args:
+            df: 数据
+
+        Returns:
+            str: 指纹
+        """
+        registered = self._frame_tokens.get(id(df))
+        if registered is not None and registered[0]() is df:
+            return registered[1]
+
+        token = f"内存:{next(self._token_counter)}"
+        frame_id = id(df)
+        reference = weakref.ref(df, lambda ref: self._release_token(frame_id, ref, token))
+        self._frame_tokens[frame_id] = (reference, token)
+        return token
+
+    def _release_token(self, frame_id: int, reference: weakref.ref, token: str) -> None:
+        """DataFrame被回收时撤销其指纹，并丢弃该指纹下的结果（它们不会再被命中）"""
+        registered = self._frame_tokens.get(frame_id)
+        if registered is not None and registered[0] is reference:
+            del self._frame_tokens[frame_id]
+        self._drop_token_entries(token)
+
+    def _drop_token_entries(self, token: str) -> None:
+        """丢弃缓存键中包含该指纹的全部结果"""
+        # 先复制键列表：回收回调可能在遍历期间触发
+        for key in [key for key in list(self.entries) if isinstance(key, tuple) and token in key]:
+            entry = self.entries.pop(key, None)
+            if entry is not None:
+                self.total_bytes -= entry[1]
+
+    def invalidate_frame(self, df: pd.DataFrame) -> None:
+        """
+        DataFrame被就地修改后撤销其指纹并丢弃该指纹下的结果，之后重新分配新指纹
+
+        Args:
+            df: 被修改的数据
+        """
+        registered = self._frame_tokens.get(id(df))
+        if registered is None or registered[0]() is not df:
+            return
+        del self._frame_tokens[id(df)]
+        self._drop_token_entries(registered[1])
+
+    @staticmethod
+    def file_fingerprint(filename: str) -> str:
+        """
+        工作簿文件的指纹（路径 + 大小 + 修改时间），用于流式模式
+
+        Args:
+            filename: 文件路径
+
+        Returns:
+            str: 指纹
+        """
+        stat = os.stat(filename)
+        return f"文件:{os.path.abspath(filename)}:{stat.st_size}:{stat.st_mtime_ns}"
+
+    def get(self, key: Hashable) -> Optional[pd.DataFrame]:
+        """
+        查询缓存结果
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            Optional[pd.DataFrame]: 命中时返回结果副本，否则返回None
+        """
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[0].copy()
+
+    def put(self, key: Hashable, df: pd.DataFrame) -> None:
+        """
+        写入结果（超出预算时按LRU淘汰；单个结果超出预算时不缓存）
+
+        Args:
+            key: 缓存键
+            df: 结果数据
+        """
+        size = int(df.memory_usage(deep=True).sum())
+        if size > self.max_bytes:
+            return
+
+        if key in self.entries:
+            self.total_bytes -= self.entries.pop(key)[1]
+        self.entries[key] = (df.copy(), size)
+        self.total_bytes += size
+
+        while self.total_bytes > self.max_bytes:
+            _, (_, evicted_size) = self.entries.popitem(last=False)
+            self.total_bytes -= evicted_size
+            self.evictions += 1
+
+    def clear(self) -> None:
+        """清空缓存结果（命中统计保留）"""
+        self.entries.clear()
+        self.total_bytes = 0
+
+    def stats(self) -> Dict:
+        """
+        命中统计，用于调整内存预算
+
+        Returns:
+            Dict: 命中次数、未命中次数、命中率、淘汰次数、条目数、占用字节数、预算字节数
+        """
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'entries': len(self.entries),
+            'bytes': self.total_bytes,
+            'max_bytes': self.max_bytes,
+        }
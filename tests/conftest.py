@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+"""测试配置：模块位于仓库根目录，加入导入路径；提供仓库自带的两个月份样例数据"""
+
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+CURRENT_FILE = os.path.join(ROOT, '数据_2023-10-31.xlsx')
+PREVIOUS_FILE = os.path.join(ROOT, '数据_2023-09-30.xlsx')
+
+
+@pytest.fixture(scope='session')
+def month_frames():
+    """样例数据 (本月, 上月)，按原始类型读取"""
+    return pd.read_excel(CURRENT_FILE), pd.read_excel(PREVIOUS_FILE)
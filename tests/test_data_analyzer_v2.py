@@ -0,0 +1,481 @@
+# -*- coding: utf-8 -*-
+"""
+分析器端到端测试：各计算路径的结果与原版做法（整表加载、普通分组求和、外连接对比）逐项比较
+
+工作簿复制到临时目录，旁路缓存写在临时目录下。
+"""
+
+import contextlib
+import io
+import json
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmark_comparison import create_grouped_data, legacy_calculate_comparison
+from conftest import CURRENT_FILE, PREVIOUS_FILE
+from data_analyzer_v2 import DEFAULT_SCHEME_NAME, ExcelDataAnalyzer, _ThreadOutput
+
+
+DIMS = ['产品线', '所属区域']
+# 100000~100001 之间没有数据，是一个空区间
+CUTPOINTS = [100000.0, 100001.0, 1500000.0]
+LABELS = ['<=100000.0', '100000.0-100001.0', '100001.0-1500000.0', '>1500000.0']
+
+
+@pytest.fixture
+def workbooks(tmp_path):
+    """复制到临时目录的 (本月, 上月) 工作簿"""
+    current = shutil.copy(CURRENT_FILE, tmp_path)
+    previous = shutil.copy(PREVIOUS_FILE, tmp_path)
+    return str(current), str(previous)
+
+
+def make_analyzer(workbooks, **options) -> ExcelDataAnalyzer:
+    """切换到两个月份并识别列结构（不输出过程信息）"""
+    options.setdefault('prefetch', False)
+    analyzer = ExcelDataAnalyzer(**options)
+    with contextlib.redirect_stdout(io.StringIO()):
+        analyzer.switch_months(*workbooks)
+        assert analyzer.inspect_columns()
+    return analyzer
+
+
+def quietly(func, *args, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return func(*args, **kwargs)
+
+
+def reference_comparison(current: pd.DataFrame, previous: pd.DataFrame, keys, metrics) -> pd.DataFrame:
+    """原版做法：两期分别分组求和后外连接，缺失按0处理"""
+    merged = pd.merge(current.groupby(keys, observed=False)[metrics].sum().reset_index(),
+                      previous.groupby(keys, observed=False)[metrics].sum().reset_index(),
+                      on=keys, how='outer', suffixes=('_本月', '_上月'))
+    for col in metrics:
+        merged[f'{col}_本月'] = merged[f'{col}_本月'].fillna(0)
+        merged[f'{col}_上月'] = merged[f'{col}_上月'].fillna(0)
+    return merged
+
+
+def assert_comparison_matches(result: pd.DataFrame, expected: pd.DataFrame, keys, metrics) -> None:
+    """按分组键对齐后比较两期合计"""
+    columns = [f'{col}_{period}' for col in metrics for period in ('上月', '本月')]
+    actual = result[keys + columns].astype({key: str for key in keys}).sort_values(keys, ignore_index=True)
+    expected = expected[keys + columns].astype({key: str for key in keys}).sort_values(keys, ignore_index=True)
+    pd.testing.assert_frame_equal(actual, expected, check_dtype=False)
+
+
+def binned(df: pd.DataFrame) -> pd.DataFrame:
+    bins = [-np.inf] + CUTPOINTS + [np.inf]
+    return df.assign(区间=pd.cut(df['风险金额'], bins=bins, labels=LABELS, include_lowest=True, right=False))
+
+
+@pytest.mark.parametrize('options', [
+    {},
+    {'streaming': True},
+    {'use_cache': False},
+], ids=['常规', '流式', '无缓存'])
+def test_interval_comparison_keeps_empty_bins(workbooks, month_frames, monkeypatch, options):
+    analyzer = make_analyzer(workbooks, **options)
+    monkeypatch.setattr(analyzer, 'get_user_metric_selection', lambda metrics: '风险金额')
+    monkeypatch.setattr(analyzer, 'get_interval_cutpoints',
+                        lambda metric, min_val, max_val: {DEFAULT_SCHEME_NAME: CUTPOINTS})
+
+    result = quietly(analyzer.run_metric_interval_summary)
+
+    assert list(result['区间'].astype(str)) == LABELS
+    metrics = [col for col in analyzer.metric_columns if col != '风险金额']
+    expected = reference_comparison(binned(month_frames[0]), binned(month_frames[1]), ['区间'], metrics)
+    assert_comparison_matches(result, expected, ['区间'], metrics)
+
+
+def test_current_month_prefetch_starts_before_previous_prompt(workbooks, monkeypatch):
+    current, previous = workbooks
+    analyzer = ExcelDataAnalyzer(use_result_cache=False)
+    monkeypatch.setattr(analyzer, 'generate_filename',
+                        lambda date: current if date == '2023-10-31' else previous)
+    started_at_prompt = []
+
+    def answer(prompt):
+        started_at_prompt.append(sorted(analyzer.prefetched_months))
+        return '2023-10-31' if len(started_at_prompt) == 1 else '2023-09-30'
+
+    monkeypatch.setattr('builtins.input', answer)
+    try:
+        assert quietly(analyzer.prompt_month_files) == ('2023-10-31', '2023-09-30')
+        # 询问上月日期时本月已在后台加载，上月日期通过校验后上月也开始加载
+        assert started_at_prompt == [[], [current]]
+        assert sorted(analyzer.prefetched_months) == sorted([current, previous])
+
+        assert quietly(analyzer.inspect_columns)
+        assert quietly(analyzer.ensure_month_data, analyzer.dimension_columns + analyzer.metric_columns)
+        assert analyzer.current_month_data.shape == (220, 8)
+        assert not analyzer.prefetched_months
+    finally:
+        analyzer.shutdown_background()
+
+
+@pytest.mark.parametrize('options', [
+    {},
+    {'use_cube': False},
+    {'streaming': True, 'batch_size': 50},
+    {'use_cube': False, 'backend': 'polars'},
+    {'use_cube': False, 'backend': 'duckdb'},
+    {'use_cube': False, 'backend': 'parallel', 'workers': 2},
+], ids=['立方体', '原始行', '流式', 'polars', 'duckdb', 'parallel'])
+def test_dimension_comparison_matches_groupby(workbooks, month_frames, monkeypatch, options):
+    analyzer = make_analyzer(workbooks, **options)
+    if options.get('backend', 'pandas') != analyzer.backend.name:
+        pytest.skip(f"{options['backend']} 未安装")
+    if options.get('backend') == 'parallel':
+        # 样例数据较小，强制走多进程路径
+        analyzer.backend.min_rows = 0
+    monkeypatch.setattr(analyzer, 'get_user_dimension_selection', lambda dimensions: DIMS)
+
+    try:
+        result = quietly(analyzer.run_dimension_summary)
+    finally:
+        analyzer.backend.close()
+
+    if not options:
+        assert analyzer.month_cubes
+    metrics = analyzer.metric_columns
+    assert_comparison_matches(result, reference_comparison(*month_frames, DIMS, metrics), DIMS, metrics)
+
+
+def test_dimension_comparison_loads_only_projected_columns(workbooks, monkeypatch):
+    analyzer = make_analyzer(workbooks, use_cube=False)
+    monkeypatch.setattr(analyzer, 'get_user_dimension_selection', lambda dimensions: ['产品线'])
+
+    assert not quietly(analyzer.run_dimension_summary).empty
+
+    expected = ['产品线'] + analyzer.metric_columns
+    assert list(analyzer.current_month_data.columns) == expected
+    assert list(analyzer.previous_month_data.columns) == expected
+
+
+def test_time_series_matches_groupby(workbooks, month_frames):
+    analyzer = ExcelDataAnalyzer(use_cache=False)
+    snapshots = analyzer.discover_snapshots(os.path.dirname(workbooks[0]))
+    assert [date_str for date_str, _ in snapshots] == ['2023-09-30', '2023-10-31']
+
+    monthly = {'2023-09-30': month_frames[1], '2023-10-31': month_frames[0]}
+    tables = analyzer.build_time_series(monthly, ['产品线'], ['风险笔数', '贷款金额'])
+
+    for col in ('风险笔数', '贷款金额'):
+        expected = pd.DataFrame({
+            '2023-09': month_frames[1].groupby('产品线')[col].sum(),
+            '2023-10': month_frames[0].groupby('产品线')[col].sum(),
+        })
+        actual = tables[col].assign(产品线=lambda df: df['产品线'].astype(str)).set_index('产品线')
+        pd.testing.assert_frame_equal(actual, expected, check_names=False, check_dtype=False)
+        growth = tables[f'{col}_环比(%)'].set_index(tables[col]['产品线'].astype(str))['2023-10']
+        expected_growth = ((expected['2023-10'] - expected['2023-09']) / expected['2023-09'] * 100).round(2)
+        pd.testing.assert_series_equal(growth, expected_growth, check_names=False)
+
+
+def test_concurrent_loads_are_cached_by_parent(workbooks, month_frames):
+    columns = ['产品线', '贷款金额']
+    frames = quietly(ExcelDataAnalyzer().load_files_concurrently, list(workbooks), columns=columns)
+
+    reader = ExcelDataAnalyzer()
+    for filename, loaded, expected in zip(workbooks, frames, month_frames):
+        pd.testing.assert_frame_equal(loaded, expected[columns])
+        cached = quietly(reader.read_cached_frame, filename, columns=columns)
+        pd.testing.assert_frame_equal(cached, expected[columns])
+
+
+def test_normalized_frames_are_grouped_without_copies(month_frames):
+    analyzer = ExcelDataAnalyzer(use_cache=False)
+    analyzer.dimension_columns, analyzer.metric_columns = ['产品线'], ['风险笔数', '贷款金额']
+    frame = month_frames[0][['产品线', '风险笔数', '贷款金额']].astype({'风险笔数': str})
+
+    quietly(analyzer.normalize_frames, [frame])
+    assert all(pd.api.types.is_numeric_dtype(frame[col]) for col in analyzer.metric_columns)
+
+    binned_frame = analyzer.apply_interval_binning(frame, '贷款金额', [100000.0], ['<=100000.0', '>100000.0'])
+    assert '区间' in binned_frame.columns and '区间' not in frame.columns
+
+    result = quietly(analyzer.group_and_summarize, frame, ['产品线'], analyzer.metric_columns)
+    expected = month_frames[0].groupby('产品线')[analyzer.metric_columns].sum().reset_index()
+    pd.testing.assert_frame_equal(result.astype({'产品线': str}), expected, check_dtype=False)
+
+
+def test_vectorized_comparison_matches_row_wise_apply():
+    metrics = ['风险金额', '贷款金额', '风险笔数']
+    current, previous = create_grouped_data(2000, seed=1), create_grouped_data(2000, seed=2)
+    # 上月为0时本月为负、为0、为正三种情况
+    previous.loc[:2, metrics] = 0
+    current.loc[:2, '风险金额'] = [-5.0, 0.0, 5.0]
+    current['客户编号'] = current['客户编号'].where(current.index > 2, previous['客户编号'])
+
+    result = ExcelDataAnalyzer(use_cache=False).calculate_comparison(current, previous, ['客户编号'], metrics)
+
+    expected = legacy_calculate_comparison(current, previous, ['客户编号'], metrics)
+    pd.testing.assert_frame_equal(result, expected.reset_index(drop=True))
+
+
+def blank_first_count(frames):
+    """本月第一行的笔数为空单元格（该列读入为浮点）"""
+    current, previous = frames
+    return current.assign(风险笔数=current['风险笔数'].where(current.index > 0)), previous
+
+
+def drop_first_product(frames):
+    """上月缺少一个产品线"""
+    current, previous = frames
+    return current, previous[previous['产品线'] != current['产品线'].iloc[0]]
+
+
+@pytest.mark.parametrize('edit', [
+    lambda frames: frames,
+    blank_first_count,
+    drop_first_product,
+], ids=['原样', '本月有空单元格', '上月缺少分组'])
+def test_two_period_groupby_matches_separate_summaries(month_frames, edit):
+    analyzer = ExcelDataAnalyzer(use_cache=False)
+    current, previous = edit(month_frames)
+    metrics = ['风险笔数', '贷款金额']
+
+    result = quietly(analyzer.summarize_two_periods, current, previous, ['产品线'], metrics)
+
+    expected = quietly(analyzer.calculate_comparison,
+                       quietly(analyzer.group_and_summarize, current, ['产品线'], metrics),
+                       quietly(analyzer.group_and_summarize, previous, ['产品线'], metrics),
+                       ['产品线'], metrics)
+    pd.testing.assert_frame_equal(result.sort_values('产品线', ignore_index=True),
+                                  expected.sort_values('产品线', ignore_index=True))
+
+
+@pytest.mark.parametrize('mode', ['rollup', 'cube'])
+def test_grouping_sets_cover_null_keys(month_frames, mode):
+    dims, metrics = ['产品线', '所属区域'], ['风险笔数', '贷款金额']
+    frames = []
+    for df in month_frames:
+        df = df.copy()
+        df.loc[df.index % 7 == 0, '所属区域'] = None
+        df.loc[df.index % 11 == 0, '产品线'] = None
+        frames.append(df.groupby(dims, dropna=False)[metrics].sum().reset_index())
+
+    result = quietly(ExcelDataAnalyzer(use_cache=False).compute_grouping_sets,
+                     frames[0], frames[1], dims, metrics, mode)
+
+    detail = result[result['汇总层级'] == '明细']
+    total = result[result['汇总层级'] == '合计'].iloc[0]
+    assert (detail[dims] == '空值').any().all()
+    for col in ('风险笔数_本月', '风险笔数_上月'):
+        assert detail[col].sum() == total[col] == month_frames[0 if col.endswith('本月') else 1]['风险笔数'].sum()
+    # 每个产品线（含空值）的小计等于其明细之和
+    subtotals = result[(result['汇总层级'] == '小计') & (result['所属区域'] == '小计')]
+    expected = detail.groupby('产品线')['风险笔数_本月'].sum()
+    assert subtotals.set_index('产品线')['风险笔数_本月'].sort_index().equals(expected.sort_index())
+    # 空值分组排在同层级其他取值之后、小计之前
+    products = [value for value in result['产品线'] if value not in ('小计', '合计')]
+    assert products[-1] == '空值' and products.index('空值') > products.index('产品线C')
+
+
+@pytest.mark.parametrize('options', [{}, {'streaming': True}], ids=['常规', '流式'])
+def test_interval_schemes_match_pd_cut(workbooks, month_frames, options):
+    analyzer = make_analyzer(workbooks, **options)
+    if not analyzer.streaming:
+        assert quietly(analyzer.ensure_month_data, analyzer.metric_columns)
+    schemes = {
+        '甲': [100000.0, 1500000.0],
+        '乙': [800000.0],
+        '四分位': quietly(analyzer.suggested_cutpoints, '风险金额', 4, 'q'),
+    }
+    assert len(schemes['四分位']) == 3
+
+    low, high = quietly(analyzer.analyze_metric_range, '风险金额')
+    result = quietly(analyzer.compute_interval_comparison, '风险金额', schemes, low, high)
+
+    assert list(result['方案'].unique()) == list(schemes)
+    metrics = [col for col in analyzer.metric_columns if col != '风险金额']
+    for name, cutpoints in schemes.items():
+        bins = [-np.inf] + cutpoints + [np.inf]
+        frames = [df.assign(区间=pd.cut(df['风险金额'], bins=bins, right=False).cat.codes) for df in month_frames]
+        expected = reference_comparison(*frames, ['区间'], metrics)
+        # 各方案的区间按升序排列，依次对应 pd.cut 的区间编号
+        scheme = result[result['方案'] == name].assign(区间=range(len(cutpoints) + 1))
+        assert_comparison_matches(scheme, expected, ['区间'], metrics)
+
+
+def test_result_cache_hit_and_invalidation(workbooks, month_frames, monkeypatch):
+    def dimension_summary(analyzer):
+        monkeypatch.setattr(analyzer, 'get_user_dimension_selection', lambda dimensions: DIMS)
+        return quietly(analyzer.run_dimension_summary)
+
+    expected = dimension_summary(make_analyzer(workbooks))
+
+    # 工作簿未变化：直接命中结果缓存，不加载月份数据
+    second = make_analyzer(workbooks)
+    pd.testing.assert_frame_equal(dimension_summary(second), expected)
+    assert second.current_month_data is None and not second.month_cubes
+
+    # 本月工作簿内容变化后结果重新计算
+    changed = month_frames[0].copy()
+    changed['风险笔数'] += 1
+    changed.to_excel(workbooks[0], index=False)
+    result = dimension_summary(make_analyzer(workbooks))
+    assert_comparison_matches(result, reference_comparison(changed, month_frames[1], DIMS, ['风险笔数']),
+                              DIMS, ['风险笔数'])
+
+
+def test_previous_aggregate_persisted_across_runs(workbooks, month_frames, monkeypatch):
+    def dimension_summary(analyzer):
+        monkeypatch.setattr(analyzer, 'get_user_dimension_selection', lambda dimensions: DIMS)
+        return quietly(analyzer.run_dimension_summary)
+
+    options = {'use_cube': False, 'use_result_cache': False}
+    expected = dimension_summary(make_analyzer(workbooks, **options))
+
+    # 第二次运行复用已保存的上月汇总，不再读取上月数据
+    analyzer = make_analyzer(workbooks, **options)
+    pd.testing.assert_frame_equal(dimension_summary(analyzer), expected)
+    assert analyzer.previous_month_data is None
+    assert analyzer.current_month_data is not None
+
+
+def test_extended_aggregates_keep_empty_bins(month_frames):
+    """补齐的空区间：合计、计数为0，均值、最小值、最大值为空"""
+    analyzer = ExcelDataAnalyzer(use_cache=False, aggregates=['sum', 'count', 'mean', 'min', 'max'])
+    df = binned(month_frames[0])
+
+    result = quietly(analyzer.group_and_summarize, df, ['区间'], ['贷款金额', '风险笔数'])
+
+    expected = df.groupby('区间', observed=False)[['贷款金额', '风险笔数']].agg(
+        ['sum', 'count', 'mean', 'min', 'max'])
+    assert list(result['区间'].astype(str)) == LABELS
+    for col in ('贷款金额', '风险笔数'):
+        np.testing.assert_array_equal(result[col], expected[(col, 'sum')])
+        np.testing.assert_array_equal(result[f'{col}_计数'], expected[(col, 'count')])
+        np.testing.assert_allclose(result[f'{col}_均值'], expected[(col, 'mean')], rtol=1e-12)
+        np.testing.assert_array_equal(result[f'{col}_最小值'], expected[(col, 'min')])
+        np.testing.assert_array_equal(result[f'{col}_最大值'], expected[(col, 'max')])
+
+
+def test_session_keeps_months_loaded_across_switches(workbooks, month_frames, monkeypatch):
+    analyzer = make_analyzer(workbooks, use_cube=False, use_result_cache=False)
+    monkeypatch.setattr(analyzer, 'get_user_dimension_selection', lambda dimensions: DIMS)
+    quietly(analyzer.preload_session_data)
+    current, previous = analyzer.current_month_data, analyzer.previous_month_data
+
+    # 交换两个月份再切换回来，已加载的数据直接复用，不再解析工作簿
+    quietly(analyzer.switch_months, workbooks[1], workbooks[0])
+    assert analyzer.current_month_data is previous and analyzer.previous_month_data is current
+    quietly(analyzer.switch_months, *workbooks)
+    assert analyzer.current_month_data is current and analyzer.previous_month_data is previous
+
+    monkeypatch.setattr(analyzer, 'load_months_concurrently', None)
+    result = quietly(analyzer.run_dimension_summary)
+    metrics = analyzer.metric_columns
+    assert_comparison_matches(result, reference_comparison(*month_frames, DIMS, metrics), DIMS, metrics)
+
+
+def test_load_batch_spec_normalizes(tmp_path):
+    spec = tmp_path / 'spec.json'
+    spec.write_text(json.dumps({
+        'months': [{'current': '2023-10-31', 'previous': '2023-09-30'}],
+        'analyses': [
+            {'type': 'dimension', 'dimensions': ['产品线']},
+            {'type': 'dimension', 'dimensions': ['产品线'], 'subtotal': 'rollup'},
+            {'type': 'interval', 'metric': '风险金额', 'cutpoints': [500, 100, 500]},
+            {'type': 'interval', 'name': '多方案', 'metric': '风险金额', 'schemes': {'甲': [1], '乙': 'Q4'}},
+        ],
+    }, ensure_ascii=False), encoding='utf-8')
+
+    config = ExcelDataAnalyzer(use_cache=False, use_result_cache=False).load_batch_spec(str(spec))
+
+    assert config['output_dir'] == '.'
+    assert config['months'] == [('2023-10-31', '2023-09-30')]
+    assert [analysis['name'] for analysis in config['analyses']] == ['维度_产品线', '维度_产品线_2', '区间_风险金额', '多方案']
+    assert config['analyses'][1]['subtotal'] == 'rollup'
+    assert config['analyses'][2]['schemes'] == {DEFAULT_SCHEME_NAME: [100.0, 500.0]}
+    assert config['analyses'][3]['schemes'] == {'甲': [1.0], '乙': 'q4'}
+
+
+@pytest.mark.parametrize('raw', [
+    [],
+    {'analyses': [{'type': 'dimension', 'dimensions': ['产品线']}]},
+    {'months': [{'current': '2023-13-31', 'previous': '2023-09-30'}],
+     'analyses': [{'type': 'dimension', 'dimensions': ['产品线']}]},
+    {'months': [{'current': '2023-10-31', 'previous': '2023-09-30'}], 'analyses': []},
+    {'months': [{'current': '2023-10-31', 'previous': '2023-09-30'}],
+     'analyses': [{'type': 'dimension', 'dimensions': ['产品线'], 'subtotal': 'grouping'}]},
+    {'months': [{'current': '2023-10-31', 'previous': '2023-09-30'}],
+     'analyses': [{'type': 'interval', 'metric': '风险金额', 'cutpoints': [1], 'schemes': {'甲': [1]}}]},
+    {'months': [{'current': '2023-10-31', 'previous': '2023-09-30'}],
+     'analyses': [{'type': 'interval', 'metric': '风险金额', 'schemes': {'甲': 'q1'}}]},
+], ids=['非对象', '无月份', '日期错误', '无分析', '小计模式错误', '切分点重复配置', '区间个数不足'])
+def test_load_batch_spec_rejects_invalid(tmp_path, raw):
+    spec = tmp_path / 'spec.json'
+    spec.write_text(json.dumps(raw, ensure_ascii=False), encoding='utf-8')
+    with pytest.raises(ValueError):
+        ExcelDataAnalyzer(use_cache=False, use_result_cache=False).load_batch_spec(str(spec))
+
+
+def test_batch_runs_independent_analyses_as_separate_groups(workbooks, tmp_path, monkeypatch):
+    spec = tmp_path / 'spec.json'
+    spec.write_text(json.dumps({
+        'output_dir': str(tmp_path / '结果'),
+        'months': [{'current': '2023-10-31', 'previous': '2023-09-30'}],
+        'analyses': [
+            {'type': 'dimension', 'dimensions': ['产品线']},
+            {'type': 'interval', 'metric': '风险金额', 'cutpoints': CUTPOINTS},
+            {'type': 'interval', 'metric': '贷款金额', 'cutpoints': [1000000.0]},
+            {'type': 'dimension', 'dimensions': DIMS},
+        ],
+    }, ensure_ascii=False), encoding='utf-8')
+    analyzer = ExcelDataAnalyzer(use_result_cache=False, prefetch=False)
+    monkeypatch.setattr(analyzer, 'generate_filename',
+                        lambda date: workbooks[0] if date == '2023-10-31' else workbooks[1])
+    # 单核环境下同样使用多个线程
+    monkeypatch.setattr(os, 'cpu_count', lambda: 4)
+    groups, saved = [], {}
+    run_group = ExcelDataAnalyzer.run_batch_analyses
+    monkeypatch.setattr(ExcelDataAnalyzer, 'run_batch_analyses',
+                        lambda self, analyses: groups.append([a['name'] for a in analyses]) or run_group(self, analyses))
+    monkeypatch.setattr(analyzer, 'write_batch_workbook',
+                        lambda filename, analyses, results: saved.update(results) or True)
+
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        assert analyzer.run_batch(str(spec))
+
+    # 维度汇总共用立方体为一组，区间汇总按指标各为一组
+    assert sorted(groups) == [['区间_贷款金额'], ['区间_风险金额'], ['维度_产品线', '维度_产品线+所属区域']]
+    # 每组的进度信息整段输出，同组的分析标题相邻
+    headers = [line.split('] ')[1] for line in output.getvalue().splitlines() if line.startswith('⚙️ [')]
+    assert abs(headers.index('维度_产品线') - headers.index('维度_产品线+所属区域')) == 1
+
+    expected = make_analyzer(workbooks, use_result_cache=False)
+    assert quietly(expected.ensure_month_data, expected.dimension_columns + expected.metric_columns)
+    pd.testing.assert_frame_equal(saved['维度_产品线+所属区域'], quietly(expected.dimension_comparison, DIMS))
+    pd.testing.assert_frame_equal(saved['区间_风险金额'], quietly(
+        expected.compute_interval_comparison, '风险金额', {DEFAULT_SCHEME_NAME: CUTPOINTS}))
+
+
+def test_thread_output_collects_each_thread_separately():
+    stream = io.StringIO()
+    output = _ThreadOutput(stream)
+    both_running = threading.Barrier(2)
+
+    def job(tag):
+        for i in range(50):
+            print(f"{tag}{i}", file=output)
+            if i == 0:
+                both_running.wait()
+        return tag
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        futures = [executor.submit(output.collect, job, tag) for tag in 'AB']
+    for future, tag in zip(futures, 'AB'):
+        assert future.result() == (''.join(f"{tag}{i}\n" for i in range(50)), tag)
+
+    print('主线程', file=output)
+    assert stream.getvalue() == '主线程\n'
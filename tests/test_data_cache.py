@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""旁路缓存与对比结果缓存测试：命中、失效、淘汰、多进程与多线程写入"""
+
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import CURRENT_FILE, PREVIOUS_FILE
+from data_cache import ResultCache, SidecarCache
+
+
+@pytest.fixture
+def workbooks(tmp_path):
+    return str(shutil.copy(CURRENT_FILE, tmp_path)), str(shutil.copy(PREVIOUS_FILE, tmp_path))
+
+
+def test_cache_hit_does_not_rewrite_index_but_counts_for_eviction(workbooks, tmp_path):
+    cache_dir = tmp_path / '缓存'
+    frame = pd.DataFrame({'值': np.arange(50000, dtype=np.int64)})
+    cache = SidecarCache(cache_dir=str(cache_dir))
+    for variant in ('甲', '乙'):
+        cache.save_frame(workbooks[0], frame, variant=variant)
+    index_before = (cache_dir / 'index.json').read_bytes()
+    time.sleep(0.05)
+
+    # 读取较早写入的条目：不改写索引，但它成为最近访问的条目
+    assert cache.load_frame(workbooks[0], variant='甲').equals(frame)
+    assert (cache_dir / 'index.json').read_bytes() == index_before
+
+    # 缓存上限只够两个条目，写入第三个时淘汰最久未访问的 乙
+    cache.max_bytes = 2 * max(entry.stat().st_size for entry in cache_dir.iterdir()
+                                   if entry.suffix in ('.feather', '.pkl')) + 1
+    cache.save_frame(workbooks[0], frame, variant='丙')
+    assert cache.load_frame(workbooks[0], variant='甲') is not None
+    assert cache.load_frame(workbooks[0], variant='乙') is None
+    assert cache.load_frame(workbooks[0], variant='丙') is not None
+
+
+def test_result_hit_does_not_rewrite_index_and_evicts_separately(workbooks, tmp_path):
+    cache = SidecarCache(cache_dir=str(tmp_path / '缓存'))
+    results = ResultCache(fingerprints=cache)
+    frame = pd.DataFrame({'值': np.arange(50000, dtype=np.int64)})
+    cache.save_frame(workbooks[0], frame, variant='立方体')
+    for mode in ('甲', '乙'):
+        results.save(workbooks[0], workbooks[1], {'mode': mode}, frame)
+    result_dir = tmp_path / '缓存' / '对比结果'
+    index_before = (result_dir / 'results.json').read_bytes()
+    time.sleep(0.05)
+
+    assert results.load(workbooks[0], workbooks[1], {'mode': '甲'}).equals(frame)
+    assert (result_dir / 'results.json').read_bytes() == index_before
+
+    # 结果缓存上限只够两个条目：淘汰最久未访问的 乙，旁路缓存的条目不受影响
+    results.max_bytes = 2 * max(entry.stat().st_size for entry in result_dir.glob('*.pkl')) + 1
+    results.save(workbooks[0], workbooks[1], {'mode': '丙'}, frame)
+    assert results.load(workbooks[0], workbooks[1], {'mode': '甲'}) is not None
+    assert results.load(workbooks[0], workbooks[1], {'mode': '乙'}) is None
+    assert cache.load_frame(workbooks[0], variant='立方体').equals(frame)
+
+
+def test_entries_invalidated_when_workbook_changes(workbooks, tmp_path):
+    cache = SidecarCache(cache_dir=str(tmp_path / '缓存'))
+    frame = pd.DataFrame({'值': np.arange(10, dtype=np.int64)})
+    for filename in workbooks:
+        cache.save_frame(filename, frame, variant='立方体')
+    assert cache.load_frame(workbooks[0], variant='立方体').equals(frame)
+
+    # 本月工作簿内容变化：本月条目失效，上月条目不受影响
+    pd.read_excel(workbooks[0]).head(10).to_excel(workbooks[0], index=False)
+    assert cache.load_frame(workbooks[0], variant='立方体') is None
+    assert cache.load_frame(workbooks[1], variant='立方体').equals(frame)
+
+
+def test_result_entries_invalidated_when_either_workbook_changes(workbooks, tmp_path):
+    cache = SidecarCache(cache_dir=str(tmp_path / '缓存'))
+    results = ResultCache(fingerprints=cache)
+    frame = pd.DataFrame({'值': np.arange(10, dtype=np.int64)})
+    cache.save_frame(workbooks[0], frame, variant='立方体')
+    results.save(workbooks[0], workbooks[1], {'mode': '测试'}, frame)
+    assert results.load(workbooks[0], workbooks[1], {'mode': '测试'}).equals(frame)
+    assert results.load(workbooks[0], workbooks[1], {'mode': '其他'}) is None
+
+    # 上月工作簿内容变化：对比结果失效，本月的旁路缓存不受影响
+    pd.read_excel(workbooks[1]).head(10).to_excel(workbooks[1], index=False)
+    assert results.load(workbooks[0], workbooks[1], {'mode': '测试'}) is None
+    assert cache.load_frame(workbooks[0], variant='立方体').equals(frame)
+
+
+def _save_variants(filename, cache_dir, start):
+    cache = SidecarCache(cache_dir=cache_dir)
+    frame = pd.DataFrame({'值': np.arange(10, dtype=np.int64)})
+    for i in range(start, start + 50):
+        cache.save_frame(filename, frame, variant=f"变体{i}")
+
+
+def test_processes_saving_to_one_directory_keep_every_entry(workbooks, tmp_path):
+    cache_dir = str(tmp_path / '缓存')
+    with ProcessPoolExecutor(max_workers=4) as executor:
+        list(executor.map(_save_variants, [workbooks[0]] * 4, [cache_dir] * 4, range(0, 200, 50)))
+
+    cache = SidecarCache(cache_dir=cache_dir)
+    assert all(cache.load_frame(workbooks[0], variant=f"变体{i}") is not None for i in range(200))
+
+
+def test_threads_saving_same_entry_never_tear(workbooks, tmp_path):
+    cache = SidecarCache(cache_dir=str(tmp_path / '缓存'))
+    results = ResultCache(fingerprints=cache)
+    frames = [pd.DataFrame({'值': np.full(200000, i, dtype=np.int64)}) for i in range(8)]
+
+    def save(frame):
+        for _ in range(3):
+            cache.save_frame(workbooks[0], frame, variant='立方体')
+            results.save(workbooks[0], workbooks[1], {'mode': '测试'}, frame)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(save, frames))
+
+    for loaded in (cache.load_frame(workbooks[0], variant='立方体'),
+                   results.load(workbooks[0], workbooks[1], {'mode': '测试'})):
+        assert len(loaded) == 200000 and loaded['值'].nunique() == 1
+    assert not list((tmp_path / '缓存').rglob('*.tmp'))
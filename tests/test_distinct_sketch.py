@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+"""去重计数草图测试"""
+
+import numpy as np
+import pandas as pd
+
+from distinct_sketch import estimate_distinct, hll_registers, merge_hll_registers
+
+
+def test_merge_int_and_float_batches():
+    # 同一批ID：一个批次读为整数，另一个批次因含空值读为浮点数
+    ids = np.arange(100000, 101000)
+    int_batch = pd.DataFrame({'产品线': 'A', '客户号': ids})
+    float_batch = pd.DataFrame({'产品线': 'A', '客户号': np.append(ids.astype(float), np.nan)})
+
+    merged = merge_hll_registers(
+        [hll_registers(int_batch, ['产品线'], '客户号'), hll_registers(float_batch, ['产品线'], '客户号')],
+        ['产品线']
+    )
+    estimate = estimate_distinct(merged, ['产品线'])['去重数'].iloc[0]
+    assert abs(estimate - 1000) <= 50
+
+
+def test_mixed_object_column_matches_numeric():
+    values = pd.Series([5, 5.0, '5', 7.5, 'x'], dtype=object)
+    frame = pd.DataFrame({'产品线': 'A', '客户号': values})
+
+    sketch = hll_registers(frame, ['产品线'], '客户号')
+    # 5 与 5.0 为同一个值；文本 '5'、7.5、'x' 各自不同
+    assert estimate_distinct(sketch, ['产品线'])['去重数'].iloc[0] == 4
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""读取引擎测试：各可用引擎的读取结果与 pd.read_excel 一致，自动选择规则"""
+
+import pandas as pd
+import pytest
+
+import excel_readers
+from conftest import CURRENT_FILE
+from excel_readers import READER_ENGINES, ReaderEngine, get_engine, read_table, select_engine
+
+
+XLSX_ENGINES = [engine.name for engine in READER_ENGINES if '.xlsx' in engine.extensions]
+
+
+@pytest.mark.parametrize('columns', [None, ['贷款金额', '产品线']], ids=['全部列', '投影'])
+@pytest.mark.parametrize('name', XLSX_ENGINES)
+def test_xlsx_engines_match_read_excel(name, columns, month_frames):
+    engine = get_engine(name)
+    if not engine.is_available():
+        pytest.skip(f"{name} 未安装")
+
+    expected = month_frames[0] if columns is None else month_frames[0][columns]
+    pd.testing.assert_frame_equal(engine.read(CURRENT_FILE, columns), expected)
+
+
+@pytest.mark.parametrize('suffix, write', [
+    ('.csv', lambda df, path: df.to_csv(path, index=False)),
+    ('.parquet', lambda df, path: df.to_parquet(path, index=False)),
+], ids=['csv', 'parquet'])
+def test_converted_files_read_back(tmp_path, month_frames, suffix, write):
+    path = str(tmp_path / f'数据_2023-10-31{suffix}')
+    write(month_frames[0], path)
+
+    df, engine, _ = read_table(path)
+
+    assert engine == select_engine(path).name
+    pd.testing.assert_frame_equal(df, month_frames[0])
+
+
+def test_large_workbook_without_fast_engines_streams(monkeypatch):
+    for name in ('fastexcel', 'calamine'):
+        monkeypatch.setattr(get_engine(name), 'is_available', lambda: False)
+    assert select_engine(CURRENT_FILE).name == 'openpyxl'
+
+    monkeypatch.setattr(excel_readers, 'STREAMING_THRESHOLD_BYTES', 1)
+    assert select_engine(CURRENT_FILE).name == 'openpyxl-stream'
+
+
+def test_engine_without_read_cannot_be_created():
+    class Incomplete(ReaderEngine):
+        name = '不完整'
+
+    with pytest.raises(TypeError):
+        Incomplete()
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+执行后端一致性测试：各后端的分组汇总、区间分箱、两期合并结果与pandas参考实现逐项比较
+
+未安装依赖的后端自动跳过。
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from execution_backends import EXECUTION_BACKENDS, ParallelBackend, get_backend
+
+
+DIMS = ['产品线', '所属区域']
+METRICS = ['风险笔数', '贷款金额']
+CUTPOINTS = [500000.0, 1500000.0]
+LABELS = ['<=500000.0', '500000.0-1500000.0', '>1500000.0']
+
+CASES = {
+    '分组汇总': lambda b, cur, prev: b.group_sum(cur, DIMS, METRICS),
+    '分组汇总（保留空键）': lambda b, cur, prev: b.group_sum(cur, DIMS, METRICS, dropna=False),
+    '区间分箱': lambda b, cur, prev: pd.DataFrame({'区间': b.bin_interval(cur['贷款金额'], CUTPOINTS, LABELS)}),
+    '两期合并': lambda b, cur, prev: b.merge_periods(
+        b.group_sum(cur, DIMS, METRICS), b.group_sum(prev, DIMS, METRICS), DIMS
+    ),
+    '两期合并（单键）': lambda b, cur, prev: b.merge_periods(
+        b.group_sum(cur, ['产品线'], METRICS), b.group_sum(prev, ['产品线'], METRICS), ['产品线']
+    ),
+}
+
+
+@pytest.fixture(scope='module')
+def periods():
+    """两期数据：分类维度（含空值）、文本维度、压缩整数指标、含空值的浮点指标"""
+    rng = np.random.default_rng(0)
+    frames = []
+    dtype = pd.CategoricalDtype(['产品线A', '产品线B', '产品线C', '产品线D'])
+    for n in (5000, 4000):
+        region = rng.choice(['华东', '华南', '华北', None], n)
+        frame = pd.DataFrame({
+            '产品线': pd.Categorical(rng.choice(dtype.categories[:3 if n == 4000 else 4], n), dtype=dtype),
+            '所属区域': pd.Series(region, dtype=object),
+            '风险笔数': rng.integers(0, 100, n).astype(np.int8),
+            '贷款金额': np.round(rng.uniform(0, 2e6, n), 2),
+        })
+        frame.loc[rng.random(n) < 0.05, '贷款金额'] = np.nan
+        frames.append(frame)
+    return frames[0], frames[1]
+
+
+def normalize_missing(df: pd.DataFrame) -> pd.DataFrame:
+    """文本列的缺失值统一为NaN：各后端返回的缺失键可能是None或NaN，比较时不依赖二者视为相等"""
+    for col in df.columns:
+        if df[col].dtype == object:
+            df[col] = df[col].where(df[col].notna(), np.nan)
+    return df
+
+
+@pytest.fixture(scope='module')
+def parallel():
+    """测试数据较小，强制走多进程路径；各测试共用一个进程池"""
+    backend = ParallelBackend(workers=3, min_rows=0)
+    yield backend
+    backend.close()
+
+
+@pytest.mark.parametrize('case', list(CASES))
+@pytest.mark.parametrize('name', [backend.name for backend in EXECUTION_BACKENDS if backend.name != 'pandas'])
+def test_backend_matches_pandas(name, case, periods, parallel):
+    backend = parallel if name == parallel.name else get_backend(name)
+    if not backend.is_available():
+        pytest.skip(f"{name} 未安装")
+
+    run = CASES[case]
+    pd.testing.assert_frame_equal(normalize_missing(run(backend, *periods)),
+                                  normalize_missing(run(get_backend('pandas'), *periods)))
+
+
+@pytest.mark.parametrize('dropna', [True, False])
+@pytest.mark.parametrize('kind', ['int64', 'float64', 'object', 'string', 'bool', 'datetime64[ns]', 'Int64'])
+def test_parallel_restores_key_dtype(kind, dropna, parallel):
+    """非分类的分组键解码后与pandas参考实现的类型一致（含空键）"""
+    rng = np.random.default_rng(1)
+    n = 3000
+    raw = rng.integers(0, 5, n)
+    keys = {
+        'int64': raw,
+        'float64': np.where(rng.random(n) < 0.1, np.nan, raw.astype(float)),
+        'object': pd.Series(np.array(['甲', '乙', '丙', '丁', None], dtype=object)[raw]),
+        'string': pd.array(np.array(['甲', '乙', '丙', '丁', None], dtype=object)[raw], dtype='string'),
+        'bool': raw > 2,
+        'datetime64[ns]': pd.Timestamp('2023-09-30') + pd.to_timedelta(raw, unit='D'),
+        'Int64': pd.array(raw, dtype='Int64'),
+    }
+    df = pd.DataFrame({'键': keys[kind], '风险笔数': rng.integers(0, 100, n)})
+    if kind == 'Int64':
+        df.loc[::7, '键'] = pd.NA
+
+    result = parallel.group_sum(df, ['键'], ['风险笔数'], dropna=dropna)
+    pd.testing.assert_frame_equal(result, get_backend('pandas').group_sum(df, ['键'], ['风险笔数'], dropna=dropna))
+
+
+def test_parallel_pool_persists_until_close(periods):
+    backend = ParallelBackend(workers=2, min_rows=0)
+    first = backend.group_sum(periods[0], ['产品线'], ['风险笔数'])
+    pool = backend._executor
+
+    pd.testing.assert_frame_equal(backend.group_sum(periods[0], ['产品线'], ['风险笔数']), first)
+    assert backend._executor is pool
+
+    backend.close()
+    assert backend._executor is None
+    # 关闭后再次使用时重新创建进程池
+    pd.testing.assert_frame_equal(backend.group_sum(periods[0], ['产品线'], ['风险笔数']), first)
+    backend.close()
+
+
+def test_parallel_rejects_non_positive_workers():
+    with pytest.raises(ValueError):
+        ParallelBackend(workers=0)
+
+
+def test_hash_partitions_cover_large_partition_counts():
+    codes = np.arange(200000, dtype=np.int64)
+    partitions = ParallelBackend._hash_partitions([codes], 40000)
+    assert partitions.min() >= 0 and partitions.max() >= 2 ** 15
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""区间分箱索引测试：排序索引、流式累计器、交叉分箱与 pd.cut 后分组汇总的结果逐项比较"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from interval_index import BinAccumulator, CrossBinAccumulator, SortedBinIndex
+
+
+SUM_COLS = ['贷款金额', '风险笔数', '收入金额']
+# 100000~100001 之间没有数据，是一个空区间
+CUTPOINTS = [100000.0, 100001.0, 1500000.0]
+LABELS = ['<=100000.0', '100000.0-100001.0', '100001.0-1500000.0', '>1500000.0']
+
+
+def cut(values: pd.Series, cutpoints, labels) -> pd.Series:
+    """原版的分箱方式"""
+    return pd.cut(values, bins=[-np.inf] + list(cutpoints) + [np.inf], labels=labels,
+                  include_lowest=True, right=False)
+
+
+def reference(df: pd.DataFrame, cutpoints=CUTPOINTS, labels=LABELS) -> pd.DataFrame:
+    """原版的区间汇总：对分类区间列分组，空区间输出合计为0的行"""
+    binned = df.assign(区间=cut(df['风险金额'], cutpoints, labels))
+    return binned.groupby('区间', observed=False)[SUM_COLS].sum().reset_index()
+
+
+def test_sorted_index_keeps_empty_bins(month_frames):
+    for df in month_frames:
+        result = SortedBinIndex(df, '风险金额', SUM_COLS).summarize(CUTPOINTS, LABELS)
+        assert len(result) == len(LABELS)
+        pd.testing.assert_frame_equal(result, reference(df))
+
+
+def test_accumulator_matches_in_memory(month_frames):
+    df = month_frames[0]
+    schemes = {'含空区间': CUTPOINTS, '两段': [500000.0]}
+    accumulator = BinAccumulator('风险金额', schemes, SUM_COLS)
+    for start in range(0, len(df), 64):
+        accumulator.update(df.iloc[start:start + 64])
+
+    pd.testing.assert_frame_equal(accumulator.summarize('含空区间', LABELS), reference(df))
+    two_bands = ['<=500000.0', '>500000.0']
+    pd.testing.assert_frame_equal(accumulator.summarize('两段', two_bands),
+                                  reference(df, [500000.0], two_bands))
+
+
+@pytest.mark.parametrize('dimension', [None, '产品线'])
+def test_cross_bins_keep_empty_cells(month_frames, dimension):
+    df = month_frames[0]
+    y_cutpoints, y_labels = [1000000.0], ['<=1000000.0', '>1000000.0']
+    accumulator = CrossBinAccumulator('风险金额', CUTPOINTS, '贷款金额', y_cutpoints,
+                                      ['风险笔数', '收入金额'], dimension)
+    accumulator.update(df, 0)
+
+    keys = ([dimension] if dimension else []) + ['风险金额区间', '贷款金额区间']
+    binned = df.assign(风险金额区间=cut(df['风险金额'], CUTPOINTS, LABELS),
+                       贷款金额区间=cut(df['贷款金额'], y_cutpoints, y_labels))
+    if dimension:
+        binned[dimension] = binned[dimension].astype('category')
+    expected = binned.groupby(keys, observed=False)[['风险笔数', '收入金额']].sum().reset_index()
+
+    pd.testing.assert_frame_equal(accumulator.summarize(0, LABELS, y_labels), expected)
+
+
+def test_rebinning_matches_groupby():
+    """同一索引反复按不同切分点汇总，与逐次分箱后分组求和一致（含超出2^53的整数合计和量级悬殊的浮点数）"""
+    rng = np.random.default_rng(0)
+    n = 200000
+    df = pd.DataFrame({
+        '风险金额': rng.uniform(0, 2e6, n),
+        '贷款金额': np.where(rng.random(n) < 0.01, 1e15, np.round(rng.uniform(0, 1e3, n), 2)),
+        '风险笔数': rng.integers(2 ** 40, 2 ** 41, n),
+        '收入金额': rng.uniform(-1e6, 1e6, n),
+    })
+    df.loc[rng.random(n) < 0.02, ['风险金额', '贷款金额']] = np.nan
+    index = SortedBinIndex(df, '风险金额', SUM_COLS)
+
+    for cutpoints in ([1e6], [10.0, 5e5, 5e5 + 1, 1.9e6], list(np.linspace(1e4, 1.99e6, 40)), [3e6]):
+        labels = [f'区间{i}' for i in range(len(cutpoints) + 1)]
+        result = index.summarize(cutpoints, labels)
+        expected = reference(df, cutpoints, labels)
+        # 整数合计精确相等；浮点合计与分组求和（Kahan累加）最多相差舍入误差
+        pd.testing.assert_series_equal(result['风险笔数'], expected['风险笔数'], check_exact=True)
+        pd.testing.assert_frame_equal(result, expected, rtol=1e-15)
+
+
+def test_accumulators_sum_large_integers_exactly():
+    """合计超过2^53的整数指标：流式累计器、交叉分箱与整表分组求和逐位一致"""
+    rng = np.random.default_rng(2)
+    n = 60000
+    df = pd.DataFrame({
+        '风险金额': rng.uniform(0, 2e6, n),
+        '贷款金额': rng.uniform(0, 2e6, n),
+        '风险笔数': rng.integers(2 ** 40, 2 ** 41, n),
+        '收入金额': rng.uniform(0, 1e3, n),
+    })
+    accumulator = BinAccumulator('风险金额', {'自定义': CUTPOINTS}, SUM_COLS)
+    cross = CrossBinAccumulator('风险金额', CUTPOINTS, '贷款金额', [1e6], ['风险笔数'])
+    for start in range(0, n, 7000):
+        accumulator.update(df.iloc[start:start + 7000])
+        cross.update(df.iloc[start:start + 7000], 0)
+
+    result = accumulator.summarize('自定义', LABELS)
+    assert result['风险笔数'].dtype == np.int64
+    pd.testing.assert_series_equal(result['风险笔数'], reference(df)['风险笔数'], check_exact=True)
+
+    binned = df.assign(风险金额区间=cut(df['风险金额'], CUTPOINTS, LABELS),
+                       贷款金额区间=cut(df['贷款金额'], [1e6], ['<=1000000.0', '>1000000.0']))
+    expected = binned.groupby(['风险金额区间', '贷款金额区间'], observed=False)['风险笔数'].sum()
+    crossed = cross.summarize(0, LABELS, ['<=1000000.0', '>1000000.0'])
+    assert crossed['风险笔数'].tolist() == expected.tolist()
+
+
+def test_accumulator_switches_to_float_when_batch_has_missing_values(month_frames):
+    df = month_frames[0].copy()
+    accumulator = BinAccumulator('风险金额', {'自定义': CUTPOINTS}, SUM_COLS)
+    accumulator.update(df.iloc[:100])
+    # 第二个批次的整数列含空值，读为浮点
+    second = df.iloc[100:].astype({'风险笔数': float})
+    second.iloc[0, second.columns.get_loc('风险笔数')] = np.nan
+    accumulator.update(second)
+
+    expected = reference(pd.concat([df.iloc[:100].astype({'风险笔数': float}), second]))
+    pd.testing.assert_frame_equal(accumulator.summarize('自定义', LABELS), expected)
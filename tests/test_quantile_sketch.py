@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""分位数草图与切分点建议测试：与精确分位数比较秩误差"""
+
+import numpy as np
+import pytest
+
+from quantile_sketch import KLLSketch, jenks_breaks, suggest_cutpoints
+
+
+QUANTILES = np.linspace(0.05, 0.95, 19)
+
+
+def rank_error(sketch: KLLSketch, values: np.ndarray) -> float:
+    """草图分位数在精确数据中的秩与目标分位点之差的最大值"""
+    ranks = np.searchsorted(np.sort(values), sketch.quantile(QUANTILES), side='right') / len(values)
+    return float(np.max(np.abs(ranks - QUANTILES)))
+
+
+@pytest.fixture(scope='module')
+def values():
+    rng = np.random.default_rng(0)
+    return rng.lognormal(12, 1.5, 200000)
+
+
+def test_batched_updates_stay_within_rank_error(values):
+    sketch = KLLSketch()
+    for batch in np.array_split(values, 37):
+        sketch.update(np.append(batch, np.nan))
+
+    assert rank_error(sketch, values) < 0.02
+    assert len(sketch) < 2000
+    assert sketch.count == len(values)
+    assert (sketch.min, sketch.max) == (values.min(), values.max())
+    assert sketch.mean == pytest.approx(values.mean(), rel=1e-12)
+    assert sketch.quantile(0) == values.min() and sketch.quantile(1) == values.max()
+
+
+def test_merge_matches_combined_data(values):
+    halves = np.array_split(values, [60000])
+    sketches = []
+    for half in halves:
+        sketch = KLLSketch()
+        sketch.update(half)
+        sketches.append(sketch)
+
+    merged = sketches[0].merge(sketches[1])
+
+    assert rank_error(merged, values) < 0.02
+    assert merged.count == len(values)
+    assert (merged.min, merged.max) == (values.min(), values.max())
+    # 合并不修改输入
+    assert sketches[0].count == 60000
+
+
+def test_frame_round_trip(values):
+    sketch = KLLSketch(k=100)
+    sketch.update(values[:50000])
+
+    restored = KLLSketch.from_frame(sketch.to_frame())
+
+    assert (restored.k, restored.count, restored.min, restored.max, restored.total) == \
+           (sketch.k, sketch.count, sketch.min, sketch.max, sketch.total)
+    np.testing.assert_array_equal(restored.quantile(QUANTILES), sketch.quantile(QUANTILES))
+
+
+def test_empty_sketch():
+    sketch = KLLSketch()
+    sketch.update([np.nan])
+    assert sketch.count == 0 and np.isnan(sketch.mean)
+    assert np.isnan(sketch.quantile([0.5])).all()
+
+
+def test_equal_frequency_cutpoints(values):
+    sketch = KLLSketch()
+    sketch.update(values)
+
+    cutpoints = suggest_cutpoints(sketch.quantile, sketch.min, sketch.max, 4, 'q')
+
+    assert len(cutpoints) == 3
+    shares = np.diff(np.searchsorted(np.sort(values), [values.min()] + cutpoints + [np.inf])) / len(values)
+    np.testing.assert_allclose(shares, 0.25, atol=0.02)
+
+
+def test_log_cutpoints_are_geometric():
+    cutpoints = suggest_cutpoints(lambda q: np.asarray(q) * 1e6, 10.0, 1e6, 5, 'log')
+    assert cutpoints == [100.0, 1000.0, 10000.0, 100000.0]
+
+
+def test_jenks_separates_clusters():
+    clusters = np.concatenate([np.full(30, 1.0), np.full(30, 50.0), np.full(30, 1000.0)])
+    assert jenks_breaks(clusters, 3) == [50.0, 1000.0]
+
+
+@pytest.mark.parametrize('args', [
+    (0.0, 1.0, 1, 'q'),
+    (1.0, 1.0, 4, 'q'),
+    (-5.0, 0.0, 3, 'log'),
+], ids=['区间个数不足', '无取值范围', '无正数'])
+def test_no_suggestion(args):
+    assert suggest_cutpoints(lambda q: np.zeros(np.shape(q)), *args) is None
+
+
+def test_unknown_method():
+    with pytest.raises(ValueError):
+        suggest_cutpoints(np.asarray, 0.0, 1.0, 3, 'kmeans')
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""会话级结果缓存测试：数据指纹、LRU淘汰、命中统计"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from result_memo import ResultMemo
+
+
+def frame(n: int) -> pd.DataFrame:
+    return pd.DataFrame({'值': np.arange(n, dtype=np.int64)})
+
+
+def test_frame_fingerprint_follows_object_identity():
+    memo = ResultMemo()
+    df = frame(10)
+
+    assert memo.frame_fingerprint(df) == memo.frame_fingerprint(df)
+    assert memo.frame_fingerprint(df.copy()) != memo.frame_fingerprint(df)
+
+
+def test_invalidate_frame_drops_its_results():
+    memo = ResultMemo()
+    df, other = frame(10), frame(10)
+    token, other_token = memo.frame_fingerprint(df), memo.frame_fingerprint(other)
+    memo.put((token, '分组汇总'), frame(3))
+    memo.put((other_token, '分组汇总'), frame(3))
+
+    memo.invalidate_frame(df)
+
+    assert memo.frame_fingerprint(df) != token
+    assert memo.get((token, '分组汇总')) is None
+    assert memo.get((other_token, '分组汇总')) is not None
+    assert memo.total_bytes == memo.entries[(other_token, '分组汇总')][1]
+
+
+def test_get_returns_copy():
+    memo = ResultMemo()
+    memo.put('键', frame(5))
+
+    memo.get('键')['值'] = -1
+
+    assert memo.get('键').equals(frame(5))
+
+
+def test_lru_eviction_within_budget():
+    size = int(frame(1000).memory_usage(deep=True).sum())
+    memo = ResultMemo(max_bytes=2 * size)
+    memo.put('甲', frame(1000))
+    memo.put('乙', frame(1000))
+    memo.get('甲')
+
+    memo.put('丙', frame(1000))
+    # 超出预算的单个结果不缓存
+    memo.put('丁', frame(5000))
+
+    assert list(memo.entries) == ['甲', '丙']
+    stats = memo.stats()
+    assert (stats['hits'], stats['misses'], stats['evictions'], stats['entries']) == (1, 0, 1, 2)
+    assert stats['bytes'] == 2 * size
+
+
+def test_file_fingerprint_changes_with_content(tmp_path):
+    path = tmp_path / '数据.xlsx'
+    path.write_bytes(b'1')
+    before = ResultMemo.file_fingerprint(str(path))
+
+    path.write_bytes(b'22')
+
+    assert ResultMemo.file_fingerprint(str(path)) != before
+    assert before.startswith(f"文件:{os.path.abspath(path)}:")
+
+
+def test_collected_frame_drops_its_results():
+    memo = ResultMemo()
+    df, other = frame(10), frame(10)
+    other_token = memo.frame_fingerprint(other)
+    memo.put((memo.frame_fingerprint(df), '分组汇总'), frame(3))
+    memo.put((other_token, '分组汇总'), frame(3))
+
+    del df
+
+    assert list(memo.entries) == [(other_token, '分组汇总')]
+    assert memo.total_bytes == memo.entries[(other_token, '分组汇总')][1]